@@ -2,8 +2,12 @@ import tkinter as tk
 from tkinter import simpledialog, messagebox, filedialog
 import json
 import os
+import sys
 import time
-from PIL import ImageGrab
+
+# shared capture layer lives in computer_vision/ at the repository root
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from computer_vision.capture import grab
 
 
 class DraggableButton:
@@ -197,16 +201,24 @@ class OverlayApp:
             messagebox.showinfo("Saved Locations", "No buttons to save.")
             return
 
-        # Grab full screen once
-        img = ImageGrab.grab()
+        # Grab the area covering all markers once (BGR)
+        states = [it.get_state() for it in self.items]
+        left = min(s["center"]["x"] for s in states)
+        top = min(s["center"]["y"] for s in states)
+        right = max(s["center"]["x"] for s in states)
+        bottom = max(s["center"]["y"] for s in states)
+        try:
+            frame = grab((left, top, right - left + 1, bottom - top + 1))
+        except Exception:
+            frame = None
 
         out = []
-        for it in self.items:
-            state = it.get_state()
+        for state in states:
             cx = state["center"]["x"]
             cy = state["center"]["y"]
             try:
-                rgb = img.getpixel((cx, cy))
+                b, g, r = frame[cy - top, cx - left]
+                rgb = (int(r), int(g), int(b))
             except Exception:
                 rgb = (0, 0, 0)
             out.append({"name": state["name"], "center": state["center"], "rgb": list(rgb)})
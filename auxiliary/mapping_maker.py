@@ -88,7 +88,7 @@ class MappingMakerApp:
 
     def refresh_needles(self):
         self.needles_lb.delete(0, 'end')
-        files = sorted([f for f in os.listdir(self.saved_images_dir) if f.lower().endswith('.png')])
+        files = sorted([f for f in os.listdir(self.saved_images_dir) if f.lower().endswith('.png') and not f.lower().endswith('.mask.png')])
         for f in files:
             self.needles_lb.insert('end', f)
 
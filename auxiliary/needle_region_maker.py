@@ -11,10 +11,16 @@ Run as a script: python auxiliary/needle_region_maker.py
 """
 import os
 import json
+import sys
 import time
 import tkinter as tk
 from tkinter import filedialog, messagebox, simpledialog
-from PIL import ImageGrab, Image, ImageTk
+import cv2
+from PIL import Image, ImageTk
+
+# shared capture layer lives in computer_vision/ at the repository root
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from computer_vision.capture import grab
 
 # optional global mouse capture (allows starting drag anywhere on screen)
 try:
@@ -171,10 +177,8 @@ class NeedleRegionMaker:
         screen_y2 = self.canvas.winfo_rooty() + maxy
         w = max(1, screen_x2 - screen_x)
         h = max(1, screen_y2 - screen_y)
-        bbox = (screen_x, screen_y, screen_x + w, screen_y + h)
-
         try:
-            img = ImageGrab.grab(bbox=bbox)
+            img = Image.fromarray(cv2.cvtColor(grab((screen_x, screen_y, w, h)), cv2.COLOR_BGR2RGB))
         except Exception as e:
             self.status(f'Capture failed: {e}')
             self.mode = None
@@ -0,0 +1,292 @@
+"""
+Screen capture backends.
+
+Every backend returns BGR uint8 arrays of shape (h, w, 3) for a region given as
+(x, y, w, h), so frames can go straight into OpenCV without further conversion.
+
+Backends:
+- 'mss'       : mss (XShm on Linux, BitBlt on Windows); fastest, used by default when importable
+- 'pil'       : PIL.ImageGrab
+- 'pyautogui' : pyautogui.screenshot
+- 'file'      : serves frames from image files on disk (offline testing)
+- 'replay'    : serves frames from a session recorded with computer_vision.recorder
+
+Use `grab(region)` for the process-wide backend, or `create_backend(name)` to get a
+specific one. `python -m computer_vision.capture_benchmark` compares them.
+
+Screen backends convert into a small ring of preallocated frames per region size
+(FrameBuffers) instead of allocating a new array per grab, and every backend hands
+out read-only views. A grabbed frame stays valid until `depth` (default 4) further
+grabs of the same size; copy it to keep it longer.
+"""
+import glob
+import os
+import threading
+
+import cv2
+import numpy as np
+
+# optional capture libraries
+try:
+    import mss
+    MSS_AVAILABLE = True
+except Exception:
+    mss = None
+    MSS_AVAILABLE = False
+
+try:
+    from PIL import ImageGrab
+    PIL_AVAILABLE = True
+except Exception:
+    ImageGrab = None
+    PIL_AVAILABLE = False
+
+try:
+    import pyautogui
+    PYAUTOGUI_AVAILABLE = True
+except Exception:
+    pyautogui = None
+    PYAUTOGUI_AVAILABLE = False
+
+
+DEFAULT_DEPTH = 4
+
+
+def _readonly(arr):
+    view = arr.view()
+    view.flags.writeable = False
+    return view
+
+
+class FrameBuffers:
+    """Ring of `depth` preallocated BGR frames per (h, w); grabs convert into them in place."""
+
+    def __init__(self, depth=DEFAULT_DEPTH):
+        self.depth = depth
+        self._rings = {}
+        self._lock = threading.Lock()
+
+    def next(self, h, w):
+        """The writable buffer for the next frame of size (h, w)."""
+        with self._lock:
+            ring = self._rings.get((h, w))
+            if ring is None:
+                ring = self._rings[(h, w)] = [[np.empty((h, w, 3), dtype=np.uint8) for _ in range(self.depth)], 0]
+            buffers, i = ring
+            ring[1] = (i + 1) % len(buffers)
+            return buffers[i]
+
+
+class MssBackend:
+    name = 'mss'
+
+    def __init__(self, depth=DEFAULT_DEPTH):
+        if not MSS_AVAILABLE:
+            raise RuntimeError('mss is not installed. Install with: python -m pip install mss')
+        # mss handles are not safe to share between threads
+        self._local = threading.local()
+        self.buffers = FrameBuffers(depth)
+
+    def _sct(self):
+        sct = getattr(self._local, 'sct', None)
+        if sct is None:
+            sct = self._local.sct = mss.mss()
+        return sct
+
+    def grab(self, region):
+        x, y, w, h = region
+        shot = self._sct().grab({'left': int(x), 'top': int(y), 'width': int(w), 'height': int(h)})
+        bgra = np.asarray(shot)  # zero-copy over mss's own buffer
+        dst = self.buffers.next(bgra.shape[0], bgra.shape[1])
+        cv2.cvtColor(bgra, cv2.COLOR_BGRA2BGR, dst=dst)
+        return _readonly(dst)
+
+    def close(self):
+        sct = getattr(self._local, 'sct', None)
+        if sct is not None:
+            sct.close()
+            self._local.sct = None
+
+
+def _pil_to_bgr(img, buffers):
+    """Converts a PIL screenshot into the next preallocated BGR buffer; returns a read-only view."""
+    if img.mode not in ('RGB', 'RGBA'):
+        img = img.convert('RGB')
+    src = np.asarray(img)  # PIL hands numpy one copy of its pixels; the conversion adds none
+    dst = buffers.next(src.shape[0], src.shape[1])
+    cv2.cvtColor(src, cv2.COLOR_RGBA2BGR if img.mode == 'RGBA' else cv2.COLOR_RGB2BGR, dst=dst)
+    return _readonly(dst)
+
+
+class PilBackend:
+    name = 'pil'
+
+    def __init__(self, depth=DEFAULT_DEPTH):
+        if not PIL_AVAILABLE:
+            raise RuntimeError('Pillow is not installed. Install with: python -m pip install Pillow')
+        self.buffers = FrameBuffers(depth)
+
+    def grab(self, region):
+        x, y, w, h = region
+        return _pil_to_bgr(ImageGrab.grab(bbox=(x, y, x + w, y + h)), self.buffers)
+
+    def close(self):
+        pass
+
+
+class PyAutoGuiBackend:
+    name = 'pyautogui'
+
+    def __init__(self, depth=DEFAULT_DEPTH):
+        if not PYAUTOGUI_AVAILABLE:
+            raise RuntimeError('pyautogui is not installed. Install with: python -m pip install pyautogui')
+        self.buffers = FrameBuffers(depth)
+
+    def grab(self, region):
+        return _pil_to_bgr(pyautogui.screenshot(region=tuple(int(v) for v in region)), self.buffers)
+
+    def close(self):
+        pass
+
+
+class FileBackend:
+    """
+    Serves frames from image files instead of the screen, cycling through them in order.
+
+    `source` is a directory (all PNGs in it, sorted by name) or a list of paths.
+    `origin` is the screen position of each image's top-left corner; a grabbed
+    region is cropped out of the image relative to it.
+    """
+    name = 'file'
+
+    def __init__(self, source, origin=(0, 0), loop=True):
+        if isinstance(source, str):
+            paths = sorted(glob.glob(os.path.join(source, '*.png')))
+        else:
+            paths = list(source)
+        if not paths:
+            raise ValueError(f'No frames found in {source}')
+        self.frames = []
+        for path in paths:
+            frame = cv2.imread(path, cv2.IMREAD_COLOR)
+            if frame is None:
+                raise ValueError(f'Could not read frame: {path}')
+            self.frames.append(frame)
+        self.origin = origin
+        self.loop = loop
+        self.index = 0
+        self._lock = threading.Lock()
+
+    def grab(self, region):
+        with self._lock:
+            if self.index >= len(self.frames):
+                if not self.loop:
+                    raise EOFError('No more frames')
+                self.index = 0
+            frame = self.frames[self.index]
+            self.index += 1
+        x, y, w, h = region
+        ox, oy = x - self.origin[0], y - self.origin[1]
+        return _readonly(frame[oy:oy + h, ox:ox + w])
+
+    def close(self):
+        pass
+
+
+class ReplayBackend:
+    """
+    Serves the frames of a recorded session (see computer_vision.recorder) in order,
+    as fast as they are requested. A grabbed region is cropped out of each recorded
+    frame relative to the region it was recorded with.
+    """
+    name = 'replay'
+
+    def __init__(self, session_dir, loop=False):
+        from computer_vision.recorder import SessionReader
+        self.session = SessionReader(session_dir)
+        if not len(self.session):
+            raise ValueError(f'No frames recorded in {session_dir}')
+        self.loop = loop
+        self.index = 0
+        self._lock = threading.Lock()
+
+    def grab(self, region):
+        with self._lock:
+            if self.index >= len(self.session):
+                if not self.loop:
+                    raise EOFError('End of recorded session')
+                self.index = 0
+            event, frame = self.session.frame(self.index)
+            self.index += 1
+        x, y, w, h = region
+        rx, ry = event['region'][0], event['region'][1]
+        return frame[y - ry:y - ry + h, x - rx:x - rx + w]
+
+    def close(self):
+        pass
+
+
+BACKENDS = {
+    'mss': MssBackend,
+    'pil': PilBackend,
+    'pyautogui': PyAutoGuiBackend,
+    'file': FileBackend,
+    'replay': ReplayBackend,
+}
+
+# Preference order for live screen capture.
+SCREEN_BACKENDS = ('mss', 'pil', 'pyautogui')
+
+
+def available_backends():
+    """Names of the live screen backends whose libraries are importable."""
+    flags = {'mss': MSS_AVAILABLE, 'pil': PIL_AVAILABLE, 'pyautogui': PYAUTOGUI_AVAILABLE}
+    return [name for name in SCREEN_BACKENDS if flags[name]]
+
+
+def create_backend(name, **kwargs):
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown capture backend '{name}'. Choose from: {', '.join(BACKENDS)}")
+    return BACKENDS[name](**kwargs)
+
+
+_backend = None
+_backend_lock = threading.Lock()
+_recorder = None
+
+
+def get_backend():
+    """Returns the process-wide backend, creating the fastest available one on first use."""
+    global _backend
+    with _backend_lock:
+        if _backend is None:
+            names = available_backends()
+            if not names:
+                raise RuntimeError('No screen capture backend available. Install mss, Pillow or pyautogui.')
+            _backend = create_backend(names[0])
+        return _backend
+
+
+def set_backend(backend):
+    """Replaces the process-wide backend; accepts a backend instance or a backend name."""
+    global _backend
+    if isinstance(backend, str):
+        backend = create_backend(backend)
+    with _backend_lock:
+        _backend = backend
+    return backend
+
+
+def set_recorder(recorder):
+    """Sends every frame returned by `grab` to `recorder.record_frame`; None stops recording."""
+    global _recorder
+    _recorder = recorder
+
+
+def grab(region):
+    """Captures `region` (x, y, w, h) with the process-wide backend; returns a BGR array."""
+    frame = get_backend().grab(region)
+    recorder = _recorder
+    if recorder is not None:
+        recorder.record_frame(region, frame)
+    return frame
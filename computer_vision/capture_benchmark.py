@@ -0,0 +1,110 @@
+"""
+Benchmarks the screen capture backends on the gaming region.
+
+For each backend, grabs the region repeatedly and reports frames/sec and
+p50/p99 latency so the fastest backend can be picked per machine. `--alloc`
+also reports the Python/NumPy memory allocated per steady-state grab (traced
+with tracemalloc, which slows the grabs down).
+
+Run from the repository root:
+    python -m computer_vision.capture_benchmark
+    python -m computer_vision.capture_benchmark --frames 300 --backends mss pil
+    python -m computer_vision.capture_benchmark --files recorded_frames/
+    python -m computer_vision.capture_benchmark --alloc
+"""
+import argparse
+import json
+import os
+import time
+import tracemalloc
+
+from computer_vision import capture
+
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+GAMING_REGION = os.path.join(REPO_ROOT, 'saved_regions', 'gaming_region.json')
+
+
+def load_region(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        r = json.load(f)['region']
+    return int(r['x']), int(r['y']), int(r['w']), int(r['h'])
+
+
+def percentile(sorted_values, q):
+    if not sorted_values:
+        return 0.0
+    idx = min(len(sorted_values) - 1, int(round(q / 100.0 * (len(sorted_values) - 1))))
+    return sorted_values[idx]
+
+
+def bench_backend(backend, region, frames, warmup=5):
+    """Returns (fps, p50_ms, p99_ms) for `frames` grabs of `region`."""
+    for _ in range(warmup):
+        backend.grab(region)
+    latencies = []
+    start = time.perf_counter()
+    for _ in range(frames):
+        t0 = time.perf_counter()
+        backend.grab(region)
+        latencies.append((time.perf_counter() - t0) * 1000.0)
+    total = time.perf_counter() - start
+    latencies.sort()
+    return frames / total, percentile(latencies, 50), percentile(latencies, 99)
+
+
+def bench_alloc(backend, region, frames, warmup=5):
+    """Average KB allocated (peak above the starting point) per grab once the backend is warm."""
+    for _ in range(warmup):
+        backend.grab(region)
+    tracemalloc.start()
+    total = 0
+    try:
+        for _ in range(frames):
+            before = tracemalloc.get_traced_memory()[0]
+            tracemalloc.reset_peak()
+            backend.grab(region)
+            total += tracemalloc.get_traced_memory()[1] - before
+    finally:
+        tracemalloc.stop()
+    return total / 1024.0 / frames
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark screen capture backends.')
+    parser.add_argument('--frames', type=int, default=100, help='grabs per backend (default 100)')
+    parser.add_argument('--backends', nargs='+', default=None, help='backends to test (default: all available)')
+    parser.add_argument('--region', nargs=4, type=int, metavar=('X', 'Y', 'W', 'H'),
+                        help='region to grab (default: saved_regions/gaming_region.json)')
+    parser.add_argument('--files', default=None, help='directory of PNG frames to also benchmark the file backend')
+    parser.add_argument('--alloc', action='store_true', help='also report memory allocated per grab')
+    args = parser.parse_args()
+
+    region = tuple(args.region) if args.region else load_region(GAMING_REGION)
+    names = args.backends or capture.available_backends()
+    if args.files and 'file' not in names:
+        names = list(names) + ['file']
+
+    print(f'Region {region}, {args.frames} frames per backend')
+    print(f"{'backend':<10} {'fps':>8} {'p50 ms':>8} {'p99 ms':>8}" + (f" {'KB/grab':>9}" if args.alloc else ''))
+    for name in names:
+        try:
+            if name == 'file':
+                backend = capture.create_backend('file', source=args.files, origin=region[:2])
+            else:
+                backend = capture.create_backend(name)
+        except Exception as e:
+            print(f'{name:<10} unavailable: {e}')
+            continue
+        try:
+            fps, p50, p99 = bench_backend(backend, region, args.frames)
+            alloc = f' {bench_alloc(backend, region, args.frames):>9.1f}' if args.alloc else ''
+            print(f'{name:<10} {fps:>8.1f} {p50:>8.2f} {p99:>8.2f}{alloc}')
+        except Exception as e:
+            print(f'{name:<10} failed: {e}')
+        finally:
+            backend.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,209 @@
+"""
+Frame change detection in front of template matching.
+
+TileChangeDetector compares each frame with the previous one on a downsampled
+copy and reports which tiles changed. CachedMatcher keeps the last match result
+per template and, on a new frame, re-matches only the area around changed tiles,
+reusing the previous result when nothing relevant changed.
+
+Usage (one update per captured frame, then any number of matches on it):
+    matcher = CachedMatcher(templates)
+    frame = grab(region)
+    matcher.update(frame)
+    best_val, best_loc, best_size = matcher.match(frame, 'chem_plant_1')
+"""
+import threading
+
+import cv2
+import numpy as np
+
+from computer_vision.template_matching import FrameViews, match_entry, match_entry_all, select_hits
+
+
+class TileChangeDetector:
+    def __init__(self, tile_size=64, downsample=4, threshold=12):
+        """
+        tile_size: tile edge in full-resolution pixels.
+        downsample: frames are shrunk by this factor before diffing (noise and cost both drop).
+        threshold: a tile counts as changed when any downsampled pixel differs by more than this.
+        """
+        self.downsample = max(1, int(downsample))
+        self.tile = max(1, int(tile_size) // self.downsample)
+        self.threshold = threshold
+        self._prev = None
+        self._shape = None
+        self.grid = None  # (rows, cols) of the tile grid for the current frame size
+
+    def update(self, frame):
+        """
+        Returns a bool array (rows, cols) of changed tiles versus the previous frame,
+        or None when there is no comparable previous frame (first frame, size change).
+        """
+        h, w = frame.shape[:2]
+        small = cv2.resize(frame, (max(1, w // self.downsample), max(1, h // self.downsample)), interpolation=cv2.INTER_AREA)
+        prev, self._prev = self._prev, small
+        self._shape = (h, w)
+        t = self.tile
+        rows = -(-small.shape[0] // t)
+        cols = -(-small.shape[1] // t)
+        self.grid = (rows, cols)
+        if prev is None or prev.shape != small.shape:
+            return None
+
+        diff = cv2.absdiff(small, prev)
+        if diff.ndim == 3:
+            diff = diff.max(axis=2)
+        padded = np.zeros((rows * t, cols * t), dtype=diff.dtype)
+        padded[:diff.shape[0], :diff.shape[1]] = diff
+        return padded.reshape(rows, t, cols, t).max(axis=(1, 3)) > self.threshold
+
+    def empty_mask(self):
+        return np.zeros(self.grid, dtype=bool)
+
+    def tiles_bbox(self, mask):
+        """Full-resolution (x0, y0, x1, y1) bounding the True tiles of `mask`, or None."""
+        ys, xs = np.nonzero(mask)
+        if not len(xs):
+            return None
+        h, w = self._shape
+        size = self.tile * self.downsample
+        x0, y0 = int(xs.min()) * size, int(ys.min()) * size
+        # the last row/column also owns the remainder lost to downsampling
+        x1 = w if xs.max() == mask.shape[1] - 1 else min(w, (int(xs.max()) + 1) * size)
+        y1 = h if ys.max() == mask.shape[0] - 1 else min(h, (int(ys.max()) + 1) * size)
+        return x0, y0, x1, y1
+
+
+class CachedMatcher:
+    """
+    Drop-in for match_entry over whole frames that skips work on unchanged screens.
+
+    For each template the matcher remembers its last result and accumulates the tiles
+    that changed since. On `match`:
+    - nothing changed: the previous result is returned as is;
+    - changes away from the previous best: only windows touching the changed area are
+      re-matched and the better of the two results is kept;
+    - the previous best itself changed: the whole frame is re-matched.
+
+    With a scale_memory.ScaleMemory, re-matches try the learned scale first and stop early.
+    `match_all` does the same for every instance of a multi-instance template.
+    """
+
+    def __init__(self, templates, detector=None, scale_memory=None):
+        self.templates = templates
+        self.detector = detector or TileChangeDetector()
+        self.scale_memory = scale_memory
+        self._results = {}  # name -> (best_val, best_loc, best_size)
+        self._dirty = {}    # name -> tiles changed since the result was computed
+        self.stats = {'reused': 0, 'partial': 0, 'full': 0}
+        self._stats_lock = threading.Lock()  # match() may run for several templates in parallel
+        self._views = None  # FrameViews of the last updated frame
+
+    def _count(self, kind):
+        with self._stats_lock:
+            self.stats[kind] += 1
+
+    def update(self, frame):
+        """Registers a newly captured frame; call once per capture before matching on it."""
+        changed = self.detector.update(frame)
+        self._views = FrameViews(frame)
+        if changed is None:
+            self._results.clear()
+            self._dirty.clear()
+            return
+        for name in self._dirty:
+            self._dirty[name] |= changed
+
+    def _view(self, img_cv, entry):
+        """`img_cv` in the template's matching mode, converted once per frame when it is the updated one."""
+        if self._views is not None and img_cv is self._views.frame:
+            return self._views.get(entry.get('mode', 'bgr'))
+        return img_cv
+
+    def _small(self, img_cv, entry):
+        """The downsampled view for a coarse-to-fine template when `img_cv` is the updated frame, else None."""
+        coarse = entry.get('coarse')
+        if coarse and self._views is not None and img_cv is self._views.get(entry.get('mode', 'bgr')):
+            return self._views.get(entry.get('mode', 'bgr'), coarse[0])
+        return None
+
+    def _match(self, img_cv, entry, name):
+        if self.scale_memory is not None:
+            return self.scale_memory.match(img_cv, entry, name)
+        return match_entry(img_cv, entry)
+
+    def _full(self, img_cv, entry, name):
+        self._count('full')
+        return self._match(img_cv, entry, name)
+
+    def match(self, img_cv, name):
+        """Returns (best_val, best_loc, best_size) for template `name` on the last updated frame."""
+        entry = self.templates[name]
+        img_cv = self._view(img_cv, entry)
+        prev = self._results.get(name)
+        dirty = self._dirty.get(name)
+
+        if prev is None or prev[1] is None or dirty is None:
+            result = self._full(img_cv, entry, name)
+        elif not dirty.any():
+            self._count('reused')
+            result = prev
+        else:
+            x0, y0, x1, y1 = self.detector.tiles_bbox(dirty)
+            (px, py), (pw, ph) = prev[1], prev[2]
+            if px < x1 and px + pw > x0 and py < y1 and py + ph > y0:
+                result = self._full(img_cv, entry, name)
+            else:
+                result = prev
+                # every window overlapping the changed box lies inside this ROI
+                max_w = max(level[2] for level in entry['pyramid'])
+                max_h = max(level[3] for level in entry['pyramid'])
+                rx0, ry0 = max(0, x0 - max_w + 1), max(0, y0 - max_h + 1)
+                rx1, ry1 = min(img_cv.shape[1], x1 + max_w - 1), min(img_cv.shape[0], y1 + max_h - 1)
+                self._count('partial')
+                val, loc, size = self._match(img_cv[ry0:ry1, rx0:rx1], entry, name)
+                if loc is not None and val > prev[0]:
+                    result = (val, (loc[0] + rx0, loc[1] + ry0), size)
+
+        self._results[name] = result
+        if self.detector.grid is not None:
+            self._dirty[name] = self.detector.empty_mask()
+        return result
+
+    def match_all(self, img_cv, name, threshold, max_hits=8, extra_threshold=None, method=cv2.TM_CCOEFF_NORMED):
+        """
+        Every instance of `name` on the last updated frame (template_matching.match_entry_all).
+        Unchanged frames reuse the previous hits; otherwise only the changed area is
+        re-matched and merged with the previous hits lying outside it.
+        """
+        entry = self.templates[name]
+        img_cv = self._view(img_cv, entry)
+        key = (name, 'all')
+        prev = self._results.get(key)
+        dirty = self._dirty.get(key)
+        floor = threshold if extra_threshold is None else min(threshold, extra_threshold)
+
+        if prev is None or dirty is None:
+            self._count('full')
+            result = match_entry_all(img_cv, entry, threshold, max_hits, extra_threshold, method=method,
+                                     img_small=self._small(img_cv, entry))
+        elif not dirty.any():
+            self._count('reused')
+            result = prev
+        else:
+            self._count('partial')
+            x0, y0, x1, y1 = self.detector.tiles_bbox(dirty)
+            kept = [h for h in prev
+                    if not (h[1][0] < x1 and h[1][0] + h[2][0] > x0 and h[1][1] < y1 and h[1][1] + h[2][1] > y0)]
+            max_w = max(level[2] for level in entry['pyramid'])
+            max_h = max(level[3] for level in entry['pyramid'])
+            rx0, ry0 = max(0, x0 - max_w + 1), max(0, y0 - max_h + 1)
+            rx1, ry1 = min(img_cv.shape[1], x1 + max_w - 1), min(img_cv.shape[0], y1 + max_h - 1)
+            found = match_entry_all(img_cv[ry0:ry1, rx0:rx1], entry, floor, max_hits, floor, method=method)
+            found = [(val, (x + rx0, y + ry0), size) for val, (x, y), size in found]
+            result = select_hits(kept + found, threshold, max_hits, extra_threshold)
+
+        self._results[key] = result
+        if self.detector.grid is not None:
+            self._dirty[key] = self.detector.empty_mask()
+        return result
@@ -0,0 +1,110 @@
+"""
+Colour pre-screen: skip templates whose colours are not on the frame.
+
+Rats and squirrels are absent from most frames, yet each absence costs a full
+multi-scale cv2.matchTemplate. ColorScreen computes one coarse colour histogram
+(`bins` levels per channel) of the frame and, per template, the histogram of the
+needle's (masked) pixels at its smallest pyramid scale. A template is matched
+only when the frame holds at least `min_fraction` of the needle's colour mass
+(histogram intersection); otherwise it is skipped outright. Both histograms are
+absolute pixel counts compared bin for bin: one on-screen instance puts at
+least the needle's own counts into its exact bins, so a frame short of them in
+those bins cannot hold it. `min_fraction` leaves room for pixels that scaling or
+compression pushes over a bin edge.
+
+`stats` counts, per template, the frames checked and skipped and the time spent
+screening; `report()` formats them. Measure skips and false negatives on a
+recording with:
+    python world_5/replay_gaming.py SESSION --check-color-screen
+"""
+import threading
+import time
+
+import cv2
+import numpy as np
+
+
+DEFAULT_BINS = 8
+DEFAULT_MIN_FRACTION = 0.5
+MIN_BIN_SHARE = 0.01  # needle colours below this share of its pixels are noise, not characteristic
+
+
+def color_hist(img_bgr, bins=DEFAULT_BINS, mask=None):
+    """(bins, bins, bins) float32 pixel counts of a BGR image."""
+    return cv2.calcHist([np.ascontiguousarray(img_bgr[:, :, :3])], [0, 1, 2], mask, [bins] * 3, [0, 256] * 3)
+
+
+class ColorScreen:
+    def __init__(self, templates, names=None, bins=DEFAULT_BINS, min_fraction=DEFAULT_MIN_FRACTION, per_fraction=None):
+        """
+        templates: name -> template entry (dict or TemplateRegistry).
+        names: templates that are screened (None = all).
+        min_fraction / per_fraction: share of the needle's colour mass the frame must hold.
+        """
+        self.templates = templates
+        self.names = set(names) if names is not None else None
+        self.bins = bins
+        self.min_fraction = min_fraction
+        self.per_fraction = per_fraction or {}
+        self._needles = {}
+        self._lock = threading.Lock()
+        self.stats = {}
+
+    def applies(self, name):
+        return self.names is None or name in self.names
+
+    def _needle(self, name):
+        """(bin indices, counts) of the needle's characteristic colours at its smallest scale."""
+        needle = self._needles.get(name)
+        if needle is not None:
+            return needle
+        entry = self.templates[name]
+        pyramid = entry['pyramid']
+        i = min(range(len(pyramid)), key=lambda k: pyramid[k][2] * pyramid[k][3])
+        _, tpl, w, h = pyramid[i]
+        if entry.get('mode', 'bgr') != 'bgr':
+            tpl = cv2.resize(entry['cv'], (w, h), interpolation=cv2.INTER_AREA)  # the pyramid is single channel
+        masks = entry.get('masks')
+        hist = color_hist(tpl, self.bins, masks[i] if masks else None).ravel()
+        keep = np.flatnonzero(hist >= MIN_BIN_SHARE * hist.sum())
+        needle = (keep, hist[keep])
+        with self._lock:
+            self._needles[name] = needle
+        return needle
+
+    def frame_hist(self, frame):
+        return color_hist(frame, self.bins).ravel()
+
+    def fraction(self, hist, name):
+        """Share of `name`'s colour mass present in the frame histogram, bin for bin."""
+        keep, counts = self._needle(name)
+        total = counts.sum()
+        return float(np.minimum(hist[keep], counts).sum() / total) if total else 1.0
+
+    def screen(self, frame, names):
+        """Splits `names` into (to match, skipped) for `frame` (BGR ndarray)."""
+        screened = [n for n in names if self.applies(n)]
+        if not screened:
+            return list(names), []
+        t0 = time.perf_counter()
+        hist = self.frame_hist(frame)
+        skipped = {n for n in screened if self.fraction(hist, n) < self.per_fraction.get(n, self.min_fraction)}
+        elapsed = time.perf_counter() - t0
+        with self._lock:
+            for n in screened:
+                s = self.stats.setdefault(n, {'checked': 0, 'skipped': 0, 'seconds': 0.0})
+                s['checked'] += 1
+                s['skipped'] += n in skipped
+                s['seconds'] += elapsed / len(screened)
+        return [n for n in names if n not in skipped], [n for n in names if n in skipped]
+
+    def report(self):
+        """One line per template: skip rate and average screening cost."""
+        lines = []
+        with self._lock:
+            stats = {name: dict(s) for name, s in self.stats.items()}
+        for name, s in sorted(stats.items()):
+            rate = 100.0 * s['skipped'] / s['checked'] if s['checked'] else 0.0
+            ms = s['seconds'] * 1000.0 / s['checked'] if s['checked'] else 0.0
+            lines.append(f"{name:<18} skipped {s['skipped']}/{s['checked']} ({rate:.0f}%) {ms:.3f} ms")
+        return lines
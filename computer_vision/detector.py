@@ -0,0 +1,243 @@
+"""
+Single-pass multi-template detector.
+
+`Detector.detect(frame, names)` runs every template x scale match for one frame
+concurrently on a thread pool (cv2.matchTemplate releases the GIL) and returns
+one consolidated result:
+    {name: [Detection, ...]}   # empty list when the template is not present
+
+Per-template matching time for the last call is kept in `last_timings`
+(seconds of matching work, summed over scales) and the wall time of the whole
+call in `last_wall`.
+
+When a change_detector.CachedMatcher is passed, each template is matched through
+it instead (one task per template), so unchanged screens are still skipped.
+
+Templates loaded with a coarse-to-fine factor are matched per scale with
+template_matching.match_level_coarse. Conversions to each template's matching
+mode (colour, grayscale or one channel) and downsampled copies are made once per
+frame with template_matching.FrameViews and shared by all templates.
+
+With a scale_memory.ScaleMemory (and no matcher), each template is matched in one
+task that tries the learned scale first and stops at a confident score.
+
+With a spatial_prior.SpatialPrior, templates it applies to are first searched in
+small windows around their recent hits; only misses go on to the full-frame scan,
+and every hit is fed back into the prior.
+
+Templates listed in `multi` ({name: (max_hits, extra_threshold)}) report every
+instance on the frame (template_matching.match_entry_all, non-maximum suppressed)
+instead of only the best one, in one task each. With a matcher they go through
+CachedMatcher.match_all, so unchanged frames and areas are still skipped; coarse-to-fine
+templates refine several coarse peaks per scale. They bypass the scale memory and the
+spatial prior, which only track a single best hit (every scale is matched, since
+instances may differ in size).
+
+With a color_screen.ColorScreen, templates whose colours are not on the frame are
+reported absent without being matched at all.
+"""
+import os
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+import cv2
+
+from computer_vision.template_matching import FrameViews, match_entry_all, match_level_coarse, match_template, usable
+
+
+class Detection(namedtuple('Detection', 'name x y w h score scale')):
+    """A template hit; (x, y) is the top-left corner in frame coordinates."""
+    __slots__ = ()
+
+    def center(self, origin=(0, 0)):
+        """Center in screen coordinates, given the screen position of the frame's top-left corner."""
+        return origin[0] + self.x + self.w // 2, origin[1] + self.y + self.h // 2
+
+
+def _match_level(img_cv, tpl_scaled, method, mask):
+    t0 = time.perf_counter()
+    res = match_template(img_cv, tpl_scaled, method, mask)
+    _, max_val, _, max_loc = cv2.minMaxLoc(res)
+    return max_val, max_loc, time.perf_counter() - t0
+
+
+def _match_level_coarse(img_cv, img_small, tpl_scaled, tpl_small, factor, method, mask):
+    t0 = time.perf_counter()
+    max_val, max_loc = match_level_coarse(img_cv, img_small, tpl_scaled, tpl_small, factor, method=method, mask=mask)
+    return max_val, max_loc, time.perf_counter() - t0
+
+
+def _match_adaptive(memory, img_cv, entry, name, img_small):
+    t0 = time.perf_counter()
+    best_val, best_loc, best_size = memory.match(img_cv, entry, name, img_small)
+    return best_val, best_loc, best_size, time.perf_counter() - t0
+
+
+def _match_all(img_cv, entry, threshold, max_hits, extra_threshold, method, img_small):
+    t0 = time.perf_counter()
+    hits = match_entry_all(img_cv, entry, threshold, max_hits, extra_threshold, method=method, img_small=img_small)
+    return hits, time.perf_counter() - t0
+
+
+def _match_all_cached(matcher, img_cv, name, threshold, max_hits, extra_threshold, method):
+    t0 = time.perf_counter()
+    hits = matcher.match_all(img_cv, name, threshold, max_hits, extra_threshold, method)
+    return hits, time.perf_counter() - t0
+
+
+def _match_prior(prior, img_cv, entry, name, threshold, scale_memory):
+    t0 = time.perf_counter()
+    result = prior.match(img_cv, entry, name, threshold, scale_memory)
+    return result, time.perf_counter() - t0
+
+
+def _match_cached(matcher, img_cv, name):
+    t0 = time.perf_counter()
+    best_val, best_loc, best_size = matcher.match(img_cv, name)
+    return best_val, best_loc, best_size, time.perf_counter() - t0
+
+
+class Detector:
+    def __init__(self, templates, per_thresholds, default_threshold=0.1, max_workers=None,
+                 matcher=None, method=cv2.TM_CCOEFF_NORMED, scale_memory=None, spatial_prior=None, multi=None,
+                 color_screen=None):
+        self.templates = templates
+        self.per_thresholds = per_thresholds
+        self.default_threshold = default_threshold
+        self.matcher = matcher
+        self.method = method
+        self.scale_memory = scale_memory
+        self.spatial_prior = spatial_prior
+        self.multi = multi or {}
+        self.color_screen = color_screen
+        self.pool = ThreadPoolExecutor(max_workers=max_workers or os.cpu_count() or 4,
+                                       thread_name_prefix='detector')
+        self.last_timings = {}
+        self.last_wall = 0.0
+        self._lock = threading.Lock()
+
+    def threshold(self, name):
+        return self.per_thresholds.get(name, self.default_threshold)
+
+    def detect(self, frame, names):
+        """Returns {name: [Detection]} for `names` on `frame` (BGR ndarray)."""
+        start = time.perf_counter()
+        names = [n for n in names if usable(self.templates.get(n))]
+        results = {}
+        timings = {}
+        prior = self.spatial_prior
+        roi_time = {}
+        views = FrameViews(frame)
+
+        if self.color_screen is not None:
+            names, skipped = self.color_screen.screen(frame, names)
+            for name in skipped:
+                results[name] = []
+
+        if self.multi:
+            futures = {}
+            for name in names:
+                if name in self.multi:
+                    max_hits, extra_threshold = self.multi[name]
+                    if self.matcher is not None:
+                        futures[name] = self.pool.submit(_match_all_cached, self.matcher, frame, name,
+                                                         self.threshold(name), max_hits, extra_threshold, self.method)
+                        continue
+                    img, small = views.for_entry(self.templates[name])
+                    futures[name] = self.pool.submit(_match_all, img, self.templates[name], self.threshold(name),
+                                                     max_hits, extra_threshold, self.method, small)
+            for name, fut in futures.items():
+                hits, elapsed = fut.result()
+                timings[name] = elapsed
+                w = float(self.templates[name]['w'])
+                results[name] = [Detection(name, loc[0], loc[1], size[0], size[1], val, size[0] / w) for val, loc, size in hits]
+            names = [n for n in names if n not in futures]
+
+        if prior is not None:
+            futures = {}
+            for name in names:
+                if prior.applies(name):
+                    entry = self.templates[name]
+                    futures[name] = self.pool.submit(_match_prior, prior, views.get(entry.get('mode', 'bgr')), entry, name,
+                                                     self.threshold(name), self.scale_memory)
+            for name, fut in futures.items():
+                result, elapsed = fut.result()
+                timings[name] = roi_time[name] = elapsed
+                if result is None:
+                    if prior.rois(name, frame.shape):
+                        prior.count(name, 'roi', False, elapsed)
+                    continue
+                prior.count(name, 'roi', True, elapsed)
+                best_val, best_loc, best_size = result
+                scale = best_size[0] / float(self.templates[name]['w'])
+                results[name] = [Detection(name, best_loc[0], best_loc[1], best_size[0], best_size[1], best_val, scale)]
+            names = [n for n in names if n not in results]
+
+        if self.matcher is not None or self.scale_memory is not None:
+            if self.matcher is not None:
+                futures = {name: self.pool.submit(_match_cached, self.matcher, frame, name) for name in names}
+            else:
+                futures = {}
+                for name in names:
+                    entry = self.templates[name]
+                    img, small = views.for_entry(entry)
+                    futures[name] = self.pool.submit(_match_adaptive, self.scale_memory, img, entry, name, small)
+            for name, fut in futures.items():
+                best_val, best_loc, best_size, elapsed = fut.result()
+                timings[name] = timings.get(name, 0.0) + elapsed
+                results[name] = []
+                if best_loc is not None and best_val >= self.threshold(name):
+                    scale = best_size[0] / float(self.templates[name]['w'])
+                    results[name].append(Detection(name, best_loc[0], best_loc[1], best_size[0], best_size[1], best_val, scale))
+        else:
+            futures = {}
+            for name in names:
+                entry = self.templates[name]
+                coarse = entry.get('coarse')
+                masks = entry.get('masks')
+                img, small = views.for_entry(entry)
+                for i, (scale, tpl_scaled, new_w, new_h) in enumerate(entry['pyramid']):
+                    mask = masks[i] if masks else None
+                    if new_w > frame.shape[1] or new_h > frame.shape[0]:
+                        continue
+                    key = (name, scale, new_w, new_h)
+                    if coarse:
+                        factor, coarse_levels = coarse
+                        tpl_small = coarse_levels[i][1]
+                        if tpl_small.shape[1] <= small.shape[1] and tpl_small.shape[0] <= small.shape[0]:
+                            futures[key] = self.pool.submit(_match_level_coarse, img, small, tpl_scaled, tpl_small, factor, self.method, mask)
+                            continue
+                    futures[key] = self.pool.submit(_match_level, img, tpl_scaled, self.method, mask)
+            best = {}
+            for (name, scale, new_w, new_h), fut in futures.items():
+                max_val, max_loc, elapsed = fut.result()
+                timings[name] = timings.get(name, 0.0) + elapsed
+                if max_loc is None:
+                    continue
+                # strict > keeps the first scale on ties, like match_pyramid
+                if name not in best or max_val > best[name][0]:
+                    best[name] = (max_val, max_loc, new_w, new_h, scale)
+            for name in names:
+                results[name] = []
+                if name in best:
+                    max_val, max_loc, new_w, new_h, scale = best[name]
+                    if max_val >= self.threshold(name):
+                        results[name].append(Detection(name, max_loc[0], max_loc[1], new_w, new_h, max_val, scale))
+
+        if prior is not None:
+            for name in names:  # templates that went to the full scan
+                if prior.applies(name):
+                    prior.count(name, 'full', bool(results[name]), timings.get(name, 0.0) - roi_time.get(name, 0.0))
+            for name, dets in results.items():
+                if dets and prior.applies(name):
+                    prior.record(name, (dets[0].x, dets[0].y, dets[0].w, dets[0].h))
+
+        with self._lock:
+            self.last_timings = timings
+            self.last_wall = time.perf_counter() - start
+        return results
+
+    def close(self):
+        self.pool.shutdown(wait=False)
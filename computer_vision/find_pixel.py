@@ -2,6 +2,8 @@ import pyautogui
 import json
 import time
 
+from computer_vision.capture import grab
+
 def get_pixel_info():
     # Get screen size for relative positions
     screen_width, screen_height = pyautogui.size()
@@ -10,7 +12,8 @@ def get_pixel_info():
     try:
         while True:
             x, y = pyautogui.position()
-            pixel_color = pyautogui.screenshot().getpixel((x, y))
+            b, g, r = grab((x, y, 1, 1))[0, 0]
+            pixel_color = (int(r), int(g), int(b))
             
             # Calculate relative positions
             #rel_x = round(x / screen_width, 4)
@@ -0,0 +1,80 @@
+"""
+Per-tick screen frame cache.
+
+A capture is taken at most once per tick and kept as a NumPy array, so repeated
+pixel checks read from memory instead of doing a full OS capture round-trip each.
+A tick lasts until `invalidate()` is called or `ttl` seconds have passed, whichever
+comes first. Call `invalidate()` after any input that can change the screen
+(clicks, key presses) so stale frames are never trusted.
+"""
+import threading
+import time
+
+from computer_vision import capture
+
+
+DEFAULT_TTL = 0.25  # seconds; None keeps a frame until invalidate() is called
+
+
+class FrameCache:
+    def __init__(self, ttl=DEFAULT_TTL):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._frame = None
+        self._region = None
+        self._taken_at = 0.0
+
+    def _is_fresh(self):
+        if self._frame is None:
+            return False
+        if self.ttl is None:
+            return True
+        return (time.monotonic() - self._taken_at) <= self.ttl
+
+    def _covers(self, region):
+        cx, cy, cw, ch = self._region
+        x, y, w, h = region
+        return cx <= x and cy <= y and x + w <= cx + cw and y + h <= cy + ch
+
+    def grab(self, region):
+        """
+        Returns a BGR array (h, w, 3) for `region` given as (x, y, w, h).
+        The cached frame is reused when it is still fresh and covers the region;
+        otherwise `region` is captured and becomes the new cached frame.
+        """
+        region = tuple(int(v) for v in region)
+        with self._lock:
+            if not (self._is_fresh() and self._covers(region)):
+                # a copy: capture.grab returns a recycled ring buffer that later grabs overwrite
+                self._frame = capture.grab(region).copy()
+                self._region = region
+                self._taken_at = time.monotonic()
+            frame, (cx, cy, _, _) = self._frame, self._region
+        x, y, w, h = region
+        return frame[y - cy:y - cy + h, x - cx:x - cx + w]
+
+    def get_pixel(self, x, y, region=None):
+        """
+        Returns the (r, g, b) tuple at screen position (x, y).
+        `region` is what gets captured on a cache miss; pass a region that covers
+        every pixel you are about to check so the whole tick costs one capture.
+        """
+        if region is None:
+            region = (x, y, 1, 1)
+        frame = self.grab(region)
+        rx, ry = region[0], region[1]
+        b, g, r = frame[y - ry, x - rx]
+        return int(r), int(g), int(b)
+
+    def invalidate(self):
+        """Drops the cached frame; the next read takes a fresh capture."""
+        with self._lock:
+            self._frame = None
+            self._region = None
+
+
+screen_cache = FrameCache()
+
+
+def invalidate():
+    screen_cache.invalidate()
@@ -1,8 +1,8 @@
 import cv2
-import numpy as np
-import pyautogui
 import json
 
+from computer_vision.capture import grab
+
 def get_region(key):
     with open("computer_vision/regions.json", "r") as f:
         region_data = json.load(f)
@@ -59,8 +59,8 @@ def find_needle_in_region(needle_path, screen_region, region_x=0, region_y=0, re
 def main():
     region = get_region("ping_pong_slider_region")
     region_x, region_y, region_w, region_h = region
-    screen_region = pyautogui.screenshot(region=(region_x, region_y, region_w, region_h))
-    screen_region = cv2.cvtColor(np.array(screen_region), cv2.COLOR_RGB2BGR)
+    # copy so the debug rectangle doesn't draw into a backend-owned buffer
+    screen_region = grab((region_x, region_y, region_w, region_h)).copy()
     needle_path = "computer_vision/images/ping_pong_slider.png"
 
     result = find_needle_in_region(needle_path, screen_region, region_x, region_y, region_w, region_h)
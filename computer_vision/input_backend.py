@@ -0,0 +1,229 @@
+"""
+Mouse/keyboard input backends.
+
+Every backend offers click(x, y), click_burst(x, y, n, interval) and press(key):
+- 'sendinput' : Win32 SendInput through ctypes; a burst is one SendInput call when
+                interval is 0. Used by default on Windows.
+- 'xdotool'   : the xdotool binary (X11); a burst is one xdotool process.
+- 'pyautogui' : pyautogui, without its per-call PAUSE; a burst is one pyautogui call.
+- 'fake'      : records the events instead of sending them (offline runs, tests).
+
+Use `click`/`click_burst`/`press` for the process-wide backend, or
+`create_backend(name)` for a specific one. `python -m computer_vision.input_benchmark`
+compares the achieved clicks/sec.
+"""
+import shutil
+import subprocess
+import sys
+import threading
+import time
+
+# optional input libraries
+try:
+    import pyautogui
+    PYAUTOGUI_AVAILABLE = True
+except Exception:
+    pyautogui = None
+    PYAUTOGUI_AVAILABLE = False
+
+SENDINPUT_AVAILABLE = sys.platform == 'win32'
+XDOTOOL_AVAILABLE = sys.platform.startswith('linux') and shutil.which('xdotool') is not None
+
+
+class PyAutoGuiBackend:
+    name = 'pyautogui'
+
+    def __init__(self):
+        if not PYAUTOGUI_AVAILABLE:
+            raise RuntimeError('pyautogui is not installed. Install with: python -m pip install pyautogui')
+
+    def click(self, x, y):
+        pyautogui.click(x, y, _pause=False)
+
+    def click_burst(self, x, y, n, interval=0.0):
+        pyautogui.click(x, y, clicks=n, interval=interval, _pause=False)
+
+    def press(self, key):
+        pyautogui.press(key, _pause=False)
+
+    def close(self):
+        pass
+
+
+class SendInputBackend:
+    name = 'sendinput'
+
+    def __init__(self):
+        if not SENDINPUT_AVAILABLE:
+            raise RuntimeError('SendInput is only available on Windows')
+        import ctypes
+        from ctypes import wintypes
+
+        class MOUSEINPUT(ctypes.Structure):
+            _fields_ = [('dx', wintypes.LONG), ('dy', wintypes.LONG), ('mouseData', wintypes.DWORD),
+                        ('dwFlags', wintypes.DWORD), ('time', wintypes.DWORD), ('dwExtraInfo', ctypes.c_size_t)]
+
+        class INPUT(ctypes.Structure):
+            _fields_ = [('type', wintypes.DWORD), ('mi', MOUSEINPUT)]
+
+        self._user32 = ctypes.windll.user32
+        # same coordinate space as pyautogui, which saved the locations
+        self._user32.SetProcessDPIAware()
+        self._INPUT = INPUT
+        self._sizeof = ctypes.sizeof(INPUT)
+        down, up = 0x0002, 0x0004  # MOUSEEVENTF_LEFTDOWN / LEFTUP
+        self._events = {}  # n -> prebuilt INPUT array of n down/up pairs
+
+        def build(n):
+            arr = (INPUT * (2 * n))()
+            for i in range(2 * n):
+                arr[i].type = 0  # INPUT_MOUSE
+                arr[i].mi.dwFlags = down if i % 2 == 0 else up
+            return arr
+        self._build = build
+        self._lock = threading.Lock()
+
+    def _send(self, n):
+        with self._lock:
+            events = self._events.get(n)
+            if events is None:
+                events = self._events[n] = self._build(n)
+        self._user32.SendInput(2 * n, events, self._sizeof)
+
+    def click(self, x, y):
+        self._user32.SetCursorPos(int(x), int(y))
+        self._send(1)
+
+    def click_burst(self, x, y, n, interval=0.0):
+        self._user32.SetCursorPos(int(x), int(y))
+        if interval <= 0:
+            self._send(n)
+            return
+        for i in range(n):
+            if i:
+                time.sleep(interval)
+            self._send(1)
+
+    def press(self, key):
+        if not PYAUTOGUI_AVAILABLE:
+            raise RuntimeError('key presses need pyautogui')
+        pyautogui.press(key, _pause=False)
+
+    def close(self):
+        pass
+
+
+class XdotoolBackend:
+    name = 'xdotool'
+
+    def __init__(self):
+        if not XDOTOOL_AVAILABLE:
+            raise RuntimeError('xdotool is not installed (apt install xdotool)')
+
+    def click(self, x, y):
+        subprocess.run(['xdotool', 'mousemove', str(int(x)), str(int(y)), 'click', '1'], check=True)
+
+    def click_burst(self, x, y, n, interval=0.0):
+        subprocess.run(['xdotool', 'mousemove', str(int(x)), str(int(y)), 'click', '--repeat', str(int(n)),
+                        '--delay', str(int(interval * 1000)), '1'], check=True)
+
+    def press(self, key):
+        subprocess.run(['xdotool', 'key', key], check=True)
+
+    def close(self):
+        pass
+
+
+class FakeBackend:
+    """Records (time, kind, x, y, key) events instead of sending input."""
+    name = 'fake'
+
+    def __init__(self):
+        self.events = []
+        self._lock = threading.Lock()
+
+    def _add(self, kind, x=None, y=None, key=None):
+        with self._lock:
+            self.events.append((time.perf_counter(), kind, x, y, key))
+
+    def click(self, x, y):
+        self._add('click', int(x), int(y))
+
+    def click_burst(self, x, y, n, interval=0.0):
+        for i in range(n):
+            if i and interval > 0:
+                time.sleep(interval)
+            self._add('click', int(x), int(y))
+
+    def press(self, key):
+        self._add('press', key=key)
+
+    def clicks(self):
+        """[(x, y), ...] of the recorded clicks, in order."""
+        with self._lock:
+            return [(e[2], e[3]) for e in self.events if e[1] == 'click']
+
+    def close(self):
+        pass
+
+
+BACKENDS = {
+    'sendinput': SendInputBackend,
+    'xdotool': XdotoolBackend,
+    'pyautogui': PyAutoGuiBackend,
+    'fake': FakeBackend,
+}
+
+# Preference order for real input.
+INPUT_BACKENDS = ('sendinput', 'xdotool', 'pyautogui')
+
+
+def available_backends():
+    """Names of the real input backends usable on this machine."""
+    flags = {'sendinput': SENDINPUT_AVAILABLE, 'xdotool': XDOTOOL_AVAILABLE, 'pyautogui': PYAUTOGUI_AVAILABLE}
+    return [name for name in INPUT_BACKENDS if flags[name]]
+
+
+def create_backend(name, **kwargs):
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown input backend '{name}'. Choose from: {', '.join(BACKENDS)}")
+    return BACKENDS[name](**kwargs)
+
+
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def get_backend():
+    """Returns the process-wide backend, creating the preferred available one on first use."""
+    global _backend
+    with _backend_lock:
+        if _backend is None:
+            names = available_backends()
+            if not names:
+                raise RuntimeError('No input backend available. Install pyautogui.')
+            _backend = create_backend(names[0])
+        return _backend
+
+
+def set_backend(backend):
+    """Replaces the process-wide backend; accepts a backend instance or a backend name."""
+    global _backend
+    if isinstance(backend, str):
+        backend = create_backend(backend)
+    with _backend_lock:
+        _backend = backend
+    return backend
+
+
+def click(x, y):
+    get_backend().click(x, y)
+
+
+def click_burst(x, y, n, interval=0.0):
+    """`n` left clicks at (x, y), `interval` seconds apart, with one cursor move."""
+    get_backend().click_burst(x, y, n, interval)
+
+
+def press(key):
+    get_backend().press(key)
@@ -0,0 +1,69 @@
+"""
+Benchmarks the input backends (computer_vision/input_backend.py).
+
+For each backend, sends `--clicks` clicks one call at a time and then as one
+click_burst, and reports the achieved clicks/sec of both. Real backends click
+for real, so they only run with `--at X Y`, a screen position where clicking is
+harmless (an empty part of the desktop); without it only the fake backend runs,
+which measures the Python overhead alone.
+
+Run from the repository root:
+    python -m computer_vision.input_benchmark
+    python -m computer_vision.input_benchmark --at 50 900 --clicks 200
+    python -m computer_vision.input_benchmark --at 50 900 --backends pyautogui sendinput
+"""
+import argparse
+import time
+
+from computer_vision import input_backend
+
+
+def bench_backend(backend, x, y, clicks, interval=0.0):
+    """Returns (single clicks/sec, burst clicks/sec) for `clicks` clicks at (x, y)."""
+    backend.click(x, y)  # warm up
+    start = time.perf_counter()
+    for _ in range(clicks):
+        backend.click(x, y)
+    single = clicks / (time.perf_counter() - start)
+    start = time.perf_counter()
+    backend.click_burst(x, y, clicks, interval)
+    burst = clicks / (time.perf_counter() - start)
+    return single, burst
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark input backends (clicks/sec).')
+    parser.add_argument('--clicks', type=int, default=100, help='clicks per measurement (default 100)')
+    parser.add_argument('--backends', nargs='+', default=None, help='backends to test (default: all available)')
+    parser.add_argument('--at', nargs=2, type=int, metavar=('X', 'Y'), default=None,
+                        help='screen position to click; required for the real backends')
+    parser.add_argument('--interval', type=float, default=0.0, help='seconds between burst clicks (default 0)')
+    args = parser.parse_args()
+
+    names = args.backends or input_backend.available_backends() + ['fake']
+    if args.at is None:
+        skipped = [n for n in names if n != 'fake']
+        if skipped:
+            print(f"Skipping {', '.join(skipped)}: pass --at X Y to click for real")
+        names = [n for n in names if n == 'fake']
+    x, y = args.at or (0, 0)
+
+    print(f'{args.clicks} clicks at ({x},{y}), burst interval {args.interval * 1000.0:.0f} ms')
+    print(f"{'backend':<10} {'single/s':>9} {'burst/s':>9}")
+    for name in names:
+        try:
+            backend = input_backend.create_backend(name)
+        except Exception as e:
+            print(f'{name:<10} unavailable: {e}')
+            continue
+        try:
+            single, burst = bench_backend(backend, x, y, args.clicks, args.interval)
+            print(f'{name:<10} {single:>9.0f} {burst:>9.0f}')
+        except Exception as e:
+            print(f'{name:<10} failed: {e}')
+        finally:
+            backend.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,172 @@
+"""
+Adaptive UI-latency model: post-action delays learned from the screen.
+
+The bots sleep a fixed guess after every click. LatencyModel measures, per
+action type, the time from the click to the first visible change in a region
+(around the click by default) and keeps the last `window` samples. The delay
+after an action is the rolling p95 times `margin`, so the bot waits just long
+enough for this machine and this game state.
+
+Only every `sample_every`-th action of a type is measured; measuring polls the
+screen until it changes, which also serves as that action's delay. A measured
+action with no change within its delay x `backoff_step` counts as a missed click and multiplies
+the action's delay by `backoff_step` (up to `max_backoff`); every measured hit
+eases it back towards 1.
+
+The model is saved as JSON so a restarted bot starts tuned:
+    {"click": {"samples": [0.041, 0.052, ...], "backoff": 1.0}, ...}
+
+Usage:
+    latency = LatencyModel('cache/latency.json', defaults={'click': 0.05})
+    latency.act('click', lambda: pyautogui.click(x, y), around(x, y))
+    latency.save()
+"""
+import json
+import os
+import threading
+import time
+from collections import deque
+
+from computer_vision.wait import screen_changed, wait_until
+
+
+DEFAULT_DELAY = 0.1
+MIN_SAMPLES = 5
+
+
+def percentile(values, q):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q / 100.0 * (len(ordered) - 1) + 0.5))]
+
+
+class LatencyModel:
+    def __init__(self, path=None, defaults=None, window=50, pct=95, margin=1.2, floor=0.01, max_delay=1.0,
+                 sample_every=5, backoff_step=1.5, max_backoff=4.0):
+        """
+        path: JSON file the model is loaded from and saved to (None = in memory only).
+        defaults: {action: seconds} used until an action has MIN_SAMPLES samples.
+        floor / max_delay: bounds of a learned delay; max_delay is also the measuring timeout.
+        """
+        self.path = path
+        self.defaults = defaults or {}
+        self.window = window
+        self.pct = pct
+        self.margin = margin
+        self.floor = floor
+        self.max_delay = max_delay
+        self.sample_every = sample_every
+        self.backoff_step = backoff_step
+        self.max_backoff = max_backoff
+        self._samples = {}
+        self._backoff = {}
+        self._count = {}
+        self._lock = threading.Lock()
+        self.stats = {}
+        if path and os.path.exists(path):
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    for action, entry in json.load(f).items():
+                        self._samples[action] = deque(entry.get('samples', []), maxlen=window)
+                        self._backoff[action] = float(entry.get('backoff', 1.0))
+            except Exception as e:
+                print(f'Ignoring unreadable latency model {path}: {e}')
+
+    def _stat(self, action):
+        return self.stats.setdefault(action, {'actions': 0, 'measured': 0, 'missed': 0})
+
+    def delay(self, action):
+        """Seconds to wait after `action`: p95 of its latencies x margin x backoff, or its default."""
+        with self._lock:
+            samples = list(self._samples.get(action, ()))
+            backoff = self._backoff.get(action, 1.0)
+        if len(samples) < MIN_SAMPLES:
+            base = self.defaults.get(action, DEFAULT_DELAY)
+        else:
+            base = percentile(samples, self.pct) * self.margin
+        return min(self.max_delay, max(self.floor, base * backoff))
+
+    def observe(self, action, seconds):
+        """Adds one click-to-change latency and eases the action's backoff."""
+        with self._lock:
+            self._samples.setdefault(action, deque(maxlen=self.window)).append(round(seconds, 4))
+            self._backoff[action] = max(1.0, self._backoff.get(action, 1.0) ** 0.5)
+            self._stat(action)['measured'] += 1
+
+    def missed(self, action):
+        """Records a click the screen did not react to; the action's delays grow."""
+        with self._lock:
+            self._backoff[action] = min(self.max_backoff, self._backoff.get(action, 1.0) * self.backoff_step)
+            self._stat(action)['missed'] += 1
+
+    def record(self, action, seconds):
+        """Counts an action measured elsewhere (verify.ClickVerifier): `seconds` to the change, or None for no change."""
+        with self._lock:
+            self._stat(action)['actions'] += 1
+        if seconds is None:
+            self.missed(action)
+        else:
+            self.observe(action, seconds)
+
+    def sleep(self, action):
+        time.sleep(self.delay(action))
+
+    def act(self, action, perform, region=None):
+        """
+        Runs `perform()` and waits for the UI. Every `sample_every`-th call (or each of
+        the first MIN_SAMPLES calls without samples yet) with a `region` waits for that
+        region to change, at most `delay(action) x backoff_step`, and learns the latency;
+        the others sleep `delay(action)`. Returns `perform()`'s result.
+        """
+        with self._lock:
+            n = self._count[action] = self._count.get(action, 0) + 1
+            st = self._stat(action)
+            st['actions'] += 1
+            # misses count towards leaving the learning phase too, or a region that never
+            # changes enough would be measured (and waited on) on every call
+            learning = len(self._samples.get(action, ())) < MIN_SAMPLES and st['measured'] + st['missed'] < MIN_SAMPLES
+        if region is None or not (learning or n % self.sample_every == 0):
+            result = perform()
+            self.sleep(action)
+            return result
+        changed = screen_changed(region)  # reference taken before the click
+        start = time.perf_counter()
+        result = perform()
+        # a measurement waits at most one backoff step longer than the current delay
+        timeout = min(self.max_delay, self.delay(action) * self.backoff_step)
+        if wait_until(changed, timeout=timeout, poll_interval=0.005):
+            self.observe(action, time.perf_counter() - start)
+        else:
+            self.missed(action)
+        return result
+
+    def report(self):
+        """One line per action: current delay, p50/p95 latency, measured and missed counts."""
+        lines = []
+        with self._lock:
+            actions = sorted(set(self._samples) | set(self.stats))
+            samples = {a: list(self._samples.get(a, ())) for a in actions}
+            stats = {a: dict(self._stat(a)) for a in actions}
+            backoff = dict(self._backoff)
+        for action in actions:
+            s = samples[action]
+            p50 = f'{percentile(s, 50) * 1000.0:.0f}' if s else '-'
+            p95 = f'{percentile(s, self.pct) * 1000.0:.0f}' if s else '-'
+            st = stats[action]
+            lines.append(f"{action:<14} delay {self.delay(action) * 1000.0:.0f} ms (p50 {p50} / p{self.pct} {p95} ms, "
+                         f"backoff {backoff.get(action, 1.0):.2f}x) measured {st['measured']}/{st['actions']} missed {st['missed']}")
+        return lines
+
+    def save(self):
+        if not self.path:
+            return
+        with self._lock:
+            data = json.dumps({a: {'samples': list(self._samples.get(a, ())), 'backoff': round(self._backoff.get(a, 1.0), 3)}
+                               for a in set(self._samples) | set(self._backoff)}, indent=1, sort_keys=True)
+        try:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            tmp = self.path + '.tmp'
+            with open(tmp, 'w', encoding='utf-8') as f:
+                f.write(data)
+            os.replace(tmp, self.path)
+        except Exception as e:
+            print(f'Could not save latency model {self.path}: {e}')
@@ -0,0 +1,170 @@
+"""
+Detection pipeline driven by saved_mappings/mappings.json.
+
+Each mapping pairs needles with the screen regions they can appear in, as written
+by auxiliary/mapping_maker.py. Both layouts are accepted:
+    {"name": ..., "needle": "saved_images/...png", "region": {"x", "y", "w", "h"}}
+    {"name": ..., "needles": [...], "regions": [{"x", "y", "w", "h", ...}, ...]}
+The pipeline expands them into (needle, region) pairs, captures the bounding box
+of all regions once per tick and matches every needle only inside its own
+region, on a zero-copy view of that one frame.
+
+Usage:
+    pipeline = MappingPipeline.from_file(repo_root)
+    hits = pipeline.tick()                     # {pair name: Detection or None}
+    x, y = hits['Map_1/needle'].center(pipeline.origin)
+
+Run from the repository root to watch the hits and the cost per tick:
+    python -m computer_vision.mapping_pipeline --ticks 50
+"""
+import argparse
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from computer_vision import capture
+from computer_vision.detector import Detection
+from computer_vision.template_matching import DEFAULT_SCALES, load_entry, match_entry, usable
+
+
+DEFAULT_MAPPINGS = os.path.join('saved_mappings', 'mappings.json')
+
+
+def _needle_path(repo_root, needle):
+    # mapping_maker stores paths relative to the repo root with the OS separator it ran on
+    needle = needle.replace('\\', '/').replace('/', os.sep)
+    return needle if os.path.isabs(needle) else os.path.join(repo_root, needle)
+
+
+def load_mappings(path, repo_root):
+    """
+    Returns [{'name', 'needle', 'key', 'region': (x, y, w, h), 'threshold'}, ...], one
+    per needle x region pair (threshold is None unless the mapping sets one).
+    """
+    with open(path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    raw = data.get('mappings', []) if isinstance(data, dict) else data
+    pairs = []
+    for m in raw:
+        needles = m.get('needles') or ([m['needle']] if m.get('needle') else [])
+        regions = m.get('regions') or ([m['region']] if m.get('region') else [])
+        for needle in needles:
+            needle_path = _needle_path(repo_root, needle)
+            key = os.path.splitext(os.path.basename(needle_path))[0]
+            for i, r in enumerate(regions):
+                name = f"{m.get('name', 'mapping')}/{key}" + (f'/{i + 1}' if len(regions) > 1 else '')
+                pairs.append({
+                    'name': name,
+                    'needle': needle_path,
+                    'key': key,
+                    'region': (int(r['x']), int(r['y']), int(r['w']), int(r['h'])),
+                    'threshold': m.get('threshold'),
+                })
+    return pairs
+
+
+def union_region(regions):
+    """Bounding box (x, y, w, h) of several (x, y, w, h) regions."""
+    x0 = min(r[0] for r in regions)
+    y0 = min(r[1] for r in regions)
+    x1 = max(r[0] + r[2] for r in regions)
+    y1 = max(r[1] + r[3] for r in regions)
+    return x0, y0, x1 - x0, y1 - y0
+
+
+class MappingPipeline:
+    def __init__(self, pairs, per_thresholds=None, default_threshold=0.8, scales=DEFAULT_SCALES, cache_dir=None,
+                 max_workers=None):
+        """
+        pairs: from load_mappings. Pairs whose needle cannot be loaded are reported and dropped.
+        per_thresholds: threshold per needle key; a mapping's own "threshold" wins.
+        """
+        self.per_thresholds = per_thresholds or {}
+        self.default_threshold = default_threshold
+        entries = {}
+        self.pairs = []
+        for pair in pairs:
+            if pair['needle'] not in entries:
+                entries[pair['needle']] = load_entry(pair['needle'], scales, cache_dir, key=pair['key'])
+            if not usable(entries[pair['needle']]):
+                print(f"Mapping {pair['name']}: needle {pair['needle']} is missing or unreadable; skipped")
+                continue
+            self.pairs.append(dict(pair, entry=entries[pair['needle']]))
+        self.region = union_region([p['region'] for p in self.pairs]) if self.pairs else None
+        self.origin = self.region[:2] if self.region else (0, 0)
+        # each pair's slice of the union frame, in frame coordinates
+        for pair in self.pairs:
+            x, y, w, h = pair['region']
+            pair['slice'] = (slice(y - self.origin[1], y - self.origin[1] + h), slice(x - self.origin[0], x - self.origin[0] + w))
+        self.pool = ThreadPoolExecutor(max_workers=max_workers or os.cpu_count() or 4, thread_name_prefix='mappings')
+        self.last_timings = {}
+
+    @classmethod
+    def from_file(cls, repo_root, path=None, **kw):
+        return cls(load_mappings(path or os.path.join(repo_root, DEFAULT_MAPPINGS), repo_root), **kw)
+
+    def threshold(self, pair):
+        if pair['threshold'] is not None:
+            return pair['threshold']
+        return self.per_thresholds.get(pair['key'], self.default_threshold)
+
+    def _match(self, frame, pair):
+        t0 = time.perf_counter()
+        view = frame[pair['slice']]  # basic slicing: a view, no copy
+        best_val, best_loc, best_size = match_entry(view, pair['entry'])
+        hit = None
+        if best_loc is not None and best_val >= self.threshold(pair):
+            ys, xs = pair['slice']
+            hit = Detection(pair['name'], best_loc[0] + xs.start, best_loc[1] + ys.start, best_size[0], best_size[1],
+                            best_val, best_size[0] / float(pair['entry']['w']))
+        return hit, time.perf_counter() - t0
+
+    def detect(self, frame):
+        """Matches every pair in its region of `frame` (a capture of self.region); returns {name: Detection or None}."""
+        futures = {pair['name']: self.pool.submit(self._match, frame, pair) for pair in self.pairs}
+        hits, timings = {}, {}
+        for name, fut in futures.items():
+            hits[name], timings[name] = fut.result()
+        self.last_timings = timings
+        return hits
+
+    def tick(self):
+        """Captures the union region once and detects on it."""
+        if not self.pairs:
+            return {}
+        return self.detect(capture.grab(self.region))
+
+    def close(self):
+        self.pool.shutdown(wait=False)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Run the mappings-driven detection pipeline.')
+    parser.add_argument('--mappings', default=DEFAULT_MAPPINGS, help='mappings JSON, relative to the repo root')
+    parser.add_argument('--ticks', type=int, default=20)
+    args = parser.parse_args()
+
+    repo_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+    pipeline = MappingPipeline.from_file(repo_root, os.path.join(repo_root, args.mappings),
+                                         cache_dir=os.path.join(repo_root, 'cache', 'templates'))
+    if not pipeline.pairs:
+        print('No usable mappings.')
+        return
+    x, y, w, h = pipeline.region
+    searched = sum(p['region'][2] * p['region'][3] for p in pipeline.pairs)
+    print(f'{len(pipeline.pairs)} needle/region pair(s); capturing {w}x{h} at ({x},{y}); '
+          f'{searched / float(w * h):.2f}x the capture area searched')
+    try:
+        for i in range(args.ticks):
+            start = time.perf_counter()
+            hits = pipeline.tick()
+            elapsed = (time.perf_counter() - start) * 1000.0
+            found = ', '.join(f'{n}@{d.center(pipeline.origin)} {d.score:.2f}' for n, d in hits.items() if d) or 'none'
+            print(f'tick {i + 1}: {elapsed:.1f} ms, hits: {found}')
+    finally:
+        pipeline.close()
+
+
+if __name__ == '__main__':
+    main()
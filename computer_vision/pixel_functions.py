@@ -1,5 +1,8 @@
-import pyautogui
 import json
+import numpy as np
+
+from computer_vision.frame_cache import screen_cache
+from computer_vision import input_backend
 
 
 PIXEL_DATA = "computer_vision/pixel_data.json"
@@ -7,6 +10,40 @@ with open(PIXEL_DATA, "r") as f:
     pixel_data = json.load(f)
 
 
+def _bounding_region(keys):
+    """Smallest (x, y, w, h) covering the positions of the given pixel_data keys."""
+    xs = [pixel_data[k]['position']['x'] for k in keys]
+    ys = [pixel_data[k]['position']['y'] for k in keys]
+    return (min(xs), min(ys), max(xs) - min(xs) + 1, max(ys) - min(ys) + 1)
+
+
+# Pixels closer than this (in x and y) are captured together on a cache miss.
+CLUSTER_GAP = 128
+
+
+def _clusters(keys, gap=CLUSTER_GAP):
+    """Groups keys whose pixels lie within `gap` of each other (single linkage)."""
+    groups = []
+    for key in keys:
+        x, y = pixel_data[key]['position']['x'], pixel_data[key]['position']['y']
+        near = [g for g in groups if any(abs(x - pixel_data[k]['position']['x']) <= gap and
+                                         abs(y - pixel_data[k]['position']['y']) <= gap for k in g)]
+        merged = [key] + [k for g in near for k in g]
+        groups = [g for g in groups if g not in near] + [merged]
+    return groups
+
+
+# Region captured on a check_pixel cache miss: the bounding box of the key's cluster of
+# nearby pixels, so checks of neighbouring pixels within one tick share one small capture
+# (e.g. the chest and skill-bar pixels) without grabbing the far-away ones too.
+PIXEL_REGIONS = {key: _bounding_region(group) for group in _clusters(pixel_data) for key in group}
+
+# Positions and target colours as arrays, row order follows _KEY_INDEX.
+_KEY_INDEX = {key: i for i, key in enumerate(pixel_data)}
+_POSITIONS = np.array([[v['position']['x'], v['position']['y']] for v in pixel_data.values()], dtype=np.intp)
+_TARGETS = np.array([[v['rgb']['r'], v['rgb']['g'], v['rgb']['b']] for v in pixel_data.values()], dtype=np.int16)
+
+
 def get_pixel_data(key):
     """
     Returns the pixel data for the given key.
@@ -22,6 +59,7 @@ def check_pixel(key, tolerance=0):
     """
     Checks if the specified pixel has the target RGB value (with optional tolerance).
     If so, returns True, otherwise returns False.
+    Reads from the shared frame cache, so back-to-back checks cost one capture.
 
     Args:
       key: The key within pixel_data to check (e.g., "chest_skill_pixel").
@@ -35,8 +73,7 @@ def check_pixel(key, tolerance=0):
     target_rgb = pixel_data[key]['rgb']
     x, y = pos['x'], pos['y']
 
-    screenshot = pyautogui.screenshot(region=(x, y, 1, 1))
-    pixel_rgb = screenshot.getpixel((0, 0))
+    pixel_rgb = screen_cache.get_pixel(x, y, PIXEL_REGIONS[key])
 
     matches = all(
         abs(pixel_rgb[i] - target_rgb[c]) <= tolerance
@@ -50,8 +87,48 @@ def check_pixel(key, tolerance=0):
     return False
 
 
+def check_pixels(keys, tolerance=0):
+    """
+    Checks several pixels against their target RGB values with a single capture.
+
+    Args:
+      keys: Iterable of keys within pixel_data.
+      tolerance: Max per-channel difference; an int for all keys or a dict of key -> int.
+
+    Returns:
+      (matches, distances): dicts of key -> bool and key -> (dr, dg, db).
+      Unknown keys are reported as not matching with distances of None.
+    """
+    keys = list(keys)
+    known = [k for k in keys if k in _KEY_INDEX]
+    matches = {k: False for k in keys}
+    distances = {k: None for k in keys}
+    if not known:
+        return matches, distances
+
+    rows = np.array([_KEY_INDEX[k] for k in known], dtype=np.intp)
+    region = _bounding_region(known)
+    frame = screen_cache.grab(region)
+
+    xy = _POSITIONS[rows] - np.array(region[:2], dtype=np.intp)
+    observed = frame[xy[:, 1], xy[:, 0], ::-1].astype(np.int16)  # BGR -> RGB
+    diff = np.abs(observed - _TARGETS[rows])
+
+    if isinstance(tolerance, dict):
+        tol = np.array([tolerance.get(k, 0) for k in known], dtype=np.int16)
+    else:
+        tol = np.full(len(known), tolerance, dtype=np.int16)
+    ok = (diff <= tol[:, None]).all(axis=1)
+
+    for i, k in enumerate(known):
+        matches[k] = bool(ok[i])
+        distances[k] = tuple(int(d) for d in diff[i])
+    return matches, distances
+
+
 def click_pixel(key):
-    pyautogui.click(pixel_data[key]['position']['x'], pixel_data[key]['position']['y'])
+    input_backend.click(pixel_data[key]['position']['x'], pixel_data[key]['position']['y'])
+    screen_cache.invalidate()
 
 
 
@@ -0,0 +1,318 @@
+"""
+Pixel signatures: a handful of screen pixels that identify a needle, as a fast presence check.
+
+A full multi-scale template match is a lot of work to answer "is the log minigame
+still open?". A signature answers it from k pixel reads: the needle's pixels at
+the screen position it always appears at, chosen so that frames without the
+needle disagree with them. Pixels are stored in the shape of
+computer_vision/pixel_data.json, plus a per-pixel tolerance:
+    {"needle": "log_minigame", "absent_min": 2,
+     "pixels": {"log_minigame_0": {"position": {"x", "y", "relative_x"}, "rgb": {"r", "g", "b"},
+                                   "tolerance": 12}, ...}}
+
+`check` returns True when every pixel matches, False when at least `absent_min`
+pixels disagree and None in between - the ambiguous case the caller settles with
+a template match.
+
+Derive one from recorded sessions (frames where the template matches are the
+positives, frames where it clearly does not are the negatives) or, without
+recordings, from the screen while the needle is visible:
+    python -m computer_vision.pixel_signature log_minigame --session saved_sessions/run1
+    python -m computer_vision.pixel_signature log_minigame --live --region 135 107 1282 744
+
+The result is written to saved_signatures/<needle>.json.
+"""
+import argparse
+import json
+import os
+import threading
+from collections import Counter
+
+import numpy as np
+
+from computer_vision import capture
+from computer_vision.template_matching import DEFAULT_SCALES, load_entry, match_entry
+
+
+SIGNATURES_DIR = 'saved_signatures'
+SCREEN_WIDTH = 1920  # relative_x in pixel_data.json is x / 1920
+
+
+class PixelSignature:
+    def __init__(self, name, pixels, absent_min=2):
+        """pixels: {key: pixel_data entry with 'tolerance'}; absent_min: mismatches that mean "absent"."""
+        self.name = name
+        self.pixels = pixels
+        self.absent_min = max(1, min(absent_min, len(pixels)))
+        values = list(pixels.values())
+        self.xs = np.array([v['position']['x'] for v in values], dtype=np.intp)
+        self.ys = np.array([v['position']['y'] for v in values], dtype=np.intp)
+        self.bgr = np.array([[v['rgb']['b'], v['rgb']['g'], v['rgb']['r']] for v in values], dtype=np.int16)
+        self.tolerance = np.array([v.get('tolerance', 0) for v in values], dtype=np.int16)[:, None]
+        self.region = (int(self.xs.min()), int(self.ys.min()),
+                       int(self.xs.max() - self.xs.min()) + 1, int(self.ys.max() - self.ys.min()) + 1)
+        self._lock = threading.Lock()
+        self.stats = {'present': 0, 'absent': 0, 'ambiguous': 0}
+
+    def mismatches(self, frame, origin=(0, 0)):
+        """Number of pixels that disagree on `frame` (a BGR capture at `origin`), or None if any falls outside it."""
+        xs = self.xs - origin[0]
+        ys = self.ys - origin[1]
+        h, w = frame.shape[:2]
+        if xs.min() < 0 or ys.min() < 0 or xs.max() >= w or ys.max() >= h:
+            return None
+        diff = np.abs(frame[ys, xs, :3].astype(np.int16) - self.bgr)
+        return int(np.count_nonzero((diff > self.tolerance).any(axis=1)))
+
+    def check(self, frame, origin=(0, 0)):
+        """True (present), False (absent) or None (ambiguous: fall back to a template match)."""
+        misses = self.mismatches(frame, origin)
+        if misses is None:
+            result = None
+        elif misses == 0:
+            result = True
+        elif misses >= self.absent_min:
+            result = False
+        else:
+            result = None
+        with self._lock:
+            self.stats['ambiguous' if result is None else 'present' if result else 'absent'] += 1
+        return result
+
+    def check_screen(self):
+        """`check` on a capture of just the signature's bounding box."""
+        return self.check(capture.grab(self.region), self.region[:2])
+
+    def to_json(self):
+        return {'needle': self.name, 'absent_min': self.absent_min, 'pixels': self.pixels}
+
+
+def signature_path(repo_root, name):
+    return os.path.join(repo_root, SIGNATURES_DIR, name.replace('/', os.sep) + '.json')
+
+
+def load_signature(repo_root, name):
+    """The saved signature for needle `name`, or None when there is none (or it is unreadable)."""
+    path = signature_path(repo_root, name)
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        return PixelSignature(data.get('needle', name), data['pixels'], data.get('absent_min', 2))
+    except Exception as e:
+        print(f'Ignoring unreadable pixel signature {path}: {e}')
+        return None
+
+
+def save_signature(repo_root, signature):
+    path = signature_path(repo_root, signature.name)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(signature.to_json(), f, indent=2)
+    return path
+
+
+def _stable(crops, tolerance):
+    """(h, w) bool: pixels equal (within tolerance) on every positive and to their 8 neighbours."""
+    ref = np.median(crops, axis=0).astype(np.int16)
+    ok = (np.abs(crops.astype(np.int16) - ref) <= tolerance).all(axis=(0, 3))
+    h, w = ok.shape
+    for dy in (-1, 0, 1):
+        for dx in (-1, 0, 1):
+            if dx == dy == 0:
+                continue
+            shifted = np.roll(np.roll(ref, dy, axis=0), dx, axis=1)
+            ok &= (np.abs(shifted - ref) <= tolerance).all(axis=2)
+    # a one pixel shift of the needle must not move a chosen pixel off it
+    ok[0, :] = ok[-1, :] = False
+    ok[:, 0] = ok[:, -1] = False
+    return ref, ok
+
+
+def _spread(candidates, ref, k, chosen=()):
+    """Farthest-point sampling over (position, colour) among `candidates` [(y, x), ...]."""
+    chosen = list(chosen)
+    if not candidates:
+        return chosen
+    feats = np.array([[y, x] + list(ref[y, x]) for y, x in candidates], dtype=np.float64)
+    if not chosen:
+        # start from the colour farthest from the needle's mean colour
+        colours = feats[:, 2:]
+        chosen.append(candidates[int(np.argmax(np.abs(colours - colours.mean(axis=0)).sum(axis=1)))])
+    index = {c: i for i, c in enumerate(candidates)}
+    dist = np.full(len(candidates), np.inf)
+    for c in chosen:
+        if c in index:
+            dist = np.minimum(dist, np.abs(feats - feats[index[c]]).sum(axis=1))
+    while len(chosen) < k:
+        i = int(np.argmax(dist))
+        if dist[i] <= 0:
+            break
+        chosen.append(candidates[i])
+        dist = np.minimum(dist, np.abs(feats - feats[i]).sum(axis=1))
+    return chosen
+
+
+def derive(name, origin, positives, negatives=(), tolerance=12, redundancy=2, min_pixels=4, max_pixels=12, mask=None):
+    """
+    Picks the signature pixels for a needle drawn at screen position `origin`.
+
+    positives: BGR crops of the needle as it appears on screen (same size).
+    negatives: crops of the same screen rectangle without the needle.
+    Pixels are greedily added until every negative disagrees with `redundancy` of them
+    (so one noisy pixel never reads as "absent"), then spread out to `min_pixels`.
+    Returns a PixelSignature, or None when no pixel is stable enough.
+    """
+    crops = np.stack([p[:, :, :3] for p in positives])
+    ref, ok = _stable(crops, tolerance)
+    if mask is not None:
+        ok &= mask > 0
+    candidates = [tuple(c) for c in np.argwhere(ok)]
+    if not candidates:
+        return None
+
+    chosen = []
+    if len(negatives):
+        negs = np.stack([n[:, :, :3] for n in negatives]).astype(np.int16)
+        ys = np.array([c[0] for c in candidates])
+        xs = np.array([c[1] for c in candidates])
+        # rejects[i, j]: candidate i disagrees with negative j
+        rejects = (np.abs(negs[:, ys, xs] - ref[ys, xs]) > tolerance).any(axis=2).T
+        need = np.full(len(negatives), redundancy)
+        used = np.zeros(len(candidates), bool)
+        while len(chosen) < max_pixels and (need > 0).any():
+            gain = (rejects & (need > 0)).sum(axis=1)
+            gain[used] = -1
+            i = int(np.argmax(gain))
+            if gain[i] <= 0:
+                break
+            used[i] = True
+            chosen.append(candidates[i])
+            need -= rejects[i]
+    chosen = _spread(candidates, ref, max(min_pixels, len(chosen)), chosen)[:max_pixels]
+
+    pixels = {}
+    for i, (y, x) in enumerate(chosen):
+        b, g, r = (int(v) for v in ref[y, x])
+        sx, sy = origin[0] + int(x), origin[1] + int(y)
+        pixels[f'{name}_{i}'] = {
+            'position': {'x': sx, 'y': sy, 'relative_x': round(sx / float(SCREEN_WIDTH), 4)},
+            'rgb': {'r': r, 'g': g, 'b': b},
+            'tolerance': tolerance,
+        }
+    absent_min = redundancy if len(negatives) else (len(pixels) + 1) // 2
+    return PixelSignature(name, pixels, absent_min)
+
+
+def _locate(frame, region, entry):
+    """(score, (x, y, w, h)) of the needle's best match inside `region` of `frame`, in frame coordinates."""
+    x, y, w, h = region
+    best_val, best_loc, best_size = match_entry(frame[y:y + h, x:x + w], entry)
+    if best_loc is None:
+        return best_val, None
+    return best_val, (x + best_loc[0], y + best_loc[1]) + tuple(best_size)
+
+
+def _session_frames(session_dirs):
+    from computer_vision.recorder import SessionReader
+    for d in session_dirs:
+        for event, frame in SessionReader(d).frames():
+            yield tuple(event['region'][:2]), frame
+
+
+def collect(entry, frames, region, threshold):
+    """Splits screen frames into needle crops (positives) and crops of the same rectangle without it."""
+    scored = []
+    for origin, frame in frames:
+        local = (region[0] - origin[0], region[1] - origin[1], region[2], region[3])
+        if local[0] < 0 or local[1] < 0 or local[0] + local[2] > frame.shape[1] or local[1] + local[3] > frame.shape[0]:
+            continue
+        score, box = _locate(frame, local, entry)
+        scored.append((origin, frame, score, box))
+    hits = [(o, b) for o, _, s, b in scored if b is not None and s >= threshold]
+    if not hits:
+        return None, [], []
+    # the signature is tied to one screen rectangle: the most common one among the hits
+    (sx, sy, w, h), _ = Counter((o[0] + b[0], o[1] + b[1], b[2], b[3]) for o, b in hits).most_common(1)[0]
+    positives, negatives = [], []
+    for origin, frame, score, box in scored:
+        crop = frame[sy - origin[1]:sy - origin[1] + h, sx - origin[0]:sx - origin[0] + w]
+        if box is not None and score >= threshold and (origin[0] + box[0], origin[1] + box[1]) == (sx, sy):
+            positives.append(crop)
+        elif score < threshold * 0.75:
+            negatives.append(crop)
+    return (sx, sy, w, h), positives, negatives
+
+
+def evaluate(signature, origin, positives, negatives):
+    """{'positives': Counter of check results, 'negatives': ...} on the derivation crops."""
+    result = {}
+    for label, crops in (('positives', positives), ('negatives', negatives)):
+        result[label] = Counter(signature.check(c, origin) for c in crops)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Derive a pixel signature for a needle.')
+    parser.add_argument('needle', help='needle name, e.g. log_minigame')
+    parser.add_argument('--folder', default=os.path.join('saved_images', 'gaming'), help='needle folder, relative to the repo root')
+    parser.add_argument('--region', nargs=4, type=int, metavar=('X', 'Y', 'W', 'H'),
+                        help='screen region the needle appears in (default: saved_regions/gaming_region.json)')
+    parser.add_argument('--session', nargs='*', default=[], help='recorded session directories to learn from')
+    parser.add_argument('--live', action='store_true', help='learn from one screen capture (needle must be visible)')
+    parser.add_argument('--threshold', type=float, default=0.8, help='template score that counts as "present"')
+    parser.add_argument('--tolerance', type=int, default=12, help='max per-channel difference of a matching pixel')
+    parser.add_argument('--redundancy', type=int, default=2, help='pixels that must disagree on every negative')
+    parser.add_argument('--max-pixels', type=int, default=12)
+    args = parser.parse_args()
+
+    repo_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+    region = args.region
+    if region is None:
+        with open(os.path.join(repo_root, 'saved_regions', 'gaming_region.json'), 'r', encoding='utf-8') as f:
+            r = json.load(f)['region']
+        region = (r['x'], r['y'], r['w'], r['h'])
+    region = tuple(region)
+
+    entry = load_entry(os.path.join(repo_root, args.folder, args.needle + '.png'), DEFAULT_SCALES,
+                       os.path.join(repo_root, 'cache', 'templates'), key=args.needle)
+    if entry.get('missing'):
+        print(f"Needle {args.needle} not found in {args.folder}")
+        return
+
+    if args.live:
+        frames = [(region[:2], capture.grab(region))]
+    elif args.session:
+        frames = _session_frames(args.session)
+    else:
+        print('Pass --session DIR ... or --live.')
+        return
+
+    box, positives, negatives = collect(entry, frames, region, args.threshold)
+    if box is None:
+        print(f'{args.needle} never matched at >= {args.threshold}; nothing to learn from.')
+        return
+    mask = None
+    if entry.get('masks'):
+        for (_, _, w, h), level_mask in zip(entry['pyramid'], entry['masks']):
+            if (w, h) == box[2:] and level_mask is not None:
+                mask = level_mask
+    signature = derive(args.needle, box[:2], positives, negatives, args.tolerance, args.redundancy,
+                       max_pixels=args.max_pixels, mask=mask)
+    if signature is None:
+        print(f'No pixel of {args.needle} is stable across {len(positives)} capture(s) at tolerance {args.tolerance}.')
+        return
+    print(f'{args.needle} at {box}: {len(positives)} positive / {len(negatives)} negative capture(s); '
+          f'{len(signature.pixels)} pixel(s), absent when >= {signature.absent_min} disagree')
+    for label, counts in evaluate(signature, box[:2], positives, negatives).items():
+        total = sum(counts.values())
+        if total:
+            print(f'  {label}: present {counts[True]}, absent {counts[False]}, ambiguous {counts[None]} of {total}')
+    if not negatives:
+        print('  no negatives seen: pixels were spread for coverage only; re-derive from a session to validate')
+    print(f'Wrote {save_signature(repo_root, signature)}')
+
+
+if __name__ == '__main__':
+    main()
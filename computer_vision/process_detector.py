@@ -0,0 +1,281 @@
+"""
+Process-pool detector for CPU-bound full-region scans.
+
+cv2.matchTemplate releases the GIL, but the thread pool in detector.Detector
+still shares one interpreter for the Python glue and the result handling. For
+the periodic full sweep (squirrels and rats on the whole gaming region),
+ProcessDetector splits the frame into overlapping tiles and spreads every
+tile x template x scale match over worker processes instead.
+
+The frame is copied once per call into a multiprocessing.shared_memory block
+that the workers map, so no pixels are pickled; templates are sent to each
+worker once, when the pool starts. Tiles overlap by the largest template size,
+so every match position lies wholly inside at least one tile. Results merge
+into the same {name: [Detection, ...]} format as Detector.detect, including
+every instance of templates listed in `multi`.
+
+Usage:
+    sweep = ProcessDetector(templates, PER_THRESHOLDS, ['squirrel', 'rat'], max_workers=4)
+    hits = sweep.detect(frame, ['squirrel', 'rat'])
+    sweep.close()
+
+Benchmark threads against processes per frame size to find the crossover:
+    python -m computer_vision.process_detector --session saved_sessions/run1
+    python -m computer_vision.process_detector --sizes 640x360 1282x744 2560x1440 --workers 4
+"""
+import argparse
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import cv2
+import numpy as np
+
+from computer_vision.detector import Detection, Detector
+from computer_vision.template_matching import DEFAULT_SCALES, convert, load_templates, local_peaks, match_template, nms, usable
+
+
+# worker process state, set up by _init_worker
+_TEMPLATES = {}
+_SHM = {}
+_TILES = {}
+
+
+def _init_worker(templates):
+    global _TEMPLATES
+    _TEMPLATES = templates
+    cv2.setNumThreads(1)  # one process per core already
+
+
+def _frame(shm_name, shape):
+    shm = _SHM.get(shm_name)
+    if shm is None:
+        _TILES.clear()  # views into the old block must go before it is closed
+        for old in _SHM.values():
+            old.close()
+        _SHM.clear()
+        shm = _SHM[shm_name] = shared_memory.SharedMemory(name=shm_name)
+    return np.ndarray(shape, dtype=np.uint8, buffer=shm.buf)
+
+
+def _tile(shm_name, shape, frame_id, tile, mode):
+    """The tile of the current frame in `mode`, converted once per frame and worker."""
+    key = (frame_id, tile, mode)
+    view = _TILES.get(key)
+    if view is None:
+        if any(k[0] != frame_id for k in _TILES):
+            _TILES.clear()
+        x0, y0, x1, y1 = tile
+        view = _TILES[key] = convert(_frame(shm_name, shape)[y0:y1, x0:x1], mode)
+    return view
+
+
+def _match_tile(shm_name, shape, frame_id, tile, name, level, floor, limit, method):
+    """
+    Matches one pyramid level of `name` on one tile. Returns (candidates, seconds) with
+    candidates [(val, (x, y), (w, h)), ...] in frame coordinates: the best position, or
+    the local peaks above `floor` when `limit` is set (multi-instance templates).
+    """
+    t0 = time.perf_counter()
+    mode, levels = _TEMPLATES[name]
+    tpl, mask, w, h = levels[level]
+    img = _tile(shm_name, shape, frame_id, tile, mode)
+    if w > img.shape[1] or h > img.shape[0]:
+        return [], time.perf_counter() - t0
+    res = match_template(img, tpl, method, mask)
+    if limit:
+        peaks = local_peaks(res, floor, w, h, limit)
+    else:
+        _, max_val, _, max_loc = cv2.minMaxLoc(res)
+        peaks = [(max_val, max_loc)]
+    x0, y0 = tile[:2]
+    return [(val, (x + x0, y + y0), (w, h)) for val, (x, y) in peaks], time.perf_counter() - t0
+
+
+def tiles(width, height, rows, cols, overlap):
+    """(x0, y0, x1, y1) tiles covering the frame, each extended right and down by `overlap`."""
+    xs = [width * c // cols for c in range(cols + 1)]
+    ys = [height * r // rows for r in range(rows + 1)]
+    return [(xs[c], ys[r], min(width, xs[c + 1] + overlap), min(height, ys[r + 1] + overlap))
+            for r in range(rows) for c in range(cols)]
+
+
+class ProcessDetector:
+    def __init__(self, templates, per_thresholds, names, default_threshold=0.1, max_workers=None, tiles=(2, 2),
+                 multi=None, method=cv2.TM_CCOEFF_NORMED, color_screen=None):
+        """
+        names: templates the workers can match; they are loaded and sent to each worker once.
+        tiles: (rows, cols) the frame is split into.
+        multi / color_screen: as for detector.Detector.
+        """
+        self.templates = templates
+        self.per_thresholds = per_thresholds
+        self.default_threshold = default_threshold
+        self.tiles = tiles
+        self.multi = multi or {}
+        self.method = method
+        self.color_screen = color_screen
+        self.matcher = None  # same interface as Detector for replay_gaming
+        self.names = [n for n in names if usable(templates.get(n))]
+        payload = {}
+        for name in self.names:
+            entry = templates[name]
+            masks = entry.get('masks')
+            payload[name] = (entry.get('mode', 'bgr'),
+                             [(tpl, masks[i] if masks else None, w, h) for i, (_, tpl, w, h) in enumerate(entry['pyramid'])])
+        self.overlap = max((max(w, h) for _, levels in payload.values() for _, _, w, h in levels), default=0)
+        self.pool = ProcessPoolExecutor(max_workers=max_workers or os.cpu_count() or 4,
+                                        initializer=_init_worker, initargs=(payload,))
+        self._shm = None
+        self._frame_id = 0
+        self._lock = threading.Lock()
+        self.last_timings = {}
+        self.last_wall = 0.0
+
+    def threshold(self, name):
+        return self.per_thresholds.get(name, self.default_threshold)
+
+    def _share(self, frame):
+        """Copies `frame` into the shared block (grown when needed); returns its name."""
+        frame = np.ascontiguousarray(frame)
+        if self._shm is None or self._shm.size < frame.nbytes:
+            self._release()
+            self._shm = shared_memory.SharedMemory(create=True, size=frame.nbytes)
+        np.ndarray(frame.shape, dtype=np.uint8, buffer=self._shm.buf)[...] = frame
+        return self._shm.name
+
+    def detect(self, frame, names):
+        """Returns {name: [Detection]} for `names` on `frame` (BGR ndarray); names must be in self.names."""
+        with self._lock:  # one frame in the shared block at a time
+            start = time.perf_counter()
+            names = [n for n in names if n in self.names]
+            results = {}
+            if self.color_screen is not None:
+                names, skipped = self.color_screen.screen(frame, names)
+                results.update((n, []) for n in skipped)
+            if not names:
+                self.last_timings, self.last_wall = {}, time.perf_counter() - start
+                return results
+            shm_name = self._share(frame)
+            self._frame_id += 1
+            height, width = frame.shape[:2]
+            rows, cols = self.tiles
+            futures = []
+            for tile in tiles(width, height, rows, cols, self.overlap):
+                for name in names:
+                    max_hits, extra = self.multi.get(name, (0, None))
+                    floor = min(self.threshold(name), extra if extra is not None else self.threshold(name))
+                    for level in range(len(self.templates[name]['pyramid'])):
+                        futures.append((name, self.pool.submit(_match_tile, shm_name, frame.shape, self._frame_id, tile,
+                                                               name, level, floor, 4 * max_hits, self.method)))
+            candidates = {name: [] for name in names}
+            timings = {}
+            for name, fut in futures:
+                found, elapsed = fut.result()
+                candidates[name] += found
+                timings[name] = timings.get(name, 0.0) + elapsed
+            for name in names:
+                results[name] = self._merge(name, candidates[name])
+            self.last_timings = timings
+            self.last_wall = time.perf_counter() - start
+            return results
+
+    def _merge(self, name, candidates):
+        threshold = self.threshold(name)
+        w = float(self.templates[name]['w'])
+        if name in self.multi:
+            max_hits, extra = self.multi[name]
+            extra = threshold if extra is None else extra
+            kept = nms(candidates, max_hits=max_hits)  # also removes the duplicates from overlapping tiles
+            if not kept or kept[0][0] < threshold:
+                return []
+            kept = [kept[0]] + [c for c in kept[1:] if c[0] >= extra]
+        else:
+            # strict > keeps the first tile/scale on ties
+            best = None
+            for cand in candidates:
+                if best is None or cand[0] > best[0]:
+                    best = cand
+            kept = [best] if best is not None and best[0] >= threshold else []
+        return [Detection(name, loc[0], loc[1], size[0], size[1], val, size[0] / w) for val, loc, size in kept]
+
+    def _release(self):
+        if self._shm is not None:
+            self._shm.close()
+            self._shm.unlink()
+            self._shm = None
+
+    def close(self):
+        self.pool.shutdown(wait=True)
+        self._release()
+
+
+def _source_frames(args):
+    if args.session:
+        from computer_vision.recorder import SessionReader
+        session = SessionReader(args.session)
+        return [np.array(session.frame(i)[1]) for i in range(0, len(session), max(1, len(session) // args.frames))][:args.frames]
+    if args.images:
+        from PIL import Image
+        return [cv2.cvtColor(np.array(Image.open(p).convert('RGB')), cv2.COLOR_RGB2BGR) for p in args.images]
+    return []
+
+
+def _timed(detector, frames, names):
+    detector.detect(frames[0], names)  # warm up: worker start, template loading
+    start = time.perf_counter()
+    for frame in frames:
+        detector.detect(frame, names)
+    return (time.perf_counter() - start) * 1000.0 / len(frames)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark thread- and process-pool detection per frame size.')
+    parser.add_argument('needles', nargs='*', help='needle names (default: every needle in --folder)')
+    parser.add_argument('--folder', default=os.path.join('saved_images', 'gaming'), help='needle folder, relative to the repo root')
+    parser.add_argument('--session', help='recorded session to take frames from')
+    parser.add_argument('--images', nargs='*', help='screenshot files to take frames from')
+    parser.add_argument('--frames', type=int, default=10, help='frames per size (random noise without a source)')
+    parser.add_argument('--sizes', nargs='*', default=['320x180', '640x360', '1282x744', '1920x1080', '2560x1440'])
+    parser.add_argument('--workers', type=int, default=None, help='pool size for both (default: CPU count)')
+    parser.add_argument('--tiles', type=int, nargs=2, default=(2, 2), metavar=('ROWS', 'COLS'))
+    args = parser.parse_args()
+
+    repo_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+    folder = os.path.join(repo_root, args.folder)
+    files = [n + '.png' for n in args.needles] or sorted(f for f in os.listdir(folder) if f.endswith('.png') and not f.endswith('.mask.png'))
+    templates = load_templates(repo_root, files, DEFAULT_SCALES, folder=args.folder,
+                               cache_dir=os.path.join(repo_root, 'cache', 'templates'))
+    names = [n for n, e in templates.items() if usable(e)]
+    sources = _source_frames(args)
+    rng = np.random.default_rng(0)
+
+    workers = args.workers or os.cpu_count() or 4
+    threads = Detector(templates, {}, default_threshold=0.8, max_workers=workers)
+    processes = ProcessDetector(templates, {}, names, default_threshold=0.8, max_workers=workers, tiles=tuple(args.tiles))
+    print(f'{len(names)} template(s) x {len(DEFAULT_SCALES)} scale(s), {args.tiles[0]}x{args.tiles[1]} tiles, {workers} worker(s)')
+    print(f"{'size':>10} {'threads ms':>11} {'processes ms':>13}  faster")
+    crossover = None
+    try:
+        for size in args.sizes:
+            w, h = (int(v) for v in size.lower().split('x'))
+            if sources:
+                frames = [cv2.resize(f, (w, h), interpolation=cv2.INTER_AREA) for f in sources]
+            else:
+                frames = [rng.integers(0, 256, (h, w, 3), dtype=np.uint8) for _ in range(args.frames)]
+            t_ms = _timed(threads, frames, names)
+            p_ms = _timed(processes, frames, names)
+            faster = 'processes' if p_ms < t_ms else 'threads'
+            if faster == 'processes' and crossover is None:
+                crossover = size
+            print(f'{size:>10} {t_ms:>11.1f} {p_ms:>13.1f}  {faster}')
+    finally:
+        threads.close()
+        processes.close()
+    print(f'Processes win from {crossover}' if crossover else 'Threads win at every size tried')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,137 @@
+"""
+Session recorder and reader for offline replay of the capture loop.
+
+A session is a directory with two files:
+- frames.bin   : raw BGR uint8 frames appended back to back (memory-mappable)
+- events.jsonl : one JSON object per line, in time order:
+    {"type": "frame", "t": ..., "index": n, "offset": bytes, "region": [x, y, w, h], "shape": [h, w, 3]}
+    {"type": "click", "t": ..., "x": ..., "y": ..., "label": ...}
+
+Start recording with `start(directory)`: every `capture.grab` is then written to
+the session, and callers log their clicks with `record_click`. Read a session
+back with `SessionReader`, or replay it through `capture.ReplayBackend`.
+"""
+import json
+import os
+import threading
+import time
+
+import numpy as np
+
+from computer_vision import capture
+
+
+FRAMES_FILE = 'frames.bin'
+EVENTS_FILE = 'events.jsonl'
+
+
+class SessionRecorder:
+    def __init__(self, directory):
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self._lock = threading.Lock()
+        self._frames = open(os.path.join(directory, FRAMES_FILE), 'ab')
+        # line buffered so the index survives a crash up to the last full line
+        self._events = open(os.path.join(directory, EVENTS_FILE), 'a', encoding='utf-8', buffering=1)
+        self._offset = self._frames.tell()
+        self.frame_count = 0
+
+    def _write_event(self, event):
+        self._events.write(json.dumps(event) + '\n')
+
+    def record_frame(self, region, frame):
+        frame = np.ascontiguousarray(frame, dtype=np.uint8)
+        with self._lock:
+            if self._frames.closed:
+                return
+            self._frames.write(frame.data)
+            self._write_event({
+                'type': 'frame',
+                't': time.time(),
+                'index': self.frame_count,
+                'offset': self._offset,
+                'region': [int(v) for v in region],
+                'shape': list(frame.shape),
+            })
+            self._offset += frame.nbytes
+            self.frame_count += 1
+
+    def record_click(self, x, y, label=None):
+        with self._lock:
+            if self._events.closed:
+                return
+            self._write_event({'type': 'click', 't': time.time(), 'x': int(x), 'y': int(y), 'label': label})
+
+    def close(self):
+        with self._lock:
+            self._frames.close()
+            self._events.close()
+
+
+class SessionReader:
+    """Read-only view of a recorded session; frames are served from a memory map."""
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.frame_events = []
+        self.click_events = []
+        with open(os.path.join(directory, EVENTS_FILE), 'r', encoding='utf-8') as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    event = json.loads(line)
+                except json.JSONDecodeError:
+                    continue  # truncated last line after a crash
+                if event.get('type') == 'frame':
+                    self.frame_events.append(event)
+                elif event.get('type') == 'click':
+                    self.click_events.append(event)
+
+        frames_path = os.path.join(directory, FRAMES_FILE)
+        size = os.path.getsize(frames_path)
+        self._data = np.memmap(frames_path, dtype=np.uint8, mode='r') if size else np.zeros(0, dtype=np.uint8)
+        # drop index entries whose bytes never made it to disk
+        self.frame_events = [e for e in self.frame_events if e['offset'] + int(np.prod(e['shape'])) <= size]
+
+    def __len__(self):
+        return len(self.frame_events)
+
+    def frame(self, i):
+        """Returns (event, frame) for frame `i`; the frame is a read-only view into the memory map."""
+        event = self.frame_events[i]
+        start = event['offset']
+        shape = tuple(event['shape'])
+        return event, self._data[start:start + int(np.prod(shape))].reshape(shape)
+
+    def frames(self):
+        for i in range(len(self.frame_events)):
+            yield self.frame(i)
+
+
+_active = None
+
+
+def start(directory):
+    """Starts recording every capture.grab (and record_click calls) into `directory`."""
+    global _active
+    stop()
+    _active = SessionRecorder(directory)
+    capture.set_recorder(_active)
+    return _active
+
+
+def stop():
+    global _active
+    if _active is not None:
+        capture.set_recorder(None)
+        _active.close()
+        _active = None
+
+
+def record_click(x, y, label=None):
+    """Logs a click in the active session; does nothing when not recording."""
+    rec = _active
+    if rec is not None:
+        rec.record_click(x, y, label)
@@ -0,0 +1,107 @@
+"""
+Learned scale ordering for multi-scale template matching.
+
+The in-game zoom rarely changes, so the pyramid scale that matched a template
+last time is almost always the one that matches next time. ScaleMemory keeps,
+per template, the last winning scale and a win count per scale, tries scales in
+that order and stops as soon as a match clears the template's "confident" score.
+
+The statistics are saved as JSON so a restarted bot starts with the right order:
+    {"chem_plant_1": {"last": 0.9, "wins": {"0.9": 120, "1.0": 3}}, ...}
+
+Usage:
+    memory = ScaleMemory('cache/scale_stats.json', PER_THRESHOLDS, confident=0.9)
+    best_val, best_loc, best_size = memory.match(frame, templates['rat'], 'rat')
+    memory.save()
+"""
+import json
+import os
+import threading
+
+from computer_vision.template_matching import match_entry
+
+
+DEFAULT_CONFIDENT = 0.9
+
+
+class ScaleMemory:
+    def __init__(self, path=None, per_thresholds=None, confident=DEFAULT_CONFIDENT, per_confident=None, default_threshold=0.1):
+        """
+        path: JSON file the statistics are loaded from and saved to (None = in memory only).
+        per_thresholds: detection threshold per template; only matches at or above it teach the memory.
+        confident / per_confident: score at which the remaining scales are skipped.
+        """
+        self.path = path
+        self.per_thresholds = per_thresholds or {}
+        self.default_threshold = default_threshold
+        self.confident = confident
+        self.per_confident = per_confident or {}
+        self._stats = {}
+        self._lock = threading.Lock()
+        self.stats = {'matches': 0, 'early_exits': 0, 'levels_skipped': 0}
+        if path and os.path.exists(path):
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    self._stats = json.load(f)
+            except Exception as e:
+                print(f'Ignoring unreadable scale statistics {path}: {e}')
+
+    def confident_for(self, name):
+        """Early-exit score for `name`: never below its threshold, so an early exit is always a hit."""
+        return max(self.per_confident.get(name, self.confident), self.per_thresholds.get(name, self.default_threshold))
+
+    def order(self, name, pyramid):
+        """Indices into `pyramid`: last winner first, then by win count, then pyramid order."""
+        with self._lock:
+            entry = self._stats.get(name) or {}
+            last = entry.get('last')
+            wins = dict(entry.get('wins', {}))
+
+        def key(i):
+            scale = pyramid[i][0]
+            return (scale != last, -wins.get(str(scale), 0), i)
+        return sorted(range(len(pyramid)), key=key)
+
+    def preferred(self, name):
+        """The scale that won last for `name`, or None before its first hit."""
+        with self._lock:
+            return (self._stats.get(name) or {}).get('last')
+
+    def record(self, name, scale):
+        with self._lock:
+            entry = self._stats.setdefault(name, {'last': None, 'wins': {}})
+            entry['last'] = scale
+            entry['wins'][str(scale)] = entry['wins'].get(str(scale), 0) + 1
+
+    def match(self, img_cv, entry, name, img_small=None):
+        """match_entry with learned scale order and early exit; returns (best_val, best_loc, best_size)."""
+        pyramid = entry['pyramid']
+        order = self.order(name, pyramid)
+        tried = []
+        best_val, best_loc, best_size = match_entry(img_cv, entry, img_small, order=order,
+                                                    confident=self.confident_for(name), tried=tried)
+        with self._lock:
+            self.stats['matches'] += 1
+            if len(tried) < len(order):
+                self.stats['early_exits'] += 1
+                self.stats['levels_skipped'] += len(order) - len(tried)
+        if best_loc is not None and best_val >= self.per_thresholds.get(name, self.default_threshold):
+            for scale, _, w, h in pyramid:
+                if (w, h) == best_size:
+                    self.record(name, scale)
+                    break
+        return best_val, best_loc, best_size
+
+    def save(self):
+        if not self.path:
+            return
+        with self._lock:
+            data = json.dumps(self._stats, indent=2, sort_keys=True)
+        try:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            tmp = self.path + '.tmp'
+            with open(tmp, 'w', encoding='utf-8') as f:
+                f.write(data)
+            os.replace(tmp, self.path)
+        except Exception as e:
+            print(f'Could not save scale statistics {self.path}: {e}')
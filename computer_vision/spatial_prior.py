@@ -0,0 +1,95 @@
+"""
+Spatial prior for template detection: look where the template was last seen first.
+
+Buttons such as the squirrel/rat upgrades reappear in the same few places.
+SpatialPrior keeps the last few hit boxes per template; `match` searches small
+windows around them and only reports a hit when one clears the template's
+threshold. The caller falls back to a full-frame scan on a miss and reports
+every hit back with `record`, so the history follows the object.
+
+`stats` counts, per template, ROI hits and misses and full-scan hits and misses
+together with the time spent on each path; `report()` formats them.
+"""
+import threading
+from collections import deque
+
+from computer_vision.template_matching import match_entry
+
+
+class SpatialPrior:
+    def __init__(self, names=None, history=4, margin=16):
+        """
+        names: templates that use the prior (None = all).
+        history: hit locations remembered per template.
+        margin: pixels searched around a remembered hit box on each side.
+        """
+        self.names = set(names) if names is not None else None
+        self.history = history
+        self.margin = margin
+        self._hits = {}  # name -> deque of (x, y, w, h), most recent first
+        self._lock = threading.Lock()
+        self.stats = {}
+
+    def applies(self, name):
+        return self.names is None or name in self.names
+
+    def _stat(self, name):
+        return self.stats.setdefault(name, {'roi_hits': 0, 'roi_misses': 0, 'full_hits': 0, 'full_misses': 0,
+                                            'roi_s': 0.0, 'full_s': 0.0})
+
+    def record(self, name, box):
+        """Remembers a hit box (x, y, w, h) in frame coordinates."""
+        x, y, w, h = box
+        with self._lock:
+            hits = self._hits.setdefault(name, deque(maxlen=self.history))
+            # a hit near a remembered one replaces it instead of filling the history
+            for old in list(hits):
+                if abs(old[0] - x) <= self.margin and abs(old[1] - y) <= self.margin:
+                    hits.remove(old)
+            hits.appendleft((x, y, w, h))
+
+    def rois(self, name, frame_shape):
+        """Search windows (x0, y0, x1, y1) around the remembered hits, most recent first."""
+        with self._lock:
+            hits = list(self._hits.get(name, ()))
+        m = self.margin
+        fh, fw = frame_shape[:2]
+        return [(max(0, x - m), max(0, y - m), min(fw, x + w + m), min(fh, y + h + m)) for x, y, w, h in hits]
+
+    def match(self, img_cv, entry, name, threshold, scale_memory=None):
+        """
+        Searches the windows around recent hits. Returns (best_val, best_loc, best_size)
+        in frame coordinates for the first window with a match at or above `threshold`,
+        or None when there is no history or no window matched.
+        """
+        for x0, y0, x1, y1 in self.rois(name, img_cv.shape):
+            roi = img_cv[y0:y1, x0:x1]
+            if scale_memory is not None:
+                val, loc, size = scale_memory.match(roi, entry, name)
+            else:
+                val, loc, size = match_entry(roi, entry)
+            if loc is not None and val >= threshold:
+                return val, (loc[0] + x0, loc[1] + y0), size
+        return None
+
+    def count(self, name, path, hit, seconds):
+        """Adds one attempt on `path` ('roi' or 'full') to the stats."""
+        with self._lock:
+            s = self._stat(name)
+            s[f"{path}_{'hits' if hit else 'misses'}"] += 1
+            s[f'{path}_s'] += seconds
+
+    def report(self):
+        """One line per template: ROI hit rate and average cost of each path."""
+        lines = []
+        with self._lock:
+            stats = {name: dict(s) for name, s in self.stats.items()}
+        for name, s in sorted(stats.items()):
+            roi_n = s['roi_hits'] + s['roi_misses']
+            full_n = s['full_hits'] + s['full_misses']
+            roi_rate = 100.0 * s['roi_hits'] / roi_n if roi_n else 0.0
+            roi_ms = s['roi_s'] * 1000.0 / roi_n if roi_n else 0.0
+            full_ms = s['full_s'] * 1000.0 / full_n if full_n else 0.0
+            lines.append(f"{name:<18} roi {s['roi_hits']}/{roi_n} ({roi_rate:.0f}%) {roi_ms:.2f} ms"
+                         f"  full {s['full_hits']}/{full_n} {full_ms:.2f} ms")
+        return lines
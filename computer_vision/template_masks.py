@@ -0,0 +1,139 @@
+"""
+Masks for template matching: generate them for the needles and benchmark masked matching.
+
+The gaming needles are screenshots, so their alpha channel is fully opaque and
+carries no mask. `generate` derives one by flood-filling the background from the
+needle's border (pixels within `--tolerance` of their neighbours) and writes
+`<needle>.mask.png` next to it (white = sprite, black = ignored). Masks are plain
+grayscale PNGs and can be touched up in any image editor; load_templates picks
+them up automatically.
+
+Run from the repository root:
+    python -m computer_vision.template_masks generate
+    python -m computer_vision.template_masks generate --folder saved_images/gaming --tolerance 12 squirrel.png rat.png
+    python -m computer_vision.template_masks benchmark --session saved_sessions/run1
+
+`benchmark` matches every masked needle with and without its mask on recorded
+frames (or `--images`) and reports the cost of each, the best scores and how
+often both agree on the location.
+"""
+import argparse
+import os
+import time
+
+import cv2
+import numpy as np
+from PIL import Image
+
+from computer_vision.template_matching import DEFAULT_SCALES, load_templates, mask_path, match_entry
+
+
+MIN_COVERAGE = 0.2  # a mask keeping less of the needle than this is rejected
+
+
+def auto_mask(tpl_bgr, tolerance=12):
+    """
+    Returns a uint8 mask (255 = sprite) with the background connected to the border
+    removed, or None when almost nothing would be left (sprite blends into the background).
+    """
+    h, w = tpl_bgr.shape[:2]
+    flood = np.zeros((h + 2, w + 2), np.uint8)
+    img = np.ascontiguousarray(tpl_bgr)
+    flags = 4 | cv2.FLOODFILL_MASK_ONLY | (255 << 8)
+    diff = (tolerance,) * 3
+    border = [(x, 0) for x in range(w)] + [(x, h - 1) for x in range(w)] + \
+             [(0, y) for y in range(h)] + [(w - 1, y) for y in range(h)]
+    for x, y in border:
+        if not flood[y + 1, x + 1]:
+            cv2.floodFill(img, flood, (x, y), 0, diff, diff, flags)
+    mask = np.where(flood[1:-1, 1:-1] > 0, 0, 255).astype(np.uint8)
+    # keep a one pixel rim of background so anti-aliased sprite edges still count
+    mask = cv2.dilate(mask, np.ones((3, 3), np.uint8))
+    if np.count_nonzero(mask) < MIN_COVERAGE * mask.size:
+        return None
+    return mask
+
+
+def generate(folder, names, tolerance, overwrite):
+    for fname in names:
+        path = os.path.join(folder, fname)
+        out = mask_path(path)
+        if os.path.exists(out) and not overwrite:
+            print(f'{fname}: {os.path.basename(out)} exists, skipping (use --overwrite)')
+            continue
+        tpl = cv2.cvtColor(np.array(Image.open(path).convert('RGB')), cv2.COLOR_RGB2BGR)
+        mask = auto_mask(tpl, tolerance)
+        if mask is None:
+            print(f'{fname}: background not separable at tolerance {tolerance}; no mask written')
+            continue
+        Image.fromarray(mask).save(out)
+        print(f'{fname}: wrote {os.path.basename(out)} ({100.0 * np.count_nonzero(mask) / mask.size:.0f}% of pixels kept)')
+
+
+def _frames(args):
+    if args.session:
+        from computer_vision.recorder import SessionReader
+        for _, frame in SessionReader(args.session).frames():
+            yield frame
+    for path in args.images or ():
+        yield cv2.cvtColor(np.array(Image.open(path).convert('RGB')), cv2.COLOR_RGB2BGR)
+
+
+def benchmark(args, repo_root, names):
+    plain = load_templates(repo_root, names, DEFAULT_SCALES, folder=args.folder, use_masks=False)
+    masked = load_templates(repo_root, names, DEFAULT_SCALES, folder=args.folder)
+    keys = [k for k, e in masked.items() if not e.get('missing') and e.get('masks')]
+    if not keys:
+        print('No needle has a mask; run the generate command first.')
+        return
+    stats = {k: {'plain_s': 0.0, 'masked_s': 0.0, 'plain_best': 0.0, 'masked_best': 0.0, 'agree': 0} for k in keys}
+    n = 0
+    for frame in _frames(args):
+        n += 1
+        for key in keys:
+            s = stats[key]
+            t0 = time.perf_counter()
+            p_val, p_loc, _ = match_entry(frame, plain[key])
+            t1 = time.perf_counter()
+            m_val, m_loc, _ = match_entry(frame, masked[key])
+            t2 = time.perf_counter()
+            s['plain_s'] += t1 - t0
+            s['masked_s'] += t2 - t1
+            s['plain_best'] += p_val
+            s['masked_best'] += m_val
+            if p_loc is not None and m_loc is not None and max(abs(p_loc[0] - m_loc[0]), abs(p_loc[1] - m_loc[1])) <= 2:
+                s['agree'] += 1
+    if not n:
+        print('No frames; pass --session and/or --images.')
+        return
+    print(f'{n} frame(s)')
+    print(f"{'template':<18} {'plain ms':>9} {'masked ms':>10} {'cost':>6} {'plain avg':>10} {'masked avg':>11} {'same loc':>9}")
+    for key in keys:
+        s = stats[key]
+        cost = s['masked_s'] / s['plain_s'] if s['plain_s'] else 0.0
+        print(f"{key:<18} {s['plain_s'] * 1000.0 / n:>9.2f} {s['masked_s'] * 1000.0 / n:>10.2f} {cost:>5.1f}x "
+              f"{s['plain_best'] / n:>10.3f} {s['masked_best'] / n:>11.3f} {100.0 * s['agree'] / n:>8.0f}%")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Generate needle masks and benchmark masked template matching.')
+    parser.add_argument('command', choices=('generate', 'benchmark'))
+    parser.add_argument('needles', nargs='*', help='needle file names (default: every needle in --folder)')
+    parser.add_argument('--folder', default=os.path.join('saved_images', 'gaming'), help='needle folder, relative to the repo root')
+    parser.add_argument('--tolerance', type=int, default=12, help='generate: max colour step within the background')
+    parser.add_argument('--overwrite', action='store_true', help='generate: replace existing masks')
+    parser.add_argument('--session', help='benchmark: recorded session directory')
+    parser.add_argument('--images', nargs='*', help='benchmark: screenshot files')
+    args = parser.parse_args()
+
+    repo_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+    folder = os.path.join(repo_root, args.folder)
+    names = args.needles or sorted(f for f in os.listdir(folder) if f.endswith('.png') and not f.endswith('.mask.png'))
+    if args.command == 'generate':
+        generate(folder, names, args.tolerance, args.overwrite)
+    else:
+        benchmark(args, repo_root, names)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,502 @@
+"""
+Template loading and multi-scale template matching shared by the gaming loops.
+
+Templates are dicts keyed by needle name (file name without extension):
+    {'missing': False, 'path': ..., 'w': ..., 'h': ..., 'cv': BGR ndarray,
+     'pyramid': ((scale, tpl, w, h), ...)}
+Missing or unreadable needles are kept as {'missing': True, 'path': ...}.
+Templates loaded with a coarse-to-fine factor also carry
+    'coarse': (factor, ((scale, tpl_small, w_small, h_small), ...))
+and every loaded template has a matching 'mode' (see MODES): 'bgr' matches in
+colour, 'gray' and 'b'/'g'/'r' on a single channel (about a third of the work).
+The pyramid is stored in that mode; 'cv' stays BGR. 'masks' is None, or one
+uint8 mask per pyramid level (255 = template pixel, 0 = ignored background).
+
+The pyramid holds the template pre-resized to every matching scale. It is built
+once by `load_entry`/`load_templates` (read-only arrays in a tuple) and consumed by
+`match_pyramid`, so no resizing happens while matching. With `cache_dir`, the decoded
+needle, its mask and its pyramid are also stored on disk keyed by the content hash
+of the PNG (and mask) and reused on the next start.
+
+Coarse-to-fine matching (`match_entry` on templates with a 'coarse' factor) first
+matches a downsampled template against a downsampled frame to find candidate
+peaks, then re-matches at full resolution only in small windows around them.
+Scores come from the full-resolution pass, so thresholds are unchanged. Tiny
+sprites lose too much detail when shrunk, so the mode is opt-in per template.
+
+`match_entry_all` returns every instance of a template instead of the best one:
+local maxima of each scale's result above threshold, with non-maximum suppression.
+
+Masked matching: a needle's mask comes from `<needle>.mask.png` next to it (see
+template_masks.py to generate one) or, failing that, from the PNG's alpha channel
+when it has transparent pixels. Background pixels then do not count towards the
+score, so thresholds can be tight. Masked levels still use TM_CCOEFF_NORMED
+(OpenCV >= 4.5 accepts a mask for every method), so scores stay comparable.
+
+Frames are always passed in BGR; `match_entry` converts them to the template's
+mode. Callers matching many templates on one frame use `FrameViews` so each
+conversion and downsample happens once per frame.
+"""
+import hashlib
+import os
+
+import cv2
+import numpy as np
+from PIL import Image
+
+
+DEFAULT_SCALES = (0.85, 0.9, 1.0, 1.05)
+CACHE_VERSION = 2
+
+COARSE_MIN_SIDE = 8   # a downsampled template smaller than this falls back to full resolution
+COARSE_TOP_K = 3      # candidate peaks refined per scale
+
+MODES = ('bgr', 'gray', 'b', 'g', 'r')
+_CHANNELS = {'b': 0, 'g': 1, 'r': 2}
+
+
+def _readonly(arr):
+    arr.setflags(write=False)
+    return arr
+
+
+def build_pyramid(tpl_cv, tpl_w, tpl_h, scales):
+    """Returns ((scale, tpl_scaled, w, h), ...) in `scales` order with read-only arrays."""
+    levels = []
+    for scale in scales:
+        new_w = max(1, int(tpl_w * scale))
+        new_h = max(1, int(tpl_h * scale))
+        if scale == 1.0:
+            tpl_scaled = tpl_cv.copy()
+        else:
+            tpl_scaled = cv2.resize(tpl_cv, (new_w, new_h), interpolation=cv2.INTER_AREA if scale < 1.0 else cv2.INTER_LINEAR)
+        levels.append((scale, _readonly(tpl_scaled), new_w, new_h))
+    return tuple(levels)
+
+
+def _decode(path):
+    pil = Image.open(path).convert('RGBA')
+    arr = np.array(pil)
+    if arr.shape[2] == 4:
+        return cv2.cvtColor(arr, cv2.COLOR_RGBA2BGR)
+    return cv2.cvtColor(arr, cv2.COLOR_RGB2BGR)
+
+
+def mask_path(path):
+    return os.path.splitext(path)[0] + '.mask.png'
+
+
+def load_mask(path, w, h):
+    """
+    Returns the needle's mask (uint8, 0 or 255, h x w) from `<needle>.mask.png`, else
+    from the PNG's alpha channel when it has transparent pixels, else None.
+    """
+    mpath = mask_path(path)
+    if os.path.exists(mpath):
+        mask = np.array(Image.open(mpath).convert('L'))
+    else:
+        pil = Image.open(path)
+        if 'A' not in pil.getbands():
+            return None
+        mask = np.array(pil.getchannel('A'))
+        if mask.min() == 255:
+            return None  # fully opaque: nothing to mask
+    if mask.shape != (h, w):
+        raise ValueError(f'mask {mask.shape[::-1]} does not match needle size {(w, h)}')
+    return np.where(mask >= 128, 255, 0).astype(np.uint8)
+
+
+def build_masks(mask, pyramid):
+    """One read-only mask per pyramid level, resized without blending 0/255 edges."""
+    return tuple(_readonly(cv2.resize(mask, (w, h), interpolation=cv2.INTER_NEAREST)) for _, _, w, h in pyramid)
+
+
+def match_template(img_cv, tpl, method=cv2.TM_CCOEFF_NORMED, mask=None):
+    """cv2.matchTemplate, with an optional mask; masked scores over flat windows come out as -1."""
+    if mask is None:
+        return cv2.matchTemplate(img_cv, tpl, method)
+    res = cv2.matchTemplate(img_cv, tpl, method, mask=mask)
+    # a masked window with no variance divides by zero
+    np.nan_to_num(res, copy=False, nan=-1.0, posinf=-1.0, neginf=-1.0)
+    return res
+
+
+def content_hash(path):
+    """sha1 hex digest of the needle PNG plus its mask file, if any."""
+    h = hashlib.sha1()
+    for p in (path, mask_path(path)):
+        if os.path.exists(p):
+            with open(p, 'rb') as f:
+                h.update(f.read())
+    return h.hexdigest()
+
+
+def _cache_path(cache_dir, digest, scales):
+    h = hashlib.sha1(digest.encode())
+    h.update(repr((CACHE_VERSION, tuple(float(s) for s in scales))).encode())
+    return os.path.join(cache_dir, h.hexdigest() + '.npz')
+
+
+def _load_entry(path, scales, cache_dir, digest=None):
+    """Returns (tpl_cv, pyramid, mask or None), from the on-disk cache when possible."""
+    cache_file = None
+    if cache_dir:
+        cache_file = _cache_path(cache_dir, digest or content_hash(path), scales)
+        if os.path.exists(cache_file):
+            try:
+                with np.load(cache_file, allow_pickle=False) as data:
+                    base = _readonly(data['base'])
+                    mask = _readonly(data['mask']) if 'mask' in data.files else None
+                    levels = []
+                    for i, s in enumerate(data['scales']):
+                        tpl = _readonly(data[f'level_{i}'])
+                        levels.append((float(s), tpl, tpl.shape[1], tpl.shape[0]))
+                return base, tuple(levels), mask
+            except Exception:
+                pass  # unreadable cache file; rebuild below
+
+    base = _readonly(_decode(path))
+    h, w = base.shape[:2]
+    pyramid = build_pyramid(base, w, h, scales)
+    mask = load_mask(path, w, h)
+    if cache_file:
+        try:
+            os.makedirs(cache_dir, exist_ok=True)
+            arrays = {f'level_{i}': level[1] for i, level in enumerate(pyramid)}
+            if mask is not None:
+                arrays['mask'] = mask
+            np.savez(cache_file, base=base, scales=np.array(scales, dtype=np.float64), **arrays)
+        except Exception as e:
+            print(f'Could not write template cache {cache_file}: {e}')
+    return base, pyramid, mask
+
+
+def convert(img_cv, mode):
+    """Returns a BGR image in matching `mode`; single-channel input is assumed converted already."""
+    if mode == 'bgr' or img_cv.ndim == 2:
+        return img_cv
+    if mode == 'gray':
+        return cv2.cvtColor(img_cv, cv2.COLOR_BGR2GRAY)
+    # a strided view would make matchTemplate copy anyway; copy once here
+    return np.ascontiguousarray(img_cv[:, :, _CHANNELS[mode]])
+
+
+def convert_pyramid(pyramid, mode):
+    if mode == 'bgr':
+        return pyramid
+    return tuple((scale, _readonly(convert(tpl, mode)), w, h) for scale, tpl, w, h in pyramid)
+
+
+def build_coarse(pyramid, factor):
+    """Downsamples every pyramid level by `factor`; returns None if any level gets too small."""
+    levels = []
+    for scale, tpl_scaled, w, h in pyramid:
+        small_w, small_h = w // factor, h // factor
+        if min(small_w, small_h) < COARSE_MIN_SIDE:
+            return None
+        tpl_small = cv2.resize(tpl_scaled, (small_w, small_h), interpolation=cv2.INTER_AREA)
+        levels.append((scale, _readonly(tpl_small), small_w, small_h))
+    return tuple(levels)
+
+
+def load_entry(path, scales=DEFAULT_SCALES, cache_dir=None, coarse_factor=None, mode='bgr', use_masks=True, digest=None, key=None):
+    """
+    Loads one needle into a template entry (see the module docstring).
+    `digest` may pass in a known content_hash(path) to skip re-reading the file.
+    """
+    key = key or os.path.splitext(os.path.basename(path))[0]
+    if not os.path.exists(path):
+        return {'missing': True, 'path': path}
+    try:
+        if mode not in MODES:
+            raise ValueError(f'unknown matching mode {mode!r}')
+        arr, pyramid, mask = _load_entry(path, scales, cache_dir, digest)
+        h, w = arr.shape[:2]
+        pyramid = convert_pyramid(pyramid, mode)
+        entry = {'missing': False, 'path': path, 'w': w, 'h': h, 'cv': arr, 'pyramid': pyramid, 'mode': mode,
+                 'masks': build_masks(mask, pyramid) if use_masks and mask is not None else None}
+        if coarse_factor and coarse_factor > 1:
+            coarse_levels = build_coarse(pyramid, coarse_factor)
+            if coarse_levels is None:
+                print(f"Template '{key}' is too small for coarse factor {coarse_factor}; matching at full resolution.")
+            else:
+                entry['coarse'] = (coarse_factor, coarse_levels)
+        return entry
+    except Exception as e:
+        return {'missing': True, 'path': path, 'error': str(e)}
+
+
+def load_templates(repo_root, names, scales=DEFAULT_SCALES, folder=os.path.join('saved_images', 'gaming'), cache_dir=None, coarse=None, modes=None, use_masks=True):
+    """
+    coarse: optional {name: factor} selecting coarse-to-fine matching (factor 2 or 4) per template.
+    modes: optional {name: mode} (see MODES); unlisted templates match in 'bgr'.
+    use_masks: match with each needle's mask when it has one (see load_mask).
+    See template_registry.TemplateRegistry for lazy loading of a whole folder tree.
+    """
+    coarse = coarse or {}
+    modes = modes or {}
+    templates = {}
+    for fname in names:
+        key = os.path.splitext(fname)[0]
+        templates[key] = load_entry(os.path.join(repo_root, folder, fname), scales, cache_dir,
+                                    coarse.get(key), modes.get(key, 'bgr'), use_masks, key=key)
+    return templates
+
+
+def match_pyramid(img_cv, pyramid, method=cv2.TM_CCOEFF_NORMED):
+    # returns (best_val, best_loc, best_size)
+    best_val = -1.0
+    best_loc = None
+    best_size = (pyramid[0][2], pyramid[0][3]) if pyramid else (0, 0)
+    for scale, tpl_scaled, new_w, new_h in pyramid:
+        if new_w > img_cv.shape[1] or new_h > img_cv.shape[0]:
+            continue
+        try:
+            res = cv2.matchTemplate(img_cv, tpl_scaled, method)
+            _, max_val, _, max_loc = cv2.minMaxLoc(res)
+            if max_val > best_val:
+                best_val = max_val
+                best_loc = max_loc
+                best_size = (new_w, new_h)
+        except Exception:
+            continue
+    return best_val, best_loc, best_size
+
+
+def downsample(img_cv, factor):
+    return cv2.resize(img_cv, (img_cv.shape[1] // factor, img_cv.shape[0] // factor), interpolation=cv2.INTER_AREA)
+
+
+class FrameViews:
+    """Per-frame cache of the frame converted to each matching mode and downsampled by each factor."""
+
+    def __init__(self, frame):
+        self.frame = frame
+        self._views = {}
+
+    def get(self, mode='bgr', factor=1):
+        key = (mode, factor)
+        view = self._views.get(key)
+        if view is None:
+            # concurrent callers may both compute a view; the results are identical
+            view = convert(self.frame, mode) if factor == 1 else downsample(self.get(mode), factor)
+            self._views[key] = view
+        return view
+
+    def for_entry(self, entry):
+        """(frame, downsampled frame or None) in the template's mode."""
+        mode = entry.get('mode', 'bgr')
+        coarse = entry.get('coarse')
+        return self.get(mode), (self.get(mode, coarse[0]) if coarse else None)
+
+
+def match_level_coarse(img_cv, img_small, tpl_scaled, tpl_small, factor, top_k=COARSE_TOP_K, method=cv2.TM_CCOEFF_NORMED, mask=None):
+    """
+    Coarse-to-fine match of one pyramid level. Returns (max_val, max_loc) like
+    cv2.minMaxLoc on the full-resolution result, but only evaluated around the
+    `top_k` best peaks of the downsampled match. `mask` applies to the refinement.
+    """
+    sh, sw = tpl_small.shape[:2]
+    res = cv2.matchTemplate(img_small, tpl_small, method)
+    best_val, best_loc = -1.0, None
+    for _ in range(top_k):
+        _, peak_val, _, (px, py) = cv2.minMaxLoc(res)
+        if peak_val == -np.inf:
+            break
+        # suppress this peak's neighbourhood before looking for the next one
+        res[max(0, py - sh // 2):py + sh // 2 + 1, max(0, px - sw // 2):px + sw // 2 + 1] = -np.inf
+
+        refined = _refine(img_cv, tpl_scaled, px, py, factor, method, mask)
+        if refined is not None and refined[0] > best_val:
+            best_val, best_loc = refined
+    return best_val, best_loc
+
+
+def _refine(img_cv, tpl_scaled, px, py, factor, method, mask):
+    """Full-resolution match around the downsampled peak (px, py); (val, loc) or None at the frame edge."""
+    h, w = tpl_scaled.shape[:2]
+    pad = 2 * factor  # covers rounding lost in the downsampled coordinates
+    x0 = max(0, px * factor - pad)
+    y0 = max(0, py * factor - pad)
+    x1 = min(img_cv.shape[1], px * factor + pad + w)
+    y1 = min(img_cv.shape[0], py * factor + pad + h)
+    if x1 - x0 < w or y1 - y0 < h:
+        return None
+    _, val, _, loc = cv2.minMaxLoc(match_template(img_cv[y0:y1, x0:x1], tpl_scaled, method, mask))
+    return val, (loc[0] + x0, loc[1] + y0)
+
+
+def match_level_coarse_all(img_cv, img_small, tpl_scaled, tpl_small, factor, limit, method=cv2.TM_CCOEFF_NORMED, mask=None):
+    """
+    Coarse-to-fine candidates for every instance of one pyramid level: the `limit`
+    strongest local peaks of the downsampled match, each refined at full resolution.
+    Returns [(val, (x, y)), ...]. No score floor is applied to the coarse peaks, whose
+    scores run lower than the refined ones.
+    """
+    sh, sw = tpl_small.shape[:2]
+    res = cv2.matchTemplate(img_small, tpl_small, method)
+    found = []
+    for _, (px, py) in local_peaks(res, -1.0, sw, sh, limit):
+        refined = _refine(img_cv, tpl_scaled, px, py, factor, method, mask)
+        if refined is not None:
+            found.append(refined)
+    return found
+
+
+def match_entry(img_cv, entry, img_small=None, method=cv2.TM_CCOEFF_NORMED, order=None, confident=None, tried=None):
+    """
+    Matches a loaded template on `img_cv`, coarse-to-fine when the template asks for it.
+    `img_small` may pass in `img_cv` already downsampled by the template's factor.
+    `order` lists pyramid indices to try (default: all, in pyramid order); with
+    `confident`, the remaining scales are skipped once a match reaches that score.
+    Indices actually tried are appended to `tried` when given.
+    Returns (best_val, best_loc, best_size).
+    """
+    pyramid = entry['pyramid']
+    masks = entry.get('masks')
+    coarse = entry.get('coarse')
+    mode = entry.get('mode', 'bgr')
+    img_cv = convert(img_cv, mode)
+    if img_small is not None:
+        img_small = convert(img_small, mode)
+    if coarse and img_small is None:
+        img_small = downsample(img_cv, coarse[0])
+    best_val, best_loc, best_size = -1.0, None, (pyramid[0][2], pyramid[0][3])
+    for i in (range(len(pyramid)) if order is None else order):
+        scale, tpl_scaled, new_w, new_h = pyramid[i]
+        if tried is not None:
+            tried.append(i)
+        if new_w > img_cv.shape[1] or new_h > img_cv.shape[0]:
+            continue
+        if coarse and coarse[1][i][2] <= img_small.shape[1] and coarse[1][i][3] <= img_small.shape[0]:
+            val, loc = match_level_coarse(img_cv, img_small, tpl_scaled, coarse[1][i][1], coarse[0], method=method,
+                                          mask=masks[i] if masks else None)
+        else:
+            # plain template, or a region too small to shrink usefully (e.g. a partial re-match ROI)
+            _, val, _, loc = cv2.minMaxLoc(match_template(img_cv, tpl_scaled, method, masks[i] if masks else None))
+        if loc is not None and val > best_val:
+            best_val, best_loc, best_size = val, loc, (new_w, new_h)
+        if confident is not None and best_val >= confident:
+            break
+    return best_val, best_loc, best_size
+
+
+def local_peaks(res, floor, w, h, limit):
+    """
+    Local maxima of a matchTemplate result scoring at least `floor`, strongest first,
+    as [(val, (x, y)), ...] (at most `limit`). A peak must be the maximum within about
+    half a template around it, so the plateau around one hit yields one candidate.
+    """
+    kernel = np.ones((max(3, h // 2) | 1, max(3, w // 2) | 1), np.uint8)
+    dilated = cv2.dilate(res, kernel)
+    ys, xs = np.nonzero((res >= floor) & (res == dilated))
+    if not len(xs):
+        return []
+    vals = res[ys, xs]
+    top = np.argsort(vals)[::-1][:limit]
+    return [(float(vals[i]), (int(xs[i]), int(ys[i]))) for i in top]
+
+
+def _iou(a, b):
+    (ax, ay), (aw, ah) = a
+    (bx, by), (bw, bh) = b
+    iw = min(ax + aw, bx + bw) - max(ax, bx)
+    ih = min(ay + ah, by + bh) - max(ay, by)
+    if iw <= 0 or ih <= 0:
+        return 0.0
+    inter = iw * ih
+    return inter / float(aw * ah + bw * bh - inter)
+
+
+def nms(candidates, iou=0.3, max_hits=None):
+    """Greedy non-maximum suppression over [(val, loc, size), ...]; returns the kept ones, strongest first."""
+    kept = []
+    for cand in sorted(candidates, key=lambda c: c[0], reverse=True):
+        if all(_iou((cand[1], cand[2]), (k[1], k[2])) <= iou for k in kept):
+            kept.append(cand)
+            if max_hits is not None and len(kept) >= max_hits:
+                break
+    return kept
+
+
+def select_hits(candidates, threshold, max_hits=8, extra_threshold=None, iou=0.3):
+    """
+    Non-maximum suppressed hits from [(val, loc, size), ...]: the strongest must reach
+    `threshold`, further ones `extra_threshold` (default: `threshold`). Strongest first.
+    """
+    if extra_threshold is None:
+        extra_threshold = threshold
+    kept = nms(candidates, iou, max_hits)
+    if not kept or kept[0][0] < threshold:
+        return []
+    return [kept[0]] + [c for c in kept[1:] if c[0] >= extra_threshold]
+
+
+def match_entry_all(img_cv, entry, threshold, max_hits=8, extra_threshold=None, iou=0.3, method=cv2.TM_CCOEFF_NORMED,
+                    img_small=None):
+    """
+    Every instance of a loaded template on `img_cv`, from one match per scale.
+    The strongest hit must reach `threshold`, further hits `extra_threshold`
+    (default: `threshold`); overlapping boxes, also across scales, are suppressed.
+    Returns [(val, loc, size), ...], strongest first. Templates with a coarse-to-fine
+    factor refine 4 * max_hits coarse peaks per scale (`img_small` as for match_entry).
+    """
+    if extra_threshold is None:
+        extra_threshold = threshold
+    mode = entry.get('mode', 'bgr')
+    img_cv = convert(img_cv, mode)
+    coarse = entry.get('coarse')
+    if coarse:
+        img_small = downsample(img_cv, coarse[0]) if img_small is None else convert(img_small, mode)
+    floor = min(threshold, extra_threshold)
+    masks = entry.get('masks')
+    candidates = []
+    for i, (scale, tpl_scaled, new_w, new_h) in enumerate(entry['pyramid']):
+        if new_w > img_cv.shape[1] or new_h > img_cv.shape[0]:
+            continue
+        mask = masks[i] if masks else None
+        if coarse and coarse[1][i][2] <= img_small.shape[1] and coarse[1][i][3] <= img_small.shape[0]:
+            peaks = [p for p in match_level_coarse_all(img_cv, img_small, tpl_scaled, coarse[1][i][1], coarse[0],
+                                                       4 * max_hits, method, mask) if p[0] >= floor]
+        else:
+            peaks = local_peaks(match_template(img_cv, tpl_scaled, method, mask), floor, new_w, new_h, 4 * max_hits)
+        for val, loc in peaks:
+            candidates.append((val, loc, (new_w, new_h)))
+    return select_hits(candidates, threshold, max_hits, extra_threshold, iou)
+
+
+def match_template_multi(img_cv, tpl_cv, tpl_w, tpl_h, scales=(0.8, 0.9, 1.0, 1.1), method=cv2.TM_CCOEFF_NORMED):
+    # returns (best_val, best_loc, best_size); prefer match_pyramid with a prebuilt pyramid in loops
+    best_val, best_loc, best_size = match_pyramid(img_cv, build_pyramid(tpl_cv, tpl_w, tpl_h, scales), method)
+    if best_loc is None:
+        best_size = (tpl_w, tpl_h)
+    return best_val, best_loc, best_size
+
+
+def usable(entry):
+    return bool(entry) and not entry.get('missing') and entry.get('cv') is not None
+
+
+def find_templates(img_cv, templates, names, per_thresholds, origin=(0, 0), default_threshold=0.1, matcher=None):
+    """
+    Matches each named template against `img_cv` and keeps those scoring at or
+    above their threshold. Pass a change_detector.CachedMatcher (already updated
+    with `img_cv`) as `matcher` to reuse results on unchanged screens.
+
+    Returns {name: (center_x, center_y, score)} with centers in screen
+    coordinates (`origin` is the screen position of the image's top-left corner).
+    """
+    found = {}
+    for name in names:
+        entry = templates.get(name)
+        if not usable(entry):
+            continue
+        if matcher is not None:
+            best_val, best_loc, best_size = matcher.match(img_cv, name)
+        else:
+            best_val, best_loc, best_size = match_entry(img_cv, entry)
+        if best_val >= per_thresholds.get(name, default_threshold) and best_loc is not None:
+            center_x = origin[0] + best_loc[0] + best_size[0] // 2
+            center_y = origin[1] + best_loc[1] + best_size[1] // 2
+            found[name] = (center_x, center_y, best_val)
+    return found
@@ -0,0 +1,203 @@
+"""
+Template registry: every needle under a folder tree, loaded lazily from a compiled cache.
+
+`TemplateRegistry(repo_root, 'saved_images/gaming', ...)` scans the folder (and its
+subfolders) for needle PNGs once and behaves like the dict returned by
+load_templates: `registry['squirrel']` is a template entry. Entries are only loaded
+on first access, from the content-hash .npz cache in `cache_dir` when the needle
+was seen before, so starting a bot costs a directory scan plus the needles it
+actually matches. Needles in subfolders are keyed by relative path ('boxes/gold').
+
+A small index (`index.json` in `cache_dir`) remembers each needle's content hash
+against its size and modification time, so unchanged needles are not even read
+to find their cache file.
+
+Per-needle metadata - size, mask, threshold, preferred scale, matching mode - is
+available without loading pixels via `metadata(name)`, and loaded entries carry
+'threshold' and 'preferred_scale' keys as well.
+
+Compile the cache for every needle under saved_images/ ahead of time and list them:
+    python -m computer_vision.template_registry
+    python -m computer_vision.template_registry --folder saved_images/gaming
+"""
+import argparse
+import json
+import os
+import struct
+import threading
+import time
+from collections.abc import Mapping
+
+from computer_vision.template_matching import DEFAULT_SCALES, content_hash, load_entry, mask_path
+
+
+INDEX_FILE = 'index.json'
+
+
+def png_size(path):
+    """(w, h) from the PNG header, without decoding the image."""
+    with open(path, 'rb') as f:
+        head = f.read(24)
+    if head[:8] != b'\x89PNG\r\n\x1a\n' or head[12:16] != b'IHDR':
+        raise ValueError(f'{path} is not a PNG')
+    return struct.unpack('>II', head[16:24])
+
+
+class TemplateRegistry(Mapping):
+    def __init__(self, repo_root, folder=os.path.join('saved_images', 'gaming'), scales=DEFAULT_SCALES, cache_dir=None,
+                 coarse=None, modes=None, thresholds=None, default_threshold=0.1, scale_memory=None, use_masks=True):
+        """
+        coarse / modes: {name: factor} / {name: mode} as for load_templates.
+        thresholds: detection threshold per name (metadata only; detectors take their own).
+        scale_memory: a ScaleMemory to report each needle's preferred scale from.
+        """
+        self.root = os.path.join(repo_root, folder)
+        self.scales = tuple(scales)
+        self.cache_dir = cache_dir
+        self.coarse = coarse or {}
+        self.modes = modes or {}
+        self.thresholds = thresholds or {}
+        self.default_threshold = default_threshold
+        self.scale_memory = scale_memory
+        self.use_masks = use_masks
+        self._entries = {}
+        self._lock = threading.Lock()
+        self._paths = self._scan()
+        self._index = self._load_index()
+        self._index_dirty = False
+
+    def _scan(self):
+        paths = {}
+        for dirpath, dirnames, filenames in os.walk(self.root):
+            dirnames.sort()
+            for fname in sorted(filenames):
+                if not fname.lower().endswith('.png') or fname.lower().endswith('.mask.png'):
+                    continue
+                path = os.path.join(dirpath, fname)
+                key = os.path.splitext(os.path.relpath(path, self.root))[0].replace(os.sep, '/')
+                paths[key] = path
+        return paths
+
+    def _load_index(self):
+        if not self.cache_dir:
+            return {}
+        try:
+            with open(os.path.join(self.cache_dir, INDEX_FILE), 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except Exception:
+            return {}
+
+    def _stamp(self, path):
+        stamp = []
+        for p in (path, mask_path(path)):
+            if os.path.exists(p):
+                st = os.stat(p)
+                stamp += [st.st_size, st.st_mtime_ns]
+            else:
+                stamp += [None, None]
+        return stamp
+
+    def _digest(self, path):
+        """Content hash of a needle, from the index when its files are unchanged."""
+        stamp = self._stamp(path)
+        key = os.path.abspath(path)  # registries over different folders share the index
+        known = self._index.get(key)
+        if known and known[0] == stamp:
+            return known[1]
+        digest = content_hash(path)
+        self._index[key] = [stamp, digest]
+        self._index_dirty = True
+        return digest
+
+    def save_index(self):
+        if not self.cache_dir or not self._index_dirty:
+            return
+        with self._lock:
+            data = json.dumps(self._index, indent=1, sort_keys=True)
+            self._index_dirty = False
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            tmp = os.path.join(self.cache_dir, INDEX_FILE + '.tmp')
+            with open(tmp, 'w', encoding='utf-8') as f:
+                f.write(data)
+            os.replace(tmp, os.path.join(self.cache_dir, INDEX_FILE))
+        except Exception as e:
+            print(f'Could not save template index: {e}')
+
+    def __getitem__(self, name):
+        entry = self._entries.get(name)
+        if entry is not None:
+            return entry
+        path = self._paths[name]  # KeyError for unknown needles, like a dict
+        with self._lock:
+            entry = self._entries.get(name)
+            if entry is None:
+                digest = self._digest(path) if self.cache_dir else None
+                entry = load_entry(path, self.scales, self.cache_dir, self.coarse.get(name),
+                                   self.modes.get(name, 'bgr'), self.use_masks, digest, key=name)
+                if not entry.get('missing'):
+                    entry['threshold'] = self.thresholds.get(name, self.default_threshold)
+                    entry['preferred_scale'] = self.scale_memory.preferred(name) if self.scale_memory else None
+                self._entries[name] = entry
+        if self._index_dirty:
+            self.save_index()
+        return entry
+
+    def __iter__(self):
+        return iter(self._paths)
+
+    def __len__(self):
+        return len(self._paths)
+
+    def __contains__(self, name):
+        return name in self._paths
+
+    def loaded(self):
+        """Names whose entries have been loaded so far."""
+        return list(self._entries)
+
+    def preload(self, names=None):
+        """Loads `names` (default: all) now instead of on first use."""
+        for name in (self._paths if names is None else names):
+            if name in self._paths:
+                self[name]
+
+    def metadata(self, name):
+        """{'path', 'w', 'h', 'mask', 'threshold', 'preferred_scale', 'mode', 'gray'} without decoding pixels."""
+        path = self._paths[name]
+        w, h = png_size(path)
+        mode = self.modes.get(name, 'bgr')
+        return {
+            'path': path,
+            'w': w,
+            'h': h,
+            'mask': os.path.exists(mask_path(path)),
+            'threshold': self.thresholds.get(name, self.default_threshold),
+            'preferred_scale': self.scale_memory.preferred(name) if self.scale_memory else None,
+            'mode': mode,
+            'gray': mode != 'bgr',
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compile the template cache and list needle metadata.')
+    parser.add_argument('--folder', default='saved_images', help='needle folder, relative to the repo root')
+    args = parser.parse_args()
+
+    repo_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+    start = time.perf_counter()
+    registry = TemplateRegistry(repo_root, args.folder, cache_dir=os.path.join(repo_root, 'cache', 'templates'))
+    scanned = time.perf_counter()
+    registry.preload()
+    loaded = time.perf_counter()
+    print(f"{'needle':<32} {'size':>9} {'mask':>5}  status")
+    for name in registry:
+        meta = registry.metadata(name)
+        entry = registry[name]
+        status = 'ok' if not entry.get('missing') else f"error: {entry.get('error')}"
+        print(f"{name:<32} {meta['w']:>4}x{meta['h']:<4} {'yes' if meta['mask'] else 'no':>5}  {status}")
+    print(f'{len(registry)} needle(s): scan {(scanned - start) * 1000.0:.1f} ms, load {(loaded - scanned) * 1000.0:.1f} ms')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,120 @@
+"""
+Rate-controlled clicking: a token bucket whose rate follows the screen.
+
+The box loops clicked at a fixed period whether or not the game kept up.
+ClickThrottle hands out clicks from a token bucket refilled at `rate` clicks/sec
+(at most `burst` saved up). After every click it peeks at a watched region (a
+counter, or the area around the button): while the region keeps changing the
+rate climbs by `raise_step` clicks/sec up to `max_rate`; after `patience` clicks
+in a row without a visible effect it is multiplied by `backoff` (down to
+`min_rate`). The loop settles at the fastest rate the game actually absorbs.
+Without a watched region the bucket simply holds the rate at `max_rate`.
+
+Usage:
+    throttle = ClickThrottle(max_rate=20, watch=(x, y, w, h))  # e.g. the box counter
+    while running:
+        throttle.click(lambda: input_backend.click(x, y))
+    for line in throttle.report():
+        print(line)
+"""
+import threading
+import time
+
+import numpy as np
+
+from computer_vision import capture
+
+
+class ClickThrottle:
+    def __init__(self, max_rate=20.0, min_rate=1.0, start_rate=None, burst=3, watch=None, threshold=2.0,
+                 raise_step=0.5, backoff=0.7, patience=5):
+        """
+        max_rate / min_rate: bounds of the click rate (clicks/sec).
+        start_rate: initial rate (default: half of max_rate, or max_rate without `watch`).
+        burst: bucket size, i.e. clicks that may go out back to back after a pause.
+        watch: region (x, y, w, h) whose change shows a click had an effect; None = fixed rate, no feedback.
+        threshold: mean absolute difference (0-255) of the region that counts as a change.
+        """
+        self.max_rate = float(max_rate)
+        self.min_rate = float(min_rate)
+        if start_rate is None:
+            start_rate = max(min_rate, max_rate / 2.0) if watch is not None else max_rate
+        self.rate = float(start_rate)
+        self.burst = burst
+        self.watch = watch
+        self.threshold = threshold
+        self.raise_step = raise_step
+        self.backoff = backoff
+        self.patience = patience
+        self._tokens = float(burst)
+        self._refilled = time.monotonic()
+        self._reference = None
+        self._quiet = 0
+        self._lock = threading.Lock()
+        self.stats = {'clicks': 0, 'effective': 0, 'backoffs': 0, 'peak_rate': self.rate, 'started': None}
+
+    def acquire(self):
+        """Blocks until the bucket holds a token and takes it."""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.burst, self._tokens + (now - self._refilled) * self.rate)
+                self._refilled = now
+                if self._tokens >= 1.0:
+                    self._tokens -= 1.0
+                    return
+                wait = (1.0 - self._tokens) / self.rate
+            time.sleep(wait)
+
+    def _changed(self):
+        """True when the watched region differs from the previous peek (which becomes the new reference)."""
+        # straight from the backend, so a session recording does not fill up with peeks;
+        # astype copies: grabbed frames are recycled
+        current = capture.get_backend().grab(self.watch).astype(np.int16)
+        previous, self._reference = self._reference, current
+        if previous is None or previous.shape != current.shape:
+            return False
+        return float(np.abs(current - previous).mean()) > self.threshold
+
+    def feedback(self, effective):
+        """Adjusts the rate after one click: up when it had an effect, down after `patience` misses."""
+        with self._lock:
+            if effective:
+                self._quiet = 0
+                self.stats['effective'] += 1
+                self.rate = min(self.max_rate, self.rate + self.raise_step)
+                self.stats['peak_rate'] = max(self.stats['peak_rate'], self.rate)
+            else:
+                self._quiet += 1
+                if self._quiet >= self.patience:
+                    self._quiet = 0
+                    self.stats['backoffs'] += 1
+                    self.rate = max(self.min_rate, self.rate * self.backoff)
+
+    def click(self, perform):
+        """Waits for a token, runs `perform()` and adapts the rate to what the screen shows."""
+        if self.stats['started'] is None:
+            self.stats['started'] = time.monotonic()
+            if self.watch is not None:
+                self._changed()  # first reference
+        self.acquire()
+        result = perform()
+        self.stats['clicks'] += 1
+        if self.watch is not None:
+            # the change seen now is the effect of the clicks since the last peek
+            self.feedback(self._changed())
+        return result
+
+    def report(self):
+        """Actions per minute sent and with a visible effect, and where the rate ended up."""
+        st = dict(self.stats)
+        if st['started'] is None:
+            return ['No clicks sent']
+        minutes = max(1e-9, (time.monotonic() - st['started']) / 60.0)
+        lines = [f"Clicks: {st['clicks']} in {minutes * 60.0:.0f} s = {st['clicks'] / minutes:.0f}/min"]
+        if self.watch is not None:
+            lines.append(f"Effective: {st['effective']} = {st['effective'] / minutes:.0f}/min "
+                         f"({100.0 * st['effective'] / max(1, st['clicks']):.0f}% of clicks)")
+        lines.append(f"Rate: {self.rate:.1f}/s at the end, peak {st['peak_rate']:.1f}/s, "
+                     f"limit {self.max_rate:.1f}/s, backed off {st['backoffs']} time(s)")
+        return lines
@@ -0,0 +1,99 @@
+"""
+Closed-loop clicks: click once, check the screen reacted, retry only if it did not.
+
+The bots clicked important buttons twice "just in case". act_and_verify clicks
+once and polls the next frames for the expected change; only when the change
+does not show within `timeout` is the click repeated (up to `retries` times).
+First-try success is counted per target, so the report shows which buttons
+actually need a second click.
+
+`expected_change` is either a region (x, y, w, h), verified as that region
+changing from just before the click, or a predicate from wait.py that is
+already false before the click (e.g. pixel_gone(key)).
+
+Usage:
+    ok = act_and_verify(lambda: click_pixel('chest_skill_pixel'), around(x, y), 'chest')
+    for line in verifier.report():
+        print(line)
+
+With a LatencyModel, the time to the change of every verified click is also
+learned as a sample of the target's latency (and a failed attempt as a miss), and
+each attempt waits only a little longer than the target's learned delay.
+"""
+import threading
+import time
+
+from computer_vision.wait import screen_changed, wait_until
+
+
+DEFAULT_TIMEOUT = 0.5
+DEFAULT_RETRIES = 1
+
+
+class ClickVerifier:
+    def __init__(self, timeout=DEFAULT_TIMEOUT, retries=DEFAULT_RETRIES, poll_interval=0.01, latency=None):
+        """
+        timeout: seconds each attempt waits for the change (with `latency`: the target's delay x backoff_step).
+        retries: extra clicks after a failed attempt.
+        latency: optional LatencyModel fed with the targets' click-to-change times.
+        """
+        self.timeout = timeout
+        self.retries = retries
+        self.poll_interval = poll_interval
+        self.latency = latency
+        self._lock = threading.Lock()
+        self.stats = {}
+
+    def _count(self, target, key):
+        with self._lock:
+            st = self.stats.setdefault(target, {'actions': 0, 'first_try': 0, 'retried': 0, 'failed': 0, 'clicks': 0})
+            st[key] += 1
+
+    def act_and_verify(self, action, expected_change, target='click', timeout=None, retries=None):
+        """
+        Runs `action()` until `expected_change` shows, at most 1 + `retries` times.
+        Returns True when the change was seen, False when every attempt failed.
+        """
+        if timeout is None:
+            timeout = self.timeout
+            if self.latency is not None:
+                # a few frames: one backoff step beyond the target's learned delay
+                timeout = min(self.latency.max_delay, self.latency.delay(target) * self.latency.backoff_step)
+        retries = self.retries if retries is None else retries
+        self._count(target, 'actions')
+        for attempt in range(1 + retries):
+            if callable(expected_change):
+                changed = expected_change
+            else:
+                changed = screen_changed(expected_change)  # reference taken before the click
+            start = time.perf_counter()
+            action()
+            self._count(target, 'clicks')
+            if wait_until(changed, timeout=timeout, poll_interval=self.poll_interval):
+                if self.latency is not None:
+                    self.latency.record(target, time.perf_counter() - start)
+                self._count(target, 'first_try' if attempt == 0 else 'retried')
+                return True
+            if self.latency is not None:
+                self.latency.record(target, None)
+        print(f'act_and_verify: {target} did not react after {1 + retries} click(s)')
+        self._count(target, 'failed')
+        return False
+
+    def report(self):
+        """One line per target: first-try success rate, retried and failed actions, clicks per action."""
+        with self._lock:
+            stats = {t: dict(s) for t, s in self.stats.items()}
+        lines = []
+        for target, st in sorted(stats.items()):
+            n = max(1, st['actions'])
+            lines.append(f"{target:<20} first try {100.0 * st['first_try'] / n:5.1f}% of {st['actions']}, "
+                         f"retried {st['retried']}, failed {st['failed']}, {st['clicks'] / n:.2f} clicks/action")
+        return lines
+
+
+verifier = ClickVerifier()
+
+
+def act_and_verify(action, expected_change, target='click', timeout=None, retries=None):
+    return verifier.act_and_verify(action, expected_change, target, timeout, retries)
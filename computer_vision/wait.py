@@ -0,0 +1,140 @@
+"""
+Condition-based waits for task flows.
+
+Instead of sleeping a fixed time after a click, wait for the screen to show the
+state the next step needs:
+    pyautogui.press('q')
+    wait_until(pixel_matches('skillbar_up_pixel', 20), timeout=1.0, label='skill bar')
+
+`wait_until` polls a predicate every `poll_interval` seconds and returns as soon
+as it holds, so a flow runs at the speed of the UI; `timeout` bounds the wait
+(use the old fixed sleep, so the worst case is unchanged). The shared frame cache
+is invalidated before every poll, so each poll sees a fresh capture.
+
+Predicates:
+- pixel_matches / pixel_gone / any_pixel: pixel_data.json keys (one small capture)
+- screen_changed: a region differs from when the predicate was made (take it before the click)
+- screen_stable: a region stopped changing (an animation finished)
+- tiles_changed: a share of a wide region's tiles differ from when the predicate was made
+- template_visible: a loaded template matches inside a region
+"""
+import time
+
+import numpy as np
+
+from computer_vision import capture
+from computer_vision.frame_cache import screen_cache
+
+
+DEFAULT_TIMEOUT = 2.0
+DEFAULT_POLL = 0.03
+
+
+def wait_until(predicate, timeout=DEFAULT_TIMEOUT, poll_interval=DEFAULT_POLL, label=None):
+    """
+    Polls `predicate()` until it returns something truthy and returns that value,
+    or False once `timeout` seconds have passed (printing `label` when given).
+    """
+    start = time.monotonic()
+    deadline = start + timeout
+    while True:
+        screen_cache.invalidate()
+        result = predicate()
+        if result:
+            return result
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            if label:
+                print(f'wait_until: {label} not seen after {timeout:.2f}s')
+            return False
+        time.sleep(min(poll_interval, remaining))
+
+
+def pixel_matches(key, tolerance=10):
+    """True while the pixel_data.json pixel `key` shows its colour."""
+    from computer_vision.pixel_functions import check_pixels  # loads pixel_data.json relative to the repo root
+    return lambda: check_pixels((key,), tolerance)[0][key]
+
+
+def pixel_gone(key, tolerance=10):
+    """True while the pixel_data.json pixel `key` does not show its colour."""
+    matches = pixel_matches(key, tolerance)
+    return lambda: not matches()
+
+
+def any_pixel(keys, tolerance=10):
+    """The first of `keys` showing its colour (truthy), or None; one capture per poll."""
+    from computer_vision.pixel_functions import check_pixels
+    keys = list(keys)
+
+    def predicate():
+        found, _ = check_pixels(keys, tolerance)
+        return next((k for k in keys if found[k]), None)
+    return predicate
+
+
+def _peek(region):
+    """A capture for polling: straight from the backend, so a session recording does not fill up with polls."""
+    return capture.get_backend().grab(region)
+
+
+def around(x, y, radius=20):
+    """Square region (x, y, w, h) centred on a screen position."""
+    return int(x) - radius, int(y) - radius, 2 * radius + 1, 2 * radius + 1
+
+
+def screen_changed(region, threshold=8.0):
+    """
+    Captures `region` now; the returned predicate is True once the region's mean
+    absolute difference from that capture exceeds `threshold` (0-255).
+    """
+    reference = _peek(region).astype(np.int16)  # a copy: grabbed frames are recycled
+
+    def predicate():
+        return float(np.abs(_peek(region).astype(np.int16) - reference).mean()) > threshold
+    return predicate
+
+
+def screen_stable(region, polls=2, threshold=2.0):
+    """
+    True once `region` has stayed the same (mean absolute difference at most
+    `threshold`) over `polls` consecutive polls, e.g. a panel done animating open.
+    """
+    state = {'previous': None, 'still': 0}
+
+    def predicate():
+        current = _peek(region).astype(np.int16)  # a copy: grabbed frames are recycled
+        previous, state['previous'] = state['previous'], current
+        if previous is not None and float(np.abs(current - previous).mean()) <= threshold:
+            state['still'] += 1
+        else:
+            state['still'] = 0
+        return state['still'] >= polls
+    return predicate
+
+
+def tiles_changed(region, fraction=0.1, tile_size=64):
+    """
+    Captures `region` now; the returned predicate is True once at least `fraction` of
+    its tiles changed (change_detector.TileChangeDetector). For wide regions where one
+    action changes a few spots that a mean over the whole region would wash out.
+    """
+    from computer_vision.change_detector import TileChangeDetector
+    reference = _peek(region).copy()  # grabbed frames are recycled
+    detector = TileChangeDetector(tile_size)
+
+    def predicate():
+        detector.update(reference)
+        changed = detector.update(_peek(region))
+        return changed is not None and float(changed.mean()) >= fraction
+    return predicate
+
+
+def template_visible(entry, region, threshold):
+    """True while the loaded template `entry` matches at or above `threshold` inside `region`."""
+    from computer_vision.template_matching import match_entry
+
+    def predicate():
+        best_val, best_loc, _ = match_entry(_peek(region), entry)
+        return best_loc is not None and best_val >= threshold
+    return predicate
@@ -6,6 +6,7 @@ import sys
 
 from auxiliary import load_config
 import tasks
+from computer_vision.verify import verifier
 
 from scheduler import ScheduledJob, producer_loop, consumer_loop
 
@@ -59,6 +60,8 @@ def main():
     stop_evt.wait()
     prod.join()
     cons.join()
+    for line in verifier.report():
+        print(line)
     print("Goodbye.")
 
 if __name__ == "__main__":
@@ -1,6 +1,9 @@
 
 import time
-from computer_vision.pixel_functions import check_pixel, click_pixel
+from computer_vision.pixel_functions import check_pixel, check_pixels, click_pixel, get_pixel_data
+from computer_vision.frame_cache import invalidate
+from computer_vision.wait import wait_until, pixel_matches, pixel_gone, any_pixel, around
+from computer_vision.verify import act_and_verify
 import json
 import pyautogui
 
@@ -38,46 +41,48 @@ def check_refinery(profile_name: str):
 def collect_critters(profile_name: str):
     print(f"[{time.strftime('%X')}] collect_critters: not implemented")
 
+def chest_position():
+    position = get_pixel_data(chest_key)['position']
+    return position['x'], position['y']
+
+
 def deposit_loot():
     print(f"[{time.strftime('%X')}] >>> deposit_loot:")
     if not check_pixel(skillbar_up_pixel, tolerance=20):
         print(f"Skills are not active, activating skills.")
         pyautogui.press('q')
-    time.sleep(0.5)
-    if check_pixel(chest_key, tolerance=10):
-        click_pixel(chest_key)
-        click_pixel(chest_key)
-        time.sleep(1)
+        invalidate()
+        wait_until(pixel_matches(skillbar_up_pixel, 20), timeout=0.5, label='skill bar')
+    found, _ = check_pixels((chest_key,), tolerance=10)
+    if found[chest_key]:
+        # one click, a second only if the chest did not react (same 1 s worst case as before)
+        act_and_verify(lambda: click_pixel(chest_key), around(*chest_position()), chest_key, timeout=0.5)
 
         print(f"Clicked on {chest_key} pixel.")
         return True
     for i in range(3):
-        if check_pixel(chest_key, tolerance=10):
-            click_pixel(chest_key)
-            click_pixel(chest_key)
-            
-            time.sleep(1)
-            
+        found, _ = check_pixels((chest_key, skillbar_up_pixel), tolerance=10)
+        if found[chest_key]:
+            act_and_verify(lambda: click_pixel(chest_key), around(*chest_position()), chest_key, timeout=0.5)
 
             print(f"Clicked on {chest_key} pixel.")
             break
-        elif check_pixel(skillbar_up_pixel, tolerance=10):
+        elif found[skillbar_up_pixel]:
             click_pixel(skillbar_up_pixel)
             print(f"Changed skillbar")
-            time.sleep(1)
+            wait_until(pixel_matches(chest_key), timeout=1, label=chest_key)
         else:
             print(f"Could not find {chest_key} or {skillbar_up_pixel} pixel.")
-    
-    time.sleep(0.5)
-    if check_pixel(skillbar_up_pixel, tolerance=10):
+            wait_until(any_pixel((chest_key, skillbar_up_pixel)), timeout=1)
+
+    if wait_until(pixel_matches(skillbar_up_pixel), timeout=0.5):
         click_pixel(skillbar_up_pixel)
         print(f"Clicked on skillbar up pixel to close skills.")
-    
+        wait_until(pixel_gone(skillbar_up_pixel), timeout=1, label='skill bar closed')
+
     print(f"[{time.strftime('%X')}] <<< deposit_loot:")
-    time.sleep(1)
 
-    
-    
+
 def check_gaming(profile_name: str):
     print(f"[{time.strftime('%X')}] check_gaming: not implemented")
     
@@ -13,11 +13,14 @@ Stop with Ctrl+C.
 """
 import os
 import json
-import time
 import sys
 import msvcrt
 import threading
 
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from computer_vision.throttle import ClickThrottle
+from computer_vision import input_backend
+
 # Optional: global hotkey support. Falls back to console-only input if not available.
 try:
     import keyboard
@@ -60,7 +63,7 @@ def load_locations(path):
     return mapping
 
 
-def main():
+def main(max_rate=20.0, min_rate=2.0, watch=None):
     base = os.path.dirname(__file__)
     # saved_locations is at repository root (parent of this folder)
     repo_root = os.path.abspath(os.path.join(base, '..'))
@@ -87,6 +90,10 @@ def main():
     # small pause between pyautogui calls (can be adjusted)
     pyautogui.PAUSE = 0.01
 
+    # clicks come from a token bucket: with --watch (e.g. the box counter) the rate rises while that
+    # region keeps changing and backs off when clicks stop showing; without it the rate stays at max_rate
+    throttle = ClickThrottle(max_rate=max_rate, min_rate=min_rate, watch=watch)
+
     stop_event = threading.Event()
     if KEYBOARD_AVAILABLE:
         # register global hotkeys (works even when the console is not focused)
@@ -116,13 +123,13 @@ def main():
                 except Exception:
                     # non-fatal if console input isn't available
                     pass
-            # click UseBoxes once
-            pyautogui.click(use_box['x'], use_box['y'])
-            # repeat delay
-            time.sleep(0.05)
+            # click UseBoxes as fast as the watched region keeps reacting
+            throttle.click(lambda: input_backend.click(use_box['x'], use_box['y']))
     except KeyboardInterrupt:
         print('\nStopped by user (KeyboardInterrupt).')
     finally:
+        for line in throttle.report():
+            print(line)
         # cleanup keyboard hooks if they were registered
         if KEYBOARD_AVAILABLE:
             try:
@@ -132,4 +139,11 @@ def main():
 
 
 if __name__ == '__main__':
-    main()
+    import argparse
+    parser = argparse.ArgumentParser(description='Click UseBoxes at the fastest rate the game keeps up with.')
+    parser.add_argument('--max-rate', type=float, default=20.0, help='click rate limit in clicks/sec (default 20)')
+    parser.add_argument('--min-rate', type=float, default=2.0, help='lowest rate when backing off (default 2)')
+    parser.add_argument('--watch', nargs=4, type=int, metavar=('X', 'Y', 'W', 'H'), default=None,
+                        help='region whose change shows a click worked, e.g. the box counter (default: fixed rate)')
+    args = parser.parse_args()
+    main(max_rate=args.max_rate, min_rate=args.min_rate, watch=tuple(args.watch) if args.watch else None)
@@ -15,6 +15,8 @@ Behavior:
 
 Run with:
     python auto_gaming.py
+    python auto_gaming.py --record saved_sessions/run1   (record frames + clicks for replay_gaming.py)
+    python auto_gaming.py --process-pool 4   (squirrel/rat sweep on 4 worker processes; see computer_vision/process_detector.py)
 
 Dependencies: pyautogui, Pillow, opencv-python (for template matching). Install missing packages with pip.
 """
@@ -47,12 +49,28 @@ except Exception:
     np = None
     CV2_AVAILABLE = False
 
-from PIL import ImageGrab, Image
-
 # import upgrade_garden from sibling module
 sys.path.insert(0, os.path.dirname(__file__))
 from upgrade_sequence import upgrade_garden
 
+# shared capture layer lives in computer_vision/ at the repository root
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from computer_vision.capture import grab
+from computer_vision.template_registry import TemplateRegistry
+from computer_vision.change_detector import CachedMatcher
+from computer_vision.detector import Detector
+from computer_vision.scale_memory import ScaleMemory
+from computer_vision.spatial_prior import SpatialPrior
+from computer_vision.pixel_signature import load_signature
+from computer_vision.color_screen import ColorScreen
+from computer_vision.process_detector import ProcessDetector
+from computer_vision.latency_model import LatencyModel
+from computer_vision.wait import around, tiles_changed
+from computer_vision.verify import ClickVerifier
+from computer_vision import recorder
+from computer_vision import input_backend
+from gaming_settings import PER_THRESHOLDS, SCALES, COARSE_TO_FINE, CONFIDENT_SCORE, CONFIDENT_SCORES, SPATIAL_PRIOR, MATCH_MODES, MULTI_INSTANCE, COLOR_SCREEN, COLOR_SCREEN_FRACTION, HARVEST_CHANGED_TILES
+
 
 def load_locations(path):
     if not os.path.exists(path):
@@ -89,61 +107,19 @@ def load_region(path):
     return int(r['x']), int(r['y']), int(r['w']), int(r['h'])
 
 
-def load_templates(repo_root):
-    names = ['log.png', 'squirrel.png', 'squirrel_2.png', 'squirrel_upgrade.png', 'chem_plant_1.png', 'chem_plant_2.png', 'log_minigame.png', 'rat.png', 'rat_upgrade.png', 'rat_upgrade_2.png']
-    templates = {}
-    for fname in names:
-        path = os.path.join(repo_root, 'saved_images', 'gaming', fname)
-        key = os.path.splitext(fname)[0]
-        if not os.path.exists(path):
-            templates[key] = {'missing': True, 'path': path}
-            continue
-        try:
-            pil = Image.open(path).convert('RGBA')
-            w, h = pil.size
-            entry = {'missing': False, 'path': path, 'w': w, 'h': h}
-            if CV2_AVAILABLE:
-                arr = np.array(pil)
-                if arr.shape[2] == 4:
-                    arr = cv2.cvtColor(arr, cv2.COLOR_RGBA2BGR)
-                else:
-                    arr = cv2.cvtColor(arr, cv2.COLOR_RGB2BGR)
-                entry['cv'] = arr
-            else:
-                entry['cv'] = None
-            templates[key] = entry
-        except Exception as e:
-            templates[key] = {'missing': True, 'path': path, 'error': str(e)}
-    return templates
-
-
-def match_template_multi(img_cv, tpl_cv, tpl_w, tpl_h, scales=(0.8, 0.9, 1.0, 1.1), method=cv2.TM_CCOEFF_NORMED):
-    # returns (best_val, best_loc, best_size)
-    best_val = -1.0
-    best_loc = None
-    best_size = (tpl_w, tpl_h)
-    for scale in scales:
-        new_w = max(1, int(tpl_w * scale))
-        new_h = max(1, int(tpl_h * scale))
-        if new_w > img_cv.shape[1] or new_h > img_cv.shape[0]:
-            continue
-        try:
-            if scale == 1.0:
-                tpl_scaled = tpl_cv
-            else:
-                tpl_scaled = cv2.resize(tpl_cv, (new_w, new_h), interpolation=cv2.INTER_AREA if scale < 1.0 else cv2.INTER_LINEAR)
-            res = cv2.matchTemplate(img_cv, tpl_scaled, method)
-            _, max_val, _, max_loc = cv2.minMaxLoc(res)
-            if max_val > best_val:
-                best_val = max_val
-                best_loc = max_loc
-                best_size = (new_w, new_h)
-        except Exception:
-            continue
-    return best_val, best_loc, best_size
+def click(x, y, label=None):
+    input_backend.click(x, y)
+    recorder.record_click(x, y, label)
+
 
+def click_burst(x, y, n, interval, label=None):
+    """`n` clicks at (x, y) in one backend call (one cursor move, no per-click overhead)."""
+    input_backend.click_burst(x, y, n, interval)
+    for _ in range(n):
+        recorder.record_click(x, y, label)
 
-def main():
+
+def main(record_dir=None, sweep_workers=0, use_color_screen=False):
     base = os.path.dirname(__file__)
     repo_root = os.path.abspath(os.path.join(base, '..'))
 
@@ -175,9 +151,19 @@ def main():
     except Exception as e:
         print('Error loading region:', e)
         return
+    region = (rx, ry, rw, rh)
+
+    # templates: every needle in saved_images/gaming, each loaded from the compiled cache on first use;
+    # scales are tried in the order that won before (kept across runs)
+    scale_memory = ScaleMemory(os.path.join(repo_root, 'cache', 'scale_stats.json'), PER_THRESHOLDS,
+                               CONFIDENT_SCORE, CONFIDENT_SCORES)
+    templates = TemplateRegistry(repo_root, os.path.join('saved_images', 'gaming'), SCALES,
+                                 cache_dir=os.path.join(repo_root, 'cache', 'templates'), coarse=COARSE_TO_FINE,
+                                 modes=MATCH_MODES, thresholds=PER_THRESHOLDS, scale_memory=scale_memory)
 
-    # templates
-    templates = load_templates(repo_root)
+    if record_dir:
+        recorder.start(record_dir)
+        print(f'Recording captures and clicks to {record_dir}')
 
     # set up keyboard stop
     stop_event = threading.Event()
@@ -191,9 +177,56 @@ def main():
     pyautogui.FAILSAFE = False
     pyautogui.PAUSE = 0.01
 
-    per_thresholds = {'log': 0.1, 'squirrel': 0.1, 'squirrel_2': 0.1, 'squirrel_upgrade': 0.85, 'chem_plant_1': 0.6, 'chem_plant_2': 0.6, 'log_minigame': 0.7, 'rat': 0.1, 'rat_upgrade': 0.85, 'rat_upgrade_2': 0.85}
-    scales = [0.85, 0.9, 1.0, 1.05]
-    click_delay = 0.05  # delay after clicks to reduce missed clicks
+    origin = (rx, ry)
+
+    # re-match templates only where the garden actually changed between captures,
+    # fanning the per-template matches of each frame out over a thread pool
+    matcher = CachedMatcher(templates, scale_memory=scale_memory)
+    # upgrade buttons and the log minigame are looked for where they last appeared first
+    spatial_prior = SpatialPrior(SPATIAL_PRIOR)
+    # optionally, rats and squirrels are not matched at all on frames without their colours
+    # (off by default: check its skip and miss rates first with replay_gaming.py --check-color-screen)
+    color_screen = ColorScreen(templates, COLOR_SCREEN, min_fraction=COLOR_SCREEN_FRACTION) if use_color_screen else None
+    # chem plants and squirrels: every instance on the frame is reported and clicked
+    detector = Detector(templates, PER_THRESHOLDS, matcher=matcher, spatial_prior=spatial_prior, multi=MULTI_INSTANCE,
+                        color_screen=color_screen)
+    # the squirrel/rat sweep every 50 iterations scans the whole region; optionally on worker processes
+    sweep_names = ['squirrel', 'squirrel_2', 'rat']
+    sweep_detector = None
+    if sweep_workers:
+        sweep_detector = ProcessDetector(templates, PER_THRESHOLDS, sweep_names, max_workers=sweep_workers,
+                                         multi=MULTI_INSTANCE, color_screen=color_screen)
+
+    def capture_frame():
+        frame = grab(region)
+        matcher.update(frame)
+        return frame
+
+    # the log minigame is checked from a few pixels (saved_signatures/log_minigame.json, made with
+    # computer_vision/pixel_signature.py); only an ambiguous reading costs a template match
+    log_signature = load_signature(repo_root, 'log_minigame')
+
+    def log_minigame_present(frame):
+        if log_signature is not None:
+            present = log_signature.check(frame, origin)
+            if present is not None:
+                return present
+        return bool(detector.detect(frame, ['log_minigame']).get('log_minigame'))
+
+    # post-click delays learned per action from the time the screen takes to react (p95, kept across runs);
+    # the defaults are the old fixed delays, used until an action has a few samples
+    latency = LatencyModel(os.path.join(repo_root, 'cache', 'latency.json'),
+                           defaults={'harvest': 0.05, 'shovel': 0.05, 'chem_plant': 0.05, 'squirrel': 0.05,
+                                     'rat': 0.05, 'log': 0.05, 'upgrade': 0.05, 'log_minigame': 0.5})
+
+    # Harvest and shovel are clicked once and clicked again only when the screen did not react;
+    # their click-to-change times also feed the latency model
+    # (each attempt waits about the learned delay, so a retry costs what the old second click did)
+    verifier = ClickVerifier(retries=1, latency=latency)
+
+    def tap(x, y, label, action, region=None):
+        """Clicks and waits for the UI; the reaction is looked for around the click unless `region` is given."""
+        latency.act(action, lambda: click(x, y, label), region or around(x, y))
     check_log = False  # set to True to enable log template searching/clicking
 
     iteration = 1
@@ -214,190 +247,139 @@ def main():
                 except Exception:
                     pass
 
-            # Start every iteration by clicking Harvest twice, then sprinkler twice, then shovel twice
+            # Start every iteration by clicking Harvest, then shovel; each is re-clicked only if nothing changed
             try:
-                pyautogui.click(harvest['x'], harvest['y'])
-                time.sleep(click_delay)
-                pyautogui.click(harvest['x'], harvest['y'])
-                time.sleep(click_delay)
-                # pyautogui.click(sprinkler_btn['x'], sprinkler_btn['y'])
-                # time.sleep(click_delay)
-                # pyautogui.click(sprinkler_btn['x'], sprinkler_btn['y'])
-                # time.sleep(click_delay)
-                pyautogui.click(shovel_btn['x'], shovel_btn['y'])
-                time.sleep(click_delay)
-                pyautogui.click(shovel_btn['x'], shovel_btn['y'])
-                print(f'[{iteration}] Clicked Harvest x2, sprinkler x2, shovel x2')
+                # harvesting shows in the garden, not on the button: a share of the garden's tiles must change
+                # (a mean over the whole region would wash one harvest out)
+                verifier.act_and_verify(lambda: click(harvest['x'], harvest['y'], 'Harvest'),
+                                        tiles_changed(region, HARVEST_CHANGED_TILES), 'harvest')
+                # tap(sprinkler_btn['x'], sprinkler_btn['y'], 'sprinkler', 'sprinkler')
+                verifier.act_and_verify(lambda: click(shovel_btn['x'], shovel_btn['y'], 'shovel'),
+                                        around(shovel_btn['x'], shovel_btn['y']), 'shovel')
+                print(f'[{iteration}] Clicked Harvest and shovel')
             except Exception as e:
                 print(f'[{iteration}] Failed to click buttons:', e)
 
             # screenshot region and search for needles in order
             try:
-                screen = ImageGrab.grab(bbox=(rx, ry, rx + rw, ry + rh)).convert('RGB')
-                img_np = np.array(screen)
-                img_cv = cv2.cvtColor(img_np, cv2.COLOR_RGB2BGR)
+                img_cv = capture_frame()
             except Exception as e:
                 print(f'[{iteration}] Region capture failed:', e)
                 img_cv = None
 
-            found_map = {}  # name -> (center_x, center_y, score)
+            found_map = {}  # name -> [(center_x, center_y, score), ...]
             check_squirrels = (iteration % 50 == 0)
             if img_cv is not None and CV2_AVAILABLE:
-                # chem plants: check every iteration and click if present
+                # one consolidated detection pass over this frame;
+                # squirrels and rats are only checked every 50 iterations
+                names = ['chem_plant_1', 'chem_plant_2']
+                if check_squirrels and sweep_detector is None:
+                    names += sweep_names
+                if check_log:
+                    names.append('log')
+                detections = detector.detect(img_cv, names)
+                if check_squirrels:
+                    per_template = ', '.join(f'{n}={t * 1000.0:.1f}' for n, t in detector.last_timings.items())
+                    print(f'[{iteration}] Detection took {detector.last_wall * 1000.0:.1f} ms ({per_template} ms)')
+                    if sweep_detector is not None:
+                        detections.update(sweep_detector.detect(img_cv, sweep_names))
+                        per_template = ', '.join(f'{n}={t * 1000.0:.1f}' for n, t in sweep_detector.last_timings.items())
+                        print(f'[{iteration}] Process sweep took {sweep_detector.last_wall * 1000.0:.1f} ms ({per_template} ms)')
+
+                # chem plants: check every iteration and click every one on this frame
+                chem_clicked = []
                 for chem in ('chem_plant_1', 'chem_plant_2'):
-                    chem_entry = templates.get(chem)
-                    if chem_entry and not chem_entry.get('missing') and chem_entry.get('cv') is not None:
-                        cval, cloc, csize = match_template_multi(img_cv, chem_entry['cv'], chem_entry['w'], chem_entry['h'], scales=scales)
-                        if cval >= per_thresholds.get(chem, 0.1) and cloc is not None:
-                            cx = rx + cloc[0] + csize[0] // 2
-                            cy = ry + cloc[1] + csize[1] // 2
-                            try:
-                                pyautogui.click(cx, cy)
-                                print(f'[{iteration}] Clicked {chem} at ({cx},{cy}) score={cval:.2f}')
-                            except Exception as e:
-                                print(f'[{iteration}] Failed to click {chem}:', e)
-                            time.sleep(click_delay)
-                            # After clicking a chem plant, also click any detected squirrel twice
-                            try:
-                                screen_sq = ImageGrab.grab(bbox=(rx, ry, rx + rw, ry + rh)).convert('RGB')
-                                img_sq = cv2.cvtColor(np.array(screen_sq), cv2.COLOR_RGB2BGR)
-                                for sq_name in ('squirrel', 'squirrel_2'):
-                                    sq_entry = templates.get(sq_name)
-                                    if sq_entry and not sq_entry.get('missing') and sq_entry.get('cv') is not None:
-                                        sq_val, sq_loc, sq_size = match_template_multi(img_sq, sq_entry['cv'], sq_entry['w'], sq_entry['h'], scales=scales)
-                                        if sq_val >= per_thresholds.get(sq_name, 0.1) and sq_loc is not None:
-                                            sq_x = rx + sq_loc[0] + sq_size[0] // 2
-                                            sq_y = ry + sq_loc[1] + sq_size[1] // 2
-                                            pyautogui.click(sq_x, sq_y)
-                                            time.sleep(click_delay)
-                                            pyautogui.click(sq_x, sq_y)
-                                            print(f'[{iteration}] Clicked {sq_name} twice at ({sq_x},{sq_y}) after {chem} score={sq_val:.2f}')
-                                            time.sleep(click_delay)
-                                            break
-                            except Exception as e:
-                                print(f'[{iteration}] Failed squirrel check after {chem}:', e)
+                    for det in detections.get(chem, []):
+                        cx, cy = det.center(origin)
+                        try:
+                            tap(cx, cy, chem, 'chem_plant')
+                            chem_clicked.append(chem)
+                            print(f'[{iteration}] Clicked {chem} at ({cx},{cy}) score={det.score:.2f}')
+                        except Exception as e:
+                            print(f'[{iteration}] Failed to click {chem}:', e)
+                # After clicking chem plants, click every squirrel now on screen twice (one capture for all)
+                if chem_clicked:
+                    try:
+                        img_sq = capture_frame()
+                        sq_found = detector.detect(img_sq, ['squirrel', 'squirrel_2'])
+                        for sq_name in ('squirrel', 'squirrel_2'):
+                            for sq in sq_found.get(sq_name, []):
+                                sq_x, sq_y = sq.center(origin)
+                                tap(sq_x, sq_y, sq_name, 'squirrel')
+                                click(sq_x, sq_y, sq_name)
+                                print(f'[{iteration}] Clicked {sq_name} twice at ({sq_x},{sq_y}) after {len(chem_clicked)} chem plant(s) score={sq.score:.2f}')
+                                latency.sleep('squirrel')
+                    except Exception as e:
+                        print(f'[{iteration}] Failed squirrel check after chem plants:', e)
 
                 for name in ('squirrel', 'squirrel_2', 'rat', 'log'):
-                    # only check squirrels and rats every 100 iterations
-                    if name in ('squirrel', 'squirrel_2', 'rat') and not check_squirrels:
-                        continue
-                    if name == 'log' and not check_log:
-                        continue
-                    entry = templates.get(name)
-                    if not entry or entry.get('missing') or entry.get('cv') is None:
-                        continue
-                    best_val, best_loc, best_size = match_template_multi(img_cv, entry['cv'], entry['w'], entry['h'], scales=scales)
-                    thresh = per_thresholds.get(name, 0.1)
-                    if best_val >= thresh and best_loc is not None:
-                        center_x = rx + best_loc[0] + best_size[0] // 2
-                        center_y = ry + best_loc[1] + best_size[1] // 2
-                        found_map[name] = (center_x, center_y, best_val)
-
-            # Click in preferred order.
+                    if detections.get(name):
+                        found_map[name] = [det.center(origin) + (det.score,) for det in detections[name]]
+
+            # Click in preferred order, every instance found on the frame.
             preferred_order = ['squirrel', 'squirrel_2', 'rat', 'log']
             for name in preferred_order:
-                if name in found_map:
-                    cx, cy, score = found_map[name]
+                for cx, cy, score in found_map.get(name, []):
                     try:
-                        pyautogui.click(cx, cy)
+                        tap(cx, cy, name, 'squirrel' if name.startswith('squirrel') else name)
                         print(f'[{iteration}] Clicked {name} at ({cx},{cy}) score={score:.2f}')
                     except Exception as e:
                         print(f'[{iteration}] Failed to click {name}:', e)
-                    time.sleep(click_delay)
 
-                    # after clicking a squirrel, look for a 'squirrel_upgrade' template and click it up to 10 times if present
-                    if name in ('squirrel', 'squirrel_2'):
-                        sus = templates.get('squirrel_upgrade')
-                        if sus and not sus.get('missing') and sus.get('cv') is not None:
-                            try:
-                                # wait briefly for upgrade to appear, then re-capture region and search for upgrade
-                                time.sleep(0.1)
-                                screen2 = ImageGrab.grab(bbox=(rx, ry, rx + rw, ry + rh)).convert('RGB')
-                                img_np2 = np.array(screen2)
-                                img_cv2 = cv2.cvtColor(img_np2, cv2.COLOR_RGB2BGR)
-                                up_val, up_loc, up_size = match_template_multi(img_cv2, sus['cv'], sus['w'], sus['h'], scales=scales)
-                                if up_val >= per_thresholds.get('squirrel_upgrade', 0.85) and up_loc is not None:
-                                    up_x = rx + up_loc[0] + up_size[0] // 2
-                                    up_y = ry + up_loc[1] + up_size[1] // 2
-                                    try:
-                                        for _ in range(10):
-                                            pyautogui.click(up_x, up_y)
-                                            time.sleep(click_delay)
-                                        print(f'[{iteration}] Clicked squirrel_upgrade 10 times at ({up_x},{up_y}) score={up_val:.2f}')
-                                    except Exception as e:
-                                        print(f'[{iteration}] Failed to click squirrel_upgrade:', e)
-                            except Exception as e:
-                                print(f'[{iteration}] Error searching for squirrel_upgrade:', e)
-                    # after clicking a rat, look for a 'rat_upgrade' template and click it up to 10 times if present
-                    if name == 'rat':
-                        # wait briefly for upgrade to appear, then re-capture region
+                    # after clicking a squirrel or rat, look for its upgrade template(s) and click each up to 10 times if present
+                    if name in ('squirrel', 'squirrel_2', 'rat'):
+                        upgrade_names = ['squirrel_upgrade'] if name != 'rat' else ['rat_upgrade', 'rat_upgrade_2']
+                        # wait briefly for upgrade to appear, then re-capture region and search for upgrade
                         time.sleep(0.1)
                         try:
-                            screen2 = ImageGrab.grab(bbox=(rx, ry, rx + rw, ry + rh)).convert('RGB')
-                            img_np2 = np.array(screen2)
-                            img_cv2 = cv2.cvtColor(img_np2, cv2.COLOR_RGB2BGR)
+                            img_cv2 = capture_frame()
+                            upgrades = detector.detect(img_cv2, upgrade_names)
                         except Exception as e:
-                            print(f'[{iteration}] Region capture failed for rat upgrade check:', e)
-                            img_cv2 = None
-
-                        for rat_tpl_name in ('rat_upgrade', 'rat_upgrade_2'):
-                            rat_up = templates.get(rat_tpl_name)
-                            if img_cv2 is not None and rat_up and not rat_up.get('missing') and rat_up.get('cv') is not None:
+                            print(f'[{iteration}] Error searching for {"/".join(upgrade_names)}:', e)
+                            upgrades = {}
+                        for up_name in upgrade_names:
+                            for up in upgrades.get(up_name, [])[:1]:
+                                up_x, up_y = up.center(origin)
                                 try:
-                                    up_val, up_loc, up_size = match_template_multi(img_cv2, rat_up['cv'], rat_up['w'], rat_up['h'], scales=scales)
-                                    if up_val >= per_thresholds.get(rat_tpl_name, 0.85) and up_loc is not None:
-                                        up_x = rx + up_loc[0] + up_size[0] // 2
-                                        up_y = ry + up_loc[1] + up_size[1] // 2
-                                        try:
-                                            for _ in range(10):
-                                                pyautogui.click(up_x, up_y)
-                                                time.sleep(click_delay)
-                                            print(f'[{iteration}] Clicked {rat_tpl_name} 10 times at ({up_x},{up_y}) score={up_val:.2f}')
-                                        except Exception as e:
-                                            print(f'[{iteration}] Failed to click {rat_tpl_name}:', e)
+                                    # the first click measures the UI; the other 9 go out as one burst at that pace
+                                    tap(up_x, up_y, up_name, 'upgrade')
+                                    click_burst(up_x, up_y, 9, latency.delay('upgrade'), up_name)
+                                    print(f'[{iteration}] Clicked {up_name} 10 times at ({up_x},{up_y}) score={up.score:.2f}')
                                 except Exception as e:
-                                    print(f'[{iteration}] Error searching for {rat_tpl_name}:', e)
+                                    print(f'[{iteration}] Failed to click {up_name}:', e)
 
-            # small delay to allow UI update
-            time.sleep(0.12)
+            # let the garden react to Harvest before looking for the log minigame
+            latency.sleep('harvest')
 
             # check for log_minigame presence after Harvest
             if CV2_AVAILABLE:
                 try:
-                    screen = ImageGrab.grab(bbox=(rx, ry, rx + rw, ry + rh)).convert('RGB')
-                    img_np = np.array(screen)
-                    img_cv = cv2.cvtColor(img_np, cv2.COLOR_RGB2BGR)
+                    img_cv = capture_frame()
                 except Exception:
                     img_cv = None
 
-                lm = templates.get('log_minigame')
-                if img_cv is not None and lm and not lm.get('missing') and lm.get('cv') is not None:
-                    lm_val, lm_loc, lm_size = match_template_multi(img_cv, lm['cv'], lm['w'], lm['h'], scales=scales)
-                    if lm_val >= per_thresholds.get('log_minigame', 0.1) and lm_loc is not None:
-                        if log_button:
-                            print(f'[{iteration}] Log minigame detected; clicking log_minigame_center repeatedly until it disappears.')
-                            # repeat clicking until log_minigame disappears or stop pressed
-                            while True:
-                                if stop_event.is_set():
-                                    break
-                                try:
-                                    pyautogui.click(log_button['x'], log_button['y'])
-                                except Exception as e:
-                                    print(f'[{iteration}] Failed to click log_minigame button:', e)
-                                time.sleep(0.5)
-                                # re-check presence
-                                try:
-                                    screen = ImageGrab.grab(bbox=(rx, ry, rx + rw, ry + rh)).convert('RGB')
-                                    img_np = np.array(screen)
-                                    img_cv = cv2.cvtColor(img_np, cv2.COLOR_RGB2BGR)
-                                    lm_val2, _, _ = match_template_multi(img_cv, lm['cv'], lm['w'], lm['h'], scales=scales)
-                                    if lm_val2 < per_thresholds.get('log_minigame', 0.1):
-                                        print(f'[{iteration}] Log minigame no longer present.')
-                                        break
-                                except Exception:
+                if img_cv is not None and log_minigame_present(img_cv):
+                    if log_button:
+                        print(f'[{iteration}] Log minigame detected; clicking log_minigame_center repeatedly until it disappears.')
+                        # repeat clicking until log_minigame disappears or stop pressed
+                        while True:
+                            if stop_event.is_set():
+                                break
+                            try:
+                                tap(log_button['x'], log_button['y'], 'log_minigame_center', 'log_minigame')
+                            except Exception as e:
+                                print(f'[{iteration}] Failed to click log_minigame button:', e)
+                                latency.sleep('log_minigame')
+                            # re-check presence
+                            try:
+                                img_cv = capture_frame()
+                                if not log_minigame_present(img_cv):
+                                    print(f'[{iteration}] Log minigame no longer present.')
                                     break
-                        else:
-                            print(f'[{iteration}] Log minigame detected but no saved location to click (log_minigame_center missing).')
+                            except Exception:
+                                break
+                    else:
+                        print(f'[{iteration}] Log minigame detected but no saved location to click (log_minigame_center missing).')
 
             # Every 50 iterations, run the upgrade sequence
             if iteration % 50 == 0:
@@ -408,12 +390,31 @@ def main():
                 except Exception as e:
                     print(f'[{iteration}] Failed to run upgrade_garden:', e)
 
-            # main loop delay
+            # main loop delay: paces harvesting (the garden regrowing), not a wait for the UI
             time.sleep(0.3)
             iteration += 1
     except KeyboardInterrupt:
         print('\nStopped by user (KeyboardInterrupt).')
     finally:
+        print(f'Template matches: {matcher.stats}')
+        print(f'Scale order: {scale_memory.stats}')
+        for line in spatial_prior.report():
+            print(line)
+        if color_screen is not None:
+            for line in color_screen.report():
+                print(line)
+        if log_signature is not None:
+            print(f'Log minigame signature: {log_signature.stats}')
+        for line in latency.report():
+            print(line)
+        for line in verifier.report():
+            print(line)
+        scale_memory.save()
+        latency.save()
+        detector.close()
+        if sweep_detector is not None:
+            sweep_detector.close()
+        recorder.stop()
         if KEYBOARD_AVAILABLE:
             try:
                 keyboard.unhook_all_hotkeys()
@@ -422,4 +423,17 @@ def main():
 
 
 if __name__ == '__main__':
-    main()
+    import argparse
+    parser = argparse.ArgumentParser(description='Automated gaming loop.')
+    parser.add_argument('--record', metavar='DIR', default=None,
+                        help='record every captured frame and click to DIR for offline replay')
+    parser.add_argument('--process-pool', type=int, default=0, metavar='N',
+                        help='run the squirrel/rat sweep on N worker processes (0 = threads only)')
+    parser.add_argument('--color-screen', action='store_true',
+                        help='skip rat/squirrel matching on frames without their colours (check it first with replay_gaming.py --check-color-screen)')
+    parser.add_argument('--input', default=None, choices=list(input_backend.BACKENDS),
+                        help='input backend for clicks (default: fastest available)')
+    args = parser.parse_args()
+    if args.input:
+        input_backend.set_backend(args.input)
+    main(record_dir=args.record, sweep_workers=args.process_pool, use_color_screen=args.color_screen)
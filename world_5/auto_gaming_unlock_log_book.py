@@ -47,7 +47,14 @@ except Exception:
     np = None
     CV2_AVAILABLE = False
 
-from PIL import ImageGrab, Image
+# shared capture layer lives in computer_vision/ at the repository root
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from computer_vision.capture import grab
+from computer_vision.template_matching import match_entry, find_templates
+from computer_vision.template_registry import TemplateRegistry
+
+sys.path.insert(0, os.path.dirname(__file__))
+from gaming_settings import load_calibrated
 
 
 def load_locations(path):
@@ -85,62 +92,6 @@ def load_region(path):
     return int(r['x']), int(r['y']), int(r['w']), int(r['h'])
 
 
-def load_templates(repo_root):
-    names = ['squirrel.png', 'squirrel_2.png',
-             'squirrel_upgrade.png', 'chem_plant_1.png', 'chem_plant_2.png', 'log_minigame.png', 
-             'rat.png', 'rat_upgrade.png', 'shovel.png', 'log.png']
-    templates = {}
-    for fname in names:
-        path = os.path.join(repo_root, 'saved_images', 'gaming', fname)
-        key = os.path.splitext(fname)[0]
-        if not os.path.exists(path):
-            templates[key] = {'missing': True, 'path': path}
-            continue
-        try:
-            pil = Image.open(path).convert('RGBA')
-            w, h = pil.size
-            entry = {'missing': False, 'path': path, 'w': w, 'h': h}
-            if CV2_AVAILABLE:
-                arr = np.array(pil)
-                if arr.shape[2] == 4:
-                    arr = cv2.cvtColor(arr, cv2.COLOR_RGBA2BGR)
-                else:
-                    arr = cv2.cvtColor(arr, cv2.COLOR_RGB2BGR)
-                entry['cv'] = arr
-            else:
-                entry['cv'] = None
-            templates[key] = entry
-        except Exception as e:
-            templates[key] = {'missing': True, 'path': path, 'error': str(e)}
-    return templates
-
-
-def match_template_multi(img_cv, tpl_cv, tpl_w, tpl_h, scales=(0.8, 0.9, 1.0, 1.1), method=cv2.TM_CCOEFF_NORMED):
-    # returns (best_val, best_loc, best_size)
-    best_val = -1.0
-    best_loc = None
-    best_size = (tpl_w, tpl_h)
-    for scale in scales:
-        new_w = max(1, int(tpl_w * scale))
-        new_h = max(1, int(tpl_h * scale))
-        if new_w > img_cv.shape[1] or new_h > img_cv.shape[0]:
-            continue
-        try:
-            if scale == 1.0:
-                tpl_scaled = tpl_cv
-            else:
-                tpl_scaled = cv2.resize(tpl_cv, (new_w, new_h), interpolation=cv2.INTER_AREA if scale < 1.0 else cv2.INTER_LINEAR)
-            res = cv2.matchTemplate(img_cv, tpl_scaled, method)
-            _, max_val, _, max_loc = cv2.minMaxLoc(res)
-            if max_val > best_val:
-                best_val = max_val
-                best_loc = max_loc
-                best_size = (new_w, new_h)
-        except Exception:
-            continue
-    return best_val, best_loc, best_size
-
-
 def main():
     base = os.path.dirname(__file__)
     repo_root = os.path.abspath(os.path.join(base, '..'))
@@ -170,9 +121,12 @@ def main():
     except Exception as e:
         print('Error loading region:', e)
         return
+    region = (rx, ry, rw, rh)
 
-    # templates
-    templates = load_templates(repo_root)
+    # templates: every needle in saved_images/gaming, loaded from the compiled cache on first use
+    scales = [0.85, 0.9, 1.0, 1.05]
+    templates = TemplateRegistry(repo_root, os.path.join('saved_images', 'gaming'), scales,
+                                 cache_dir=os.path.join(repo_root, 'cache', 'templates'))
 
     # set up keyboard stop
     stop_event = threading.Event()
@@ -190,7 +144,8 @@ def main():
     click_log = True  # Set to False to skip log checking/clicking
 
     per_thresholds = {'squirrel': 0.1, 'squirrel_2': 0.1, 'squirrel_upgrade': 0.95, 'chem_plant_1': 0.2, 'chem_plant_2': 0.2, 'log_minigame': 0.7, 'rat': 0.1, 'rat_upgrade': 0.98, 'shovel': 0.1, 'log': 0.1}
-    scales = [0.85, 0.9, 1.0, 1.05]
+    # calibrated thresholds (world_5/calibrate_thresholds.py) replace the hand-tuned ones
+    per_thresholds.update({name: modes['bgr'] for name, modes in load_calibrated().items() if 'bgr' in modes})
     click_delay = 0.05  # delay after clicks to reduce missed clicks
 
     iteration = 1
@@ -213,9 +168,7 @@ def main():
 
             # screenshot region and search for needles in order
             try:
-                screen = ImageGrab.grab(bbox=(rx, ry, rx + rw, ry + rh)).convert('RGB')
-                img_np = np.array(screen)
-                img_cv = cv2.cvtColor(img_np, cv2.COLOR_RGB2BGR)
+                img_cv = grab(region)
             except Exception as e:
                 print('Region capture failed:', e)
                 img_cv = None
@@ -236,9 +189,7 @@ def main():
                 if CV2_AVAILABLE:
                     while chem_clicks < max_chem_clicks:
                         try:
-                            screen = ImageGrab.grab(bbox=(rx, ry, rx + rw, ry + rh)).convert('RGB')
-                            img_np = np.array(screen)
-                            img_cv_chem = cv2.cvtColor(img_np, cv2.COLOR_RGB2BGR)
+                            img_cv_chem = grab(region)
                         except Exception as e:
                             print('Region capture failed:', e)
                             break
@@ -246,7 +197,7 @@ def main():
                         for chem in ('chem_plant_1', 'chem_plant_2'):
                             chem_entry = templates.get(chem)
                             if chem_entry and not chem_entry.get('missing') and chem_entry.get('cv') is not None:
-                                cval, cloc, csize = match_template_multi(img_cv_chem, chem_entry['cv'], chem_entry['w'], chem_entry['h'], scales=scales)
+                                cval, cloc, csize = match_entry(img_cv_chem, chem_entry)
                                 if cval >= per_thresholds.get(chem, 0.1) and cloc is not None:
                                     cx = rx + cloc[0] + csize[0] // 2
                                     cy = ry + cloc[1] + csize[1] // 2
@@ -266,9 +217,7 @@ def main():
 
                 # Re-capture region for squirrel/rat checking
                 try:
-                    screen = ImageGrab.grab(bbox=(rx, ry, rx + rw, ry + rh)).convert('RGB')
-                    img_np = np.array(screen)
-                    img_cv = cv2.cvtColor(img_np, cv2.COLOR_RGB2BGR)
+                    img_cv = grab(region)
                 except Exception as e:
                     print('Region capture failed:', e)
                     img_cv = None
@@ -280,16 +229,7 @@ def main():
                     if click_log:
                         items_to_check = ('squirrel', 'squirrel_2', 'rat', 'shovel', 'log')
                     
-                    for name in items_to_check:
-                        entry = templates.get(name)
-                        if not entry or entry.get('missing') or entry.get('cv') is None:
-                            continue
-                        best_val, best_loc, best_size = match_template_multi(img_cv, entry['cv'], entry['w'], entry['h'], scales=scales)
-                        thresh = per_thresholds.get(name, 0.1)
-                        if best_val >= thresh and best_loc is not None:
-                            center_x = rx + best_loc[0] + best_size[0] // 2
-                            center_y = ry + best_loc[1] + best_size[1] // 2
-                            found_map[name] = (center_x, center_y, best_val)
+                    found_map = find_templates(img_cv, templates, items_to_check, per_thresholds, origin=(rx, ry))
 
                 # Click in preferred order
                 preferred_order = ['squirrel', 'squirrel_2', 'rat', 'shovel']
@@ -312,10 +252,8 @@ def main():
                                 try:
                                     # wait briefly for upgrade to appear, then re-capture region and search for upgrade
                                     time.sleep(0.1)
-                                    screen2 = ImageGrab.grab(bbox=(rx, ry, rx + rw, ry + rh)).convert('RGB')
-                                    img_np2 = np.array(screen2)
-                                    img_cv2 = cv2.cvtColor(img_np2, cv2.COLOR_RGB2BGR)
-                                    up_val, up_loc, up_size = match_template_multi(img_cv2, sus['cv'], sus['w'], sus['h'], scales=scales)
+                                    img_cv2 = grab(region)
+                                    up_val, up_loc, up_size = match_entry(img_cv2, sus)
                                     if up_val >= per_thresholds.get('squirrel_upgrade', 0.85) and up_loc is not None:
                                         up_x = rx + up_loc[0] + up_size[0] // 2
                                         up_y = ry + up_loc[1] + up_size[1] // 2
@@ -335,10 +273,8 @@ def main():
                                 try:
                                     # wait briefly for upgrade to appear, then re-capture region and search for upgrade
                                     time.sleep(0.1)
-                                    screen2 = ImageGrab.grab(bbox=(rx, ry, rx + rw, ry + rh)).convert('RGB')
-                                    img_np2 = np.array(screen2)
-                                    img_cv2 = cv2.cvtColor(img_np2, cv2.COLOR_RGB2BGR)
-                                    up_val, up_loc, up_size = match_template_multi(img_cv2, rat_up['cv'], rat_up['w'], rat_up['h'], scales=scales)
+                                    img_cv2 = grab(region)
+                                    up_val, up_loc, up_size = match_entry(img_cv2, rat_up)
                                     if up_val >= per_thresholds.get('rat_upgrade', 0.85) and up_loc is not None:
                                         up_x = rx + up_loc[0] + up_size[0] // 2
                                         up_y = ry + up_loc[1] + up_size[1] // 2
@@ -356,15 +292,13 @@ def main():
             if iteration % 10 == 0:
                 if CV2_AVAILABLE:
                     try:
-                        screen = ImageGrab.grab(bbox=(rx, ry, rx + rw, ry + rh)).convert('RGB')
-                        img_np = np.array(screen)
-                        img_cv = cv2.cvtColor(img_np, cv2.COLOR_RGB2BGR)
+                        img_cv = grab(region)
                     except Exception:
                         img_cv = None
 
                     lm = templates.get('log_minigame')
                     if img_cv is not None and lm and not lm.get('missing') and lm.get('cv') is not None:
-                        lm_val, lm_loc, lm_size = match_template_multi(img_cv, lm['cv'], lm['w'], lm['h'], scales=scales)
+                        lm_val, lm_loc, lm_size = match_entry(img_cv, lm)
                         if lm_val >= per_thresholds.get('log_minigame', 0.1) and lm_loc is not None:
                             if log_button:
                                 print('Log minigame detected; clicking log_minigame_center repeatedly until it disappears.')
@@ -379,10 +313,8 @@ def main():
                                     time.sleep(0.5)
                                     # re-check presence
                                     try:
-                                        screen = ImageGrab.grab(bbox=(rx, ry, rx + rw, ry + rh)).convert('RGB')
-                                        img_np = np.array(screen)
-                                        img_cv = cv2.cvtColor(img_np, cv2.COLOR_RGB2BGR)
-                                        lm_val2, _, _ = match_template_multi(img_cv, lm['cv'], lm['w'], lm['h'], scales=scales)
+                                        img_cv = grab(region)
+                                        lm_val2, _, _ = match_entry(img_cv, lm)
                                         if lm_val2 < per_thresholds.get('log_minigame', 0.1):
                                             print('Log minigame no longer present.')
                                             break
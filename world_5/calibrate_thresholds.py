@@ -0,0 +1,209 @@
+"""
+Offline threshold calibration from labelled recordings.
+
+Runs every template over the labelled frames of one or more sessions recorded
+with `auto_gaming.py --record DIR`, and reports per template:
+- the best-match score distribution on frames where it is present / absent,
+- precision and recall (ROC: true/false positive rate) per threshold,
+- a recommended threshold: midway between the highest "absent" score and the
+  lowest "present" score when they separate, otherwise the threshold with the
+  best F0.5 (false clicks cost more than a missed frame).
+
+Labels live next to the recording in `labels.json`, listing the templates on
+screen for each labelled frame index (unlisted frames are ignored):
+    {"frames": {"0": ["chem_plant_1", "squirrel"], "1": [], ...}}
+`--bootstrap` writes a first version from the current thresholds to review by hand.
+
+Run with:
+    python world_5/calibrate_thresholds.py saved_sessions/run1 --bootstrap
+    python world_5/calibrate_thresholds.py saved_sessions/run1 saved_sessions/run2 --csv roc.csv
+    python world_5/calibrate_thresholds.py saved_sessions/run1 --write
+
+--write stores the recommendations in saved_thresholds/gaming.json, which
+gaming_settings.py (auto_gaming.py, replay_gaming.py) and
+auto_gaming_unlock_log_book.py read on start.
+"""
+import argparse
+import csv
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(__file__))
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from computer_vision.recorder import SessionReader
+from computer_vision.template_matching import match_entry, usable
+from computer_vision.template_registry import TemplateRegistry
+from gaming_settings import TEMPLATE_NAMES, PER_THRESHOLDS, SCALES, MATCH_MODES, CALIBRATED_THRESHOLDS_FILE
+
+
+LABELS_FILE = 'labels.json'
+GRID = [round(0.01 * i, 2) for i in range(1, 100)]
+
+
+def load_labels(session_dir):
+    path = os.path.join(session_dir, LABELS_FILE)
+    if not os.path.exists(path):
+        return None
+    with open(path, 'r', encoding='utf-8') as f:
+        return {int(k): set(v) for k, v in json.load(f).get('frames', {}).items()}
+
+
+def bootstrap(session_dir, session, templates, names, every):
+    """Labels every `every`-th frame with what the current thresholds detect."""
+    frames = {}
+    for i in range(0, len(session), every):
+        event, frame = session.frame(i)
+        present = []
+        for name in names:
+            best_val, best_loc, _ = match_entry(frame, templates[name])
+            if best_loc is not None and best_val >= PER_THRESHOLDS.get(name, 0.1):
+                present.append(name)
+        frames[str(event['index'])] = present
+    path = os.path.join(session_dir, LABELS_FILE)
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump({'frames': frames}, f, indent=1)
+    print(f'Wrote {len(frames)} draft labels to {path}; review them before calibrating.')
+
+
+def collect_scores(sessions, templates, names):
+    """Returns {name: (positive scores, negative scores)} over all labelled frames."""
+    scores = {name: ([], []) for name in names}
+    for session, labels in sessions:
+        index_of = {e['index']: i for i, e in enumerate(session.frame_events)}
+        for frame_index, present in sorted(labels.items()):
+            if frame_index not in index_of:
+                continue
+            _, frame = session.frame(index_of[frame_index])
+            for name in names:
+                best_val, _, _ = match_entry(frame, templates[name])
+                scores[name][0 if name in present else 1].append(best_val)
+    return scores
+
+
+def curve(pos, neg):
+    """[(threshold, precision, recall, fpr), ...] over GRID."""
+    rows = []
+    for t in GRID:
+        tp = sum(1 for s in pos if s >= t)
+        fp = sum(1 for s in neg if s >= t)
+        precision = tp / float(tp + fp) if tp + fp else 1.0
+        recall = tp / float(len(pos)) if pos else 0.0
+        fpr = fp / float(len(neg)) if neg else 0.0
+        rows.append((t, precision, recall, fpr))
+    return rows
+
+
+def recommend(pos, neg, rows, beta=0.5):
+    if pos and neg and min(pos) > max(neg):
+        return round((min(pos) + max(neg)) / 2.0, 3), 'separable'
+    if pos and not neg:
+        return round(min(pos) - 0.02, 3), 'no negatives'
+
+    def f_beta(row):
+        _, p, r, _ = row
+        return (1 + beta ** 2) * p * r / (beta ** 2 * p + r) if p + r else 0.0
+    best = max(rows, key=lambda row: (f_beta(row), row[0]))
+    return best[0], f'F{beta} {f_beta(best):.3f}'
+
+
+def percentiles(values, qs):
+    if not values:
+        return ['-'] * len(qs)
+    ordered = sorted(values)
+    return [f'{ordered[min(len(ordered) - 1, int(q * (len(ordered) - 1) + 0.5))]:.3f}' for q in qs]
+
+
+def at(rows, threshold):
+    """(precision, recall) at the grid point closest to `threshold`."""
+    row = min(rows, key=lambda r: abs(r[0] - threshold))
+    return row[1], row[2]
+
+
+def write_config(path, recommendations, session_dirs):
+    data = {}
+    if os.path.exists(path):
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+    thresholds = data.setdefault('thresholds', {})
+    for name, value in recommendations.items():
+        thresholds.setdefault(name, {})[MATCH_MODES.get(name, 'bgr')] = value
+    data['calibrated'] = time.strftime('%Y-%m-%d %H:%M:%S')
+    data['sessions'] = [os.path.abspath(d) for d in session_dirs]
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, indent=2, sort_keys=True)
+    print(f'Wrote {len(recommendations)} threshold(s) to {path}')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Calibrate template thresholds on labelled recordings.')
+    parser.add_argument('sessions', nargs='+', help='session directories with a labels.json')
+    parser.add_argument('--templates', nargs='*', default=TEMPLATE_NAMES, help='templates to calibrate')
+    parser.add_argument('--bootstrap', action='store_true', help='write draft labels.json from current thresholds and exit')
+    parser.add_argument('--every', type=int, default=10, help='--bootstrap: label every n-th frame')
+    parser.add_argument('--curve', action='store_true', help='print precision/recall every 0.05')
+    parser.add_argument('--csv', metavar='FILE', help='write the full curves (threshold, precision, recall, tpr, fpr)')
+    parser.add_argument('--write', action='store_true', help=f'store recommendations in {CALIBRATED_THRESHOLDS_FILE}')
+    args = parser.parse_args()
+
+    repo_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+    templates = TemplateRegistry(repo_root, os.path.join('saved_images', 'gaming'), SCALES,
+                                 cache_dir=os.path.join(repo_root, 'cache', 'templates'), modes=MATCH_MODES)
+    names = [n for n in args.templates if usable(templates.get(n))]
+
+    if args.bootstrap:
+        for d in args.sessions:
+            bootstrap(d, SessionReader(d), templates, names, max(1, args.every))
+        return
+
+    sessions = []
+    for d in args.sessions:
+        labels = load_labels(d)
+        if labels is None:
+            print(f'{d}: no {LABELS_FILE}; skipped (create one with --bootstrap)')
+            continue
+        sessions.append((SessionReader(d), labels))
+    if not sessions:
+        return
+    print(f'{sum(len(labels) for _, labels in sessions)} labelled frame(s) in {len(sessions)} session(s)')
+
+    scores = collect_scores(sessions, templates, names)
+    recommendations = {}
+    csv_rows = []
+    print(f"{'template':<18} {'pos':>4} {'neg':>4}  {'pos min/p5/p50':<20} {'neg p50/p95/max':<20} "
+          f"{'current':>8} {'P/R':>10} {'recommended':>12} {'P/R':>10}  basis")
+    for name in names:
+        pos, neg = scores[name]
+        if not pos and not neg:
+            continue
+        rows = curve(pos, neg)
+        value, basis = recommend(pos, neg, rows) if pos else (None, 'never present')
+        current = PER_THRESHOLDS.get(name, 0.1)
+        cp, cr = at(rows, current)
+        rec = f'{value:.3f}' if value is not None else '-'
+        rp, rr = at(rows, value) if value is not None else (0.0, 0.0)
+        print(f"{name:<18} {len(pos):>4} {len(neg):>4}  {'/'.join(percentiles(pos, (0.0, 0.05, 0.5))):<20} "
+              f"{'/'.join(percentiles(neg, (0.5, 0.95, 1.0))):<20} {current:>8.3f} {cp:>4.2f}/{cr:<5.2f} "
+              f"{rec:>12} {rp:>4.2f}/{rr:<5.2f}  {basis}")
+        if args.curve:
+            for t, p, r, fpr in rows[4::5]:
+                print(f'    t={t:.2f} precision={p:.3f} recall={r:.3f} fpr={fpr:.3f}')
+        if value is not None:
+            recommendations[name] = value
+        csv_rows += [(name, t, p, r, r, fpr) for t, p, r, fpr in rows]
+
+    if args.csv:
+        with open(args.csv, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.writer(f)
+            writer.writerow(['template', 'threshold', 'precision', 'recall', 'tpr', 'fpr'])
+            writer.writerows(csv_rows)
+        print(f'Wrote curves to {args.csv}')
+
+    if args.write:
+        write_config(CALIBRATED_THRESHOLDS_FILE, recommendations, args.sessions)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,88 @@
+"""
+Detection settings for auto_gaming.py.
+
+Kept free of input/GUI imports so offline tools such as replay_gaming.py can
+share them on machines without a display.
+"""
+import json
+import os
+
+# Templates auto_gaming.py detects (needles are loaded from saved_images/gaming by TemplateRegistry).
+TEMPLATE_NAMES = ['log', 'squirrel', 'squirrel_2', 'squirrel_upgrade', 'chem_plant_1', 'chem_plant_2', 'log_minigame', 'rat', 'rat_upgrade', 'rat_upgrade_2']
+
+# Matching mode per template: 'bgr' (colour, the default) or one channel - 'gray', 'b', 'g'
+# or 'r' - for about a third of the matching work. Scores differ between modes, so each
+# template keeps a threshold per mode; PER_THRESHOLDS holds the ones for the active modes.
+# Compare modes with: python world_5/replay_gaming.py SESSION --compare-modes
+MATCH_MODES = {}
+
+MODE_THRESHOLDS = {
+    'log': {'bgr': 0.1},
+    'squirrel': {'bgr': 0.1},
+    'squirrel_2': {'bgr': 0.1},
+    'squirrel_upgrade': {'bgr': 0.85},
+    'chem_plant_1': {'bgr': 0.6},
+    'chem_plant_2': {'bgr': 0.6},
+    'log_minigame': {'bgr': 0.7},
+    'rat': {'bgr': 0.1},
+    'rat_upgrade': {'bgr': 0.85},
+    'rat_upgrade_2': {'bgr': 0.85},
+}
+
+# Thresholds written by world_5/calibrate_thresholds.py from labelled recordings
+# override the hand-tuned ones above.
+CALIBRATED_THRESHOLDS_FILE = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'saved_thresholds', 'gaming.json'))
+
+
+def load_calibrated(path=CALIBRATED_THRESHOLDS_FILE):
+    """{name: {mode: threshold}} from the calibration file, or {} when there is none."""
+    if not os.path.exists(path):
+        return {}
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f).get('thresholds', {})
+    except Exception as e:
+        print(f'Ignoring unreadable calibrated thresholds {path}: {e}')
+        return {}
+
+
+for _name, _modes in load_calibrated().items():
+    MODE_THRESHOLDS.setdefault(_name, {}).update(_modes)
+
+PER_THRESHOLDS = {name: thresholds[MATCH_MODES.get(name, 'bgr')] for name, thresholds in MODE_THRESHOLDS.items()
+                  if MATCH_MODES.get(name, 'bgr') in thresholds}
+
+SCALES = [0.85, 0.9, 1.0, 1.05]
+
+# Coarse-to-fine factor per template (match at 1/factor resolution, refine at full).
+# Empty until checked: `python world_5/replay_gaming.py SESSION --check-coarse` matches the
+# COARSE_CANDIDATES both ways on a recorded session; move an entry into COARSE_TO_FINE only
+# once it reports zero disagreements there.
+COARSE_TO_FINE = {}
+# Sprites that should stay recognisable when halved; small icons and the log stay full-res.
+COARSE_CANDIDATES = {'chem_plant_1': 2, 'chem_plant_2': 2, 'log_minigame': 2, 'rat': 2}
+
+# Score at which a template's remaining scales are skipped (scales are tried in the
+# order learned by computer_vision.scale_memory). A template whose threshold is higher exits at its threshold.
+CONFIDENT_SCORE = 0.9
+CONFIDENT_SCORES = {'squirrel_upgrade': 0.95, 'rat_upgrade': 0.95, 'rat_upgrade_2': 0.95}
+
+# Templates that reappear in the same few places; they are searched around their
+# recent hits first and the whole gaming region is scanned only on a miss.
+SPATIAL_PRIOR = ['squirrel_upgrade', 'rat_upgrade', 'rat_upgrade_2', 'log_minigame']
+
+# Templates that can be on screen several times at once: {name: (max_hits, extra_threshold)}.
+# Every instance is clicked from one frame. The best hit still uses PER_THRESHOLDS; further
+# hits need extra_threshold, since squirrels run at a "take the best" threshold of 0.1.
+# They still use COARSE_TO_FINE and skip unchanged frames/areas; they try every scale (no scale memory).
+MULTI_INSTANCE = {'chem_plant_1': (8, 0.6), 'chem_plant_2': (8, 0.6), 'squirrel': (4, 0.6), 'squirrel_2': (4, 0.6)}
+
+# Templates skipped on frames that lack their colours (computer_vision.color_screen):
+# the frame must hold COLOR_SCREEN_FRACTION of the needle's colour mass to be matched.
+# Measure skips and misses with: python world_5/replay_gaming.py SESSION --check-color-screen before enabling it (auto_gaming.py --color-screen)
+COLOR_SCREEN = ['squirrel', 'squirrel_2', 'rat', 'squirrel_upgrade', 'rat_upgrade', 'rat_upgrade_2']
+COLOR_SCREEN_FRACTION = 0.5
+
+# Share of the gaming region's 64 px tiles that must change for a Harvest click to count
+# as taken (computer_vision.wait.tiles_changed); otherwise Harvest is clicked once more.
+HARVEST_CHANGED_TILES = 0.1
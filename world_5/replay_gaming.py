@@ -0,0 +1,336 @@
+"""
+Offline replay of a recorded auto_gaming session.
+
+Feeds every frame of a session recorded with `auto_gaming.py --record DIR` through
+the same template matching the live loop uses, as fast as possible, and reports
+detection throughput and per-template hit counts. Needs no display or game, so it
+runs on a headless box.
+
+Run with:
+    python world_5/replay_gaming.py saved_sessions/run1
+    python world_5/replay_gaming.py saved_sessions/run1 --save baseline.json
+    python world_5/replay_gaming.py saved_sessions/run1 --compare baseline.json
+    python world_5/replay_gaming.py saved_sessions/run1 --skip-unchanged --compare baseline.json
+    python world_5/replay_gaming.py saved_sessions/run1 --check-coarse
+    python world_5/replay_gaming.py saved_sessions/run1 --adaptive-scales --compare baseline.json
+    python world_5/replay_gaming.py saved_sessions/run1 --spatial-prior --compare baseline.json
+    python world_5/replay_gaming.py saved_sessions/run1 --compare-modes
+    python world_5/replay_gaming.py saved_sessions/run1 --check-color-screen
+
+--compare exits with status 1 when any frame's set of detected templates differs
+from the baseline, so threshold changes can be regression-tested.
+
+--check-coarse matches every coarse-to-fine template and candidate (gaming_settings.
+COARSE_TO_FINE and COARSE_CANDIDATES) both ways on each frame and reports how often the coarse result agrees with the
+full-resolution one, and the speedup; it exits with status 1 on any disagreement.
+
+--compare-modes matches every needle in saved_images/gaming in each matching mode
+(colour, grayscale, single channels) and reports the cost per frame, how often the
+mode finds the colour hit, and a threshold that separates hits from misses.
+
+--check-color-screen runs the colour pre-screen (gaming_settings.COLOR_SCREEN) and
+the full match for every screened template on each frame and reports the skip
+rate, the false negatives (skipped frames where the full match clears the
+threshold), the best score on a skipped frame and the matching time saved.
+Templates on a "take the best" threshold such as 0.1 match on almost any frame,
+so their false negatives say more about the threshold than about the screen.
+--color-screen uses the pre-screen in the replayed detector (as auto_gaming.py does).
+
+--process-pool N replays with computer_vision.process_detector (tiled, N worker
+processes) instead of the thread pool; compare with a baseline to check it agrees.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(__file__))
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from computer_vision.recorder import SessionReader
+from computer_vision.template_matching import MODES, FrameViews, load_templates, match_entry, usable
+from computer_vision.template_registry import TemplateRegistry
+from computer_vision.change_detector import CachedMatcher
+from computer_vision.detector import Detector
+from computer_vision.scale_memory import ScaleMemory
+from computer_vision.spatial_prior import SpatialPrior
+from computer_vision.color_screen import ColorScreen
+from computer_vision.process_detector import ProcessDetector
+from gaming_settings import TEMPLATE_NAMES, PER_THRESHOLDS, SCALES, COARSE_TO_FINE, COARSE_CANDIDATES, CONFIDENT_SCORE, CONFIDENT_SCORES, SPATIAL_PRIOR, MATCH_MODES, MODE_THRESHOLDS, MULTI_INSTANCE, COLOR_SCREEN, COLOR_SCREEN_FRACTION
+
+
+def replay(session, detector, names):
+    """
+    Runs `detector` on every frame of `session`.
+    Returns (detections, stats): detections maps frame index -> {name: [x, y, score]};
+    stats maps name -> {'hits': frames with a hit, 'instances': total hits, 'seconds': total matching time}.
+    """
+    detections = {}
+    stats = {name: {'hits': 0, 'instances': 0, 'seconds': 0.0} for name in names}
+    for event, frame in session.frames():
+        origin = (event['region'][0], event['region'][1])
+        found = {}
+        if detector.matcher is not None:
+            detector.matcher.update(frame)
+        hits = detector.detect(frame, names)
+        for name, elapsed in detector.last_timings.items():
+            stats[name]['seconds'] += elapsed
+        for name, dets in hits.items():
+            if dets:
+                stats[name]['hits'] += 1
+                stats[name]['instances'] += len(dets)
+                x, y = dets[0].center(origin)
+                found[name] = [int(x), int(y), round(float(dets[0].score), 4)]
+        detections[str(event['index'])] = found
+    return detections, stats
+
+
+def check_coarse(session, templates, tolerance=2):
+    """
+    Compares coarse-to-fine with full-resolution matching on every frame.
+    A frame agrees when both pass or both fail the threshold and, when both pass,
+    the locations are within `tolerance` pixels.
+    Returns {name: {'frames', 'disagree', 'coarse_s', 'full_s'}}.
+    """
+    names = [n for n, e in templates.items() if e.get('coarse')]
+    report = {name: {'frames': 0, 'disagree': 0, 'coarse_s': 0.0, 'full_s': 0.0} for name in names}
+    for event, frame in session.frames():
+        for name in names:
+            entry, r = templates[name], report[name]
+            full_entry = dict(entry, coarse=None)  # same masks and match mode, only the search differs
+            threshold = PER_THRESHOLDS.get(name, 0.1)
+            t0 = time.perf_counter()
+            c_val, c_loc, _ = match_entry(frame, entry)
+            t1 = time.perf_counter()
+            f_val, f_loc, _ = match_entry(frame, full_entry)
+            t2 = time.perf_counter()
+            r['frames'] += 1
+            r['coarse_s'] += t1 - t0
+            r['full_s'] += t2 - t1
+            c_hit = c_loc is not None and c_val >= threshold
+            f_hit = f_loc is not None and f_val >= threshold
+            if c_hit != f_hit or (c_hit and max(abs(c_loc[0] - f_loc[0]), abs(c_loc[1] - f_loc[1])) > tolerance):
+                r['disagree'] += 1
+                print(f"frame {event['index']}: {name} coarse {c_val:.3f}@{c_loc} full {f_val:.3f}@{f_loc}")
+    return report
+
+
+def check_color_screen(session, screen, names):
+    """
+    Screens and fully matches every screened template on every frame.
+    Returns {name: {'frames', 'skipped', 'false_negatives', 'skipped_max', 'screen_s', 'saved_s'}}:
+    'skipped_max' is the best full-match score on a skipped frame, 'saved_s' the
+    matching time the skipped frames would not have spent.
+    """
+    names = [n for n in names if screen.applies(n)]
+    report = {n: {'frames': 0, 'skipped': 0, 'false_negatives': 0, 'skipped_max': None, 'screen_s': 0.0, 'saved_s': 0.0}
+              for n in names}
+    for _, frame in session.frames():
+        t0 = time.perf_counter()
+        hist = screen.frame_hist(frame)
+        hist_s = (time.perf_counter() - t0) / max(1, len(names))
+        for name in names:
+            r = report[name]
+            t1 = time.perf_counter()
+            skip = screen.fraction(hist, name) < screen.per_fraction.get(name, screen.min_fraction)
+            t2 = time.perf_counter()
+            val, loc, _ = match_entry(frame, screen.templates[name])
+            t3 = time.perf_counter()
+            r['frames'] += 1
+            r['screen_s'] += hist_s + t2 - t1
+            if not skip:
+                continue
+            r['skipped'] += 1
+            r['saved_s'] += t3 - t2
+            r['skipped_max'] = val if r['skipped_max'] is None else max(r['skipped_max'], val)
+            if loc is not None and val >= PER_THRESHOLDS.get(name, 0.1):
+                r['false_negatives'] += 1
+    return report
+
+
+def compare_modes(session, repo_root, names, threshold_default=0.8):
+    """
+    Returns {name: {mode: {'seconds', 'agree', 'hits', 'hit_min', 'miss_max'}}}.
+    Colour ('bgr') matches at the template's colour threshold are the reference:
+    'agree' counts reference hits the mode locates within 2 px, 'hit_min' is the
+    lowest mode score on those, 'miss_max' the highest mode score on reference misses.
+    """
+    by_mode = {mode: load_templates(repo_root, names, SCALES, cache_dir=os.path.join(repo_root, 'cache', 'templates'),
+                                   modes={os.path.splitext(n)[0]: mode for n in names})
+               for mode in MODES}
+    keys = [k for k, e in by_mode['bgr'].items() if not e.get('missing')]
+    report = {k: {m: {'seconds': 0.0, 'agree': 0, 'hits': 0, 'hit_min': None, 'miss_max': None} for m in MODES} for k in keys}
+    for event, frame in session.frames():
+        views = FrameViews(frame)
+        for key in keys:
+            ref = None
+            colour_threshold = MODE_THRESHOLDS.get(key, {}).get('bgr', threshold_default)
+            for mode in MODES:  # 'bgr' first
+                r = report[key][mode]
+                t0 = time.perf_counter()
+                img = views.get(mode)  # conversion is part of the cost
+                val, loc, _ = match_entry(img, by_mode[mode][key])
+                r['seconds'] += time.perf_counter() - t0
+                if mode == 'bgr':
+                    ref = loc if loc is not None and val >= colour_threshold else None
+                if ref is not None:
+                    r['hits'] += 1
+                    if loc is not None and max(abs(loc[0] - ref[0]), abs(loc[1] - ref[1])) <= 2:
+                        r['agree'] += 1
+                        r['hit_min'] = val if r['hit_min'] is None else min(r['hit_min'], val)
+                else:
+                    r['miss_max'] = val if r['miss_max'] is None else max(r['miss_max'], val)
+    return report
+
+
+def compare(detections, baseline):
+    """Returns a list of (frame, missing, extra) where detected template names differ."""
+    diffs = []
+    for frame in sorted(set(detections) | set(baseline), key=int):
+        now = set(detections.get(frame, {}))
+        before = set(baseline.get(frame, {}))
+        if now != before:
+            diffs.append((frame, sorted(before - now), sorted(now - before)))
+    return diffs
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Replay a recorded gaming session through detection.')
+    parser.add_argument('session', help='session directory written by auto_gaming.py --record')
+    parser.add_argument('--save', metavar='JSON', help='write per-frame detections to JSON')
+    parser.add_argument('--compare', metavar='JSON', help='compare detections with a saved baseline')
+    parser.add_argument('--skip-unchanged', action='store_true',
+                        help='only re-match templates where the frame changed (as auto_gaming.py does)')
+    parser.add_argument('--workers', type=int, default=None,
+                        help='detector thread pool size (default: CPU count; 1 = serial)')
+    parser.add_argument('--adaptive-scales', action='store_true',
+                        help='try the learned best scale first and stop at a confident score (as auto_gaming.py does)')
+    parser.add_argument('--spatial-prior', action='store_true',
+                        help='search near recent hits before scanning the whole frame (as auto_gaming.py does)')
+    parser.add_argument('--compare-modes', action='store_true',
+                        help='report speed and accuracy of grayscale/single-channel matching per needle and exit')
+    parser.add_argument('--multi-instance', action='store_true',
+                        help='report every instance of MULTI_INSTANCE templates (as auto_gaming.py does)')
+    parser.add_argument('--full-res', action='store_true',
+                        help='ignore COARSE_TO_FINE and match every template at full resolution')
+    parser.add_argument('--check-coarse', action='store_true',
+                        help='verify coarse-to-fine templates and candidates against full-resolution matching and exit')
+    parser.add_argument('--color-screen', action='store_true',
+                        help='skip templates whose colours are not on the frame (as auto_gaming.py does)')
+    parser.add_argument('--check-color-screen', action='store_true',
+                        help='report skip and false-negative rates of the colour pre-screen and exit')
+    parser.add_argument('--process-pool', type=int, default=0, metavar='N',
+                        help='detect on N worker processes over shared memory instead of threads')
+    args = parser.parse_args()
+
+    repo_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+    coarse = None if args.full_res else COARSE_TO_FINE
+    if args.check_coarse:
+        coarse = dict(COARSE_CANDIDATES, **COARSE_TO_FINE)
+    templates = TemplateRegistry(repo_root, os.path.join('saved_images', 'gaming'), SCALES,
+                                 cache_dir=os.path.join(repo_root, 'cache', 'templates'), coarse=coarse,
+                                 modes=MATCH_MODES, thresholds=PER_THRESHOLDS)
+    names = [n for n in TEMPLATE_NAMES if usable(templates.get(n))]
+
+    session = SessionReader(args.session)
+    print(f'Session {args.session}: {len(session)} frames, {len(session.click_events)} clicks')
+    if not len(session):
+        return
+
+    if args.compare_modes:
+        needles = sorted(f for f in os.listdir(os.path.join(repo_root, 'saved_images', 'gaming')) if f.endswith('.png') and not f.endswith('.mask.png'))
+        report = compare_modes(session, repo_root, needles)
+        n = len(session)
+        print(f"{'template':<18} {'mode':<5} {'ms/frame':>9} {'speedup':>8} {'found':>7} {'hit min':>8} {'miss max':>9} {'threshold':>10}")
+        for key, modes in report.items():
+            base = modes['bgr']['seconds']
+            for mode, r in modes.items():
+                found = f"{100.0 * r['agree'] / r['hits']:.0f}%" if r['hits'] else '-'
+                hit_min = f"{r['hit_min']:.3f}" if r['hit_min'] is not None else '-'
+                miss_max = f"{r['miss_max']:.3f}" if r['miss_max'] is not None else '-'
+                if r['hit_min'] is not None and r['miss_max'] is not None and r['hit_min'] > r['miss_max']:
+                    suggested = f"{(r['hit_min'] + r['miss_max']) / 2:.3f}"
+                else:
+                    suggested = '-'  # not separable on this session (or nothing to separate)
+                active = ' *' if MATCH_MODES.get(key, 'bgr') == mode else ''
+                print(f"{key:<18} {mode:<5} {r['seconds'] * 1000.0 / n:>9.2f} {base / r['seconds'] if r['seconds'] else 0.0:>7.1f}x "
+                      f"{found:>7} {hit_min:>8} {miss_max:>9} {suggested:>10}{active}")
+        print('* = mode in gaming_settings.MATCH_MODES; to switch, set MATCH_MODES and add the threshold to MODE_THRESHOLDS.')
+        return
+
+    if args.check_coarse:
+        report = check_coarse(session, templates)
+        print(f"{'template':<18} {'agree':>7} {'full ms':>8} {'coarse ms':>10} {'speedup':>8}")
+        for name, r in report.items():
+            agree = 100.0 * (r['frames'] - r['disagree']) / r['frames']
+            speedup = r['full_s'] / r['coarse_s'] if r['coarse_s'] else 0.0
+            print(f"{name:<18} {agree:>6.1f}% {r['full_s'] * 1000.0 / r['frames']:>8.2f} "
+                  f"{r['coarse_s'] * 1000.0 / r['frames']:>10.2f} {speedup:>7.1f}x")
+        if any(r['disagree'] for r in report.values()):
+            sys.exit(1)
+        return
+
+    if args.check_color_screen:
+        screen = ColorScreen(templates, COLOR_SCREEN, min_fraction=COLOR_SCREEN_FRACTION)
+        report = check_color_screen(session, screen, names)
+        print(f"{'template':<18} {'skipped':>8} {'false neg':>10} {'skip max':>9} {'screen ms':>10} {'saved ms':>9}")
+        for name, r in report.items():
+            skip_max = f"{r['skipped_max']:.3f}" if r['skipped_max'] is not None else '-'
+            print(f"{name:<18} {100.0 * r['skipped'] / r['frames']:>7.1f}% {100.0 * r['false_negatives'] / r['frames']:>9.1f}% "
+                  f"{skip_max:>9} {r['screen_s'] * 1000.0 / r['frames']:>10.3f} {r['saved_s'] * 1000.0 / r['frames']:>9.2f}")
+        print('(per frame; false neg = skipped frames where the full match clears PER_THRESHOLDS)')
+        return
+
+    # learned from scratch so the replay does not depend on (or touch) the live bot's statistics
+    scale_memory = ScaleMemory(None, PER_THRESHOLDS, CONFIDENT_SCORE, CONFIDENT_SCORES) if args.adaptive_scales else None
+    matcher = CachedMatcher(templates, scale_memory=scale_memory) if args.skip_unchanged else None
+    spatial_prior = SpatialPrior(SPATIAL_PRIOR) if args.spatial_prior else None
+    color_screen = ColorScreen(templates, COLOR_SCREEN, min_fraction=COLOR_SCREEN_FRACTION) if args.color_screen else None
+    if args.process_pool:
+        detector = ProcessDetector(templates, PER_THRESHOLDS, names, max_workers=args.process_pool,
+                                   multi=MULTI_INSTANCE if args.multi_instance else None, color_screen=color_screen)
+    else:
+        detector = Detector(templates, PER_THRESHOLDS, matcher=matcher, max_workers=args.workers,
+                            scale_memory=scale_memory, spatial_prior=spatial_prior,
+                            multi=MULTI_INSTANCE if args.multi_instance else None, color_screen=color_screen)
+    start = time.perf_counter()
+    detections, stats = replay(session, detector, names)
+    total = time.perf_counter() - start
+    detector.close()
+
+    print(f'Detection: {len(session) / total:.1f} frames/sec ({total * 1000.0 / len(session):.1f} ms/frame)')
+    print(f"{'template':<18} {'hits':>6} {'found':>6} {'ms/frame':>9}  (hits = frames, found = instances; matching work summed over threads)")
+    for name in names:
+        s = stats[name]
+        print(f"{name:<18} {s['hits']:>6} {s['instances']:>6} {s['seconds'] * 1000.0 / len(session):>9.2f}")
+    if matcher is not None:
+        print(f'Template matches: {matcher.stats}')
+    if scale_memory is not None:
+        print(f'Scale order: {scale_memory.stats}')
+    if spatial_prior is not None:
+        print('Spatial prior (hits/attempts, avg time per attempt):')
+        for line in spatial_prior.report():
+            print(f'  {line}')
+    if color_screen is not None:
+        print('Colour pre-screen (skipped/checked, avg screening time):')
+        for line in color_screen.report():
+            print(f'  {line}')
+
+    if args.save:
+        with open(args.save, 'w', encoding='utf-8') as f:
+            json.dump(detections, f, indent=2)
+        print(f'Saved detections to {args.save}')
+
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        diffs = compare(detections, baseline)
+        for frame, missing, extra in diffs:
+            print(f'frame {frame}: missing {missing} extra {extra}')
+        print(f'{len(diffs)} frame(s) differ from {args.compare}')
+        if diffs:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,9 +1,13 @@
 import json
 import os
+import sys
 import time
 
 import pyautogui
 
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from computer_vision.wait import wait_until, screen_changed, screen_stable, around
+
 
 def load_locations(path):
 	if not os.path.exists(path):
@@ -40,6 +44,18 @@ def click_button(buttons, name):
 	pyautogui.click(location['x'], location['y'])
 
 
+def changed_at(buttons, name, radius=20):
+	"""Predicate: the screen around button `name` differs from now (call before clicking)."""
+	location = buttons[name]
+	return screen_changed(around(location['x'], location['y'], radius))
+
+
+def settled_at(buttons, name, radius=20):
+	"""Predicate: the screen around button `name` has stopped changing (animations finished)."""
+	location = buttons[name]
+	return screen_stable(around(location['x'], location['y'], radius))
+
+
 def upgrade_garden():
 	base = os.path.dirname(__file__)
 	repo_root = os.path.abspath(os.path.join(base, '..'))
@@ -51,17 +67,24 @@ def upgrade_garden():
 
 	upgrades_name = 'updates' if 'updates' in buttons else 'Upgrades'
 
+	# each step waits until the screen reacts; the timeouts are the old fixed sleeps
+	# the first change is only the start of the opening animation: the buttons are usable,
+	# and a reference for the next step is meaningful, once the panel has settled
+	panel_open = changed_at(buttons, 'bits_value')
 	click_button(buttons, upgrades_name)
-	time.sleep(1)
+	wait_until(panel_open, timeout=1, label='upgrade panel')
+	wait_until(settled_at(buttons, 'bits_value'), timeout=1, label='upgrade panel settled')
 
+	value_bought = changed_at(buttons, 'bits_value')
 	click_button(buttons, 'bits_value')
 	click_button(buttons, 'bits_value')
-	time.sleep(1)
+	wait_until(value_bought, timeout=1)
 
+	wait_until(settled_at(buttons, 'bits_speed'), timeout=1, label='bits_speed settled')
+	speed_bought = changed_at(buttons, 'bits_speed')
 	click_button(buttons, 'bits_speed')
 	click_button(buttons, 'bits_speed')
-
-	time.sleep(1)
+	wait_until(speed_bought, timeout=1)
 
 	click_button(buttons, 'close_upgrades')
 	click_button(buttons, 'close_upgrades')